@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app_backend.communication_with_www_server import URL, exchange_manifest
+from app_backend.logging_f import log_communication_with_www_server
+
+# Size of the blocks in which files are read for hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+# Number of files hashed at the same time (hashlib releases the GIL for large blocks)
+HASH_WORKERS = 4
+# Digests of already hashed files: (device, inode) -> (size, mtime_ns, sha256). Keyed by the inode, so a hard link
+# of the file (e.g. in ../unsuccessful_uploads, see file_placement.place_file) is not read again on a retry
+_digest_cache = {}
+_digest_cache_lock = threading.Lock()
+DIGEST_CACHE_SIZE = 256
+
+
+def hash_file(file_path: str, block_size: int = HASH_BLOCK_SIZE) -> tuple:
+    """
+    Computes the size and SHA-256 of a file, reading it in blocks (memory use does not depend on the file size).
+
+    Returns:
+        tuple: The size in bytes and the hexadecimal SHA-256 digest.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(file_path, 'rb') as file:
+        while block := file.read(block_size):
+            sha256.update(block)
+            size += len(block)
+    return size, sha256.hexdigest()
+
+
+def file_digest(file_path: str) -> tuple:
+    """
+    Returns the size and SHA-256 of a file, hashing it only if it changed since it was last hashed.
+
+    The digest is cached by the file (device and inode) and reused while its size and modification time are
+    unchanged, so retries and re-uploads of large artifacts (e.g. `combined.mp4`) do not read them again.
+
+    Returns:
+        tuple: The size in bytes and the hexadecimal SHA-256 digest.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    stat = os.stat(file_path)
+    key = (stat.st_dev, stat.st_ino)
+    with _digest_cache_lock:
+        cached = _digest_cache.get(key)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return stat.st_size, cached[2]
+
+    size, sha256 = hash_file(file_path)
+    after = os.stat(file_path)
+    # A file modified while it was being hashed is not cached
+    if size == stat.st_size and (after.st_size, after.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+        with _digest_cache_lock:
+            _digest_cache.pop(key, None)
+            if len(_digest_cache) >= DIGEST_CACHE_SIZE:
+                # The oldest entry is removed (the dictionary keeps the insertion order)
+                del _digest_cache[next(iter(_digest_cache))]
+            _digest_cache[key] = (size, stat.st_mtime_ns, sha256)
+    return size, sha256
+
+
+def build_manifest(note_id: str, file_paths: list, max_workers: int = HASH_WORKERS) -> dict:
+    """
+    Builds the artifact manifest of a note: the name, size and SHA-256 of every file.
+
+    Files hashed before and not modified since are not read again (`file_digest`).
+
+    Args:
+        note_id (str): The unique identifier of the note.
+        file_paths (list): Paths of the note files.
+        max_workers (int, optional): Number of files hashed in parallel. Defaults to `HASH_WORKERS`.
+
+    Returns:
+        dict: The manifest, e.g.
+              `{"note_id": "12345", "files": [{"name": "0.png", "size": 48213, "sha256": "9f86d0..."}]}`.
+
+    Raises:
+        OSError: If a file cannot be read.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        hashes = list(executor.map(file_digest, file_paths))
+    return {
+        "note_id": note_id,
+        "files": [
+            {"name": os.path.basename(file_path), "size": size, "sha256": sha256}
+            for file_path, (size, sha256) in zip(file_paths, hashes)
+        ]
+    }
+
+
+def files_to_upload(note_id: str, file_paths: list, url: str = f"{URL}/api/manifest") -> list:
+    """
+    Returns the files of a note that the server does not have yet.
+
+    The manifest of the files is sent to the server (`exchange_manifest`). The server attaches files whose content
+    (SHA-256 and size) it already stores to the note and answers with the names it still needs, so retries and
+    re-analysed notes only upload new or changed artifacts.
+
+    Args:
+        note_id (str): The unique identifier of the note.
+        file_paths (list): Paths of the note files.
+        url (str, optional): The server API endpoint. Defaults to "https://ioprojekt.atwebpages.com/api/manifest".
+
+    Returns:
+        list: The paths to upload - all of them if the manifest cannot be built or exchanged (e.g. the server does
+              not support manifests).
+
+    Example:
+        >>> files_to_upload("12345", ["../tmp/rec/12345.json", "../tmp/rec/combined.mp4"])
+        ['../tmp/rec/12345.json']
+    """
+    if not file_paths:
+        return []
+    try:
+        manifest = build_manifest(note_id, file_paths)
+    except Exception as e:
+        log_communication_with_www_server(f"For files_to_upload({note_id}) - Error: {e}\n")
+        return list(file_paths)
+
+    missing = exchange_manifest(manifest, url)
+    if missing is None:
+        return list(file_paths)
+    missing = set(missing)
+    return [file_path for file_path in file_paths if os.path.basename(file_path) in missing]
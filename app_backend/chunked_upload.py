@@ -0,0 +1,382 @@
+# Chunked, resumable file uploads.
+#
+# Protocol (all responses are JSON):
+#     POST {URL}/api/chunked_upload             form: note_id, file_name, size, chunk_size
+#         -> 200 {"upload_id": ..., "offset": n}  creates the upload or returns the existing one
+#     GET  {URL}/api/chunked_upload/<upload_id>
+#         -> 200 {"upload_id": ..., "offset": n, "size": ...}  (resume query), 404 if unknown
+#     PUT  {URL}/api/chunked_upload/<upload_id>  headers: Upload-Offset, Chunk-SHA256; body: chunk bytes
+#         -> 200 {"offset": n}, plus "message": "File on Server" once offset == size
+#         -> 409 {"offset": n} if Upload-Offset is not the acknowledged offset
+#         -> 422 if the SHA-256 of the body does not match Chunk-SHA256
+#
+# The upload ID is derived from the note ID, file name and size, so an interrupted upload is resumed from the last
+# acknowledged offset even after the application restarts (e.g. by `retry_logic.send_failed_files`).
+import hashlib
+import json
+import os
+import threading
+import time
+
+from app_backend.http_client import TIMEOUT, get_session, throttled_body
+from app_backend.logging_f import log_communication_with_www_server
+
+# Size of one part of the file
+CHUNK_SIZE = 8 * 1024 * 1024
+# Files larger than this are uploaded in chunks (smaller files with a single request)
+CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024
+# Number of consecutive failed requests after which the upload is given up (and queued for a later retry)
+MAX_ATTEMPTS = 5
+# Base of the exponential back-off between attempts, in seconds
+RETRY_DELAY = 0.5
+
+
+class ChunkedUploadUnsupported(Exception):
+    """The server does not implement the chunked upload API."""
+
+
+def upload_id_for(note_id: str, file_name: str, size: int) -> str:
+    """Returns the deterministic upload ID of a file of a note."""
+    return hashlib.sha256(f"{note_id}/{file_name}/{size}".encode('utf-8')).hexdigest()
+
+
+def query_upload_offset(upload_url: str):
+    """
+    Asks the server for the last acknowledged offset of an upload.
+
+    Returns:
+        int | None: The offset, or `None` if the server does not know the upload.
+    """
+    response = get_session().get(upload_url, timeout=TIMEOUT)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return int(response.json()['offset'])
+
+
+def upload_file_in_chunks(
+        note_id: str,
+        file_path: str,
+        url: str,
+        chunk_size: int = CHUNK_SIZE,
+        max_attempts: int = MAX_ATTEMPTS,
+        on_progress=None
+) -> bool:
+    """
+    Uploads a file in fixed-size chunks, resuming from the last offset acknowledged by the server.
+
+    Each chunk is sent with its offset and SHA-256 checksum. When a request fails (connection drop, timeout,
+    server error), the client waits, asks the server for the acknowledged offset and continues from there, so
+    bytes already stored on the server are never sent again. Chunks are sent through the shared bandwidth limiter
+    (`http_client.set_bandwidth_limit`).
+
+    Args:
+        note_id (str): The unique identifier of the note associated with the file.
+        file_path (str): The local file path of the file to be uploaded.
+        url (str): The base URL of the server (e.g. `https://ioprojekt.atwebpages.com`).
+        chunk_size (int, optional): The size of one chunk in bytes. Defaults to `CHUNK_SIZE` (8 MiB).
+        max_attempts (int, optional): Consecutive failed requests tolerated before giving up. Defaults to `MAX_ATTEMPTS`.
+        on_progress (callable, optional): Called as `on_progress(bytes_acknowledged, total_bytes)` after each chunk.
+
+    Returns:
+        bool: `True` if the whole file is stored on the server, `False` if the upload was given up.
+
+    Raises:
+        ChunkedUploadUnsupported: If the server does not implement the chunked upload API (404 on creation).
+        OSError: If the file cannot be read.
+
+    Example:
+        >>> upload_file_in_chunks("12345", "../tmp/rec/combined.mp4", "https://ioprojekt.atwebpages.com")
+        True
+    """
+    session = get_session()
+    file_name = os.path.basename(file_path)
+    size = os.path.getsize(file_path)
+    upload_url = f"{url}/api/chunked_upload/{upload_id_for(note_id, file_name, size)}"
+
+    response = session.post(
+        f"{url}/api/chunked_upload",
+        data={"note_id": note_id, "file_name": file_name, "size": size, "chunk_size": chunk_size},
+        timeout=TIMEOUT
+    )
+    if response.status_code in (404, 405):
+        raise ChunkedUploadUnsupported(f"{url} does not support chunked uploads")
+    response.raise_for_status()
+    offset = int(response.json()['offset'])
+    if on_progress is not None:
+        on_progress(offset, size)
+
+    failures = 0
+    with open(file_path, 'rb') as file:
+        while True:
+            if failures:
+                if failures >= max_attempts:
+                    log_communication_with_www_server(
+                        f"For upload_file_in_chunks({note_id}, {file_path}) - Error: giving up at offset {offset}/{size}\n"
+                    )
+                    return False
+                time.sleep(RETRY_DELAY * 2 ** (failures - 1))
+                try:
+                    acknowledged = query_upload_offset(upload_url)
+                except Exception as e:
+                    log_communication_with_www_server(f"For upload_file_in_chunks({note_id}, {file_path}) - Error: {e}\n")
+                    failures += 1
+                    continue
+                if acknowledged is None:
+                    return False
+                offset = acknowledged
+                if offset >= size:
+                    # Only the acknowledgement of the last chunk was lost
+                    return True
+
+            file.seek(offset)
+            chunk = file.read(chunk_size)
+            headers = {
+                "Upload-Offset": str(offset),
+                "Chunk-SHA256": hashlib.sha256(chunk).hexdigest(),
+                "Content-Type": "application/octet-stream"
+            }
+            try:
+                response = session.put(upload_url, data=throttled_body(chunk), headers=headers, timeout=TIMEOUT)
+            except Exception as e:
+                log_communication_with_www_server(
+                    f"For upload_file_in_chunks({note_id}, {file_path}) - Error at offset {offset}: {e}\n"
+                )
+                failures += 1
+                continue
+
+            if response.status_code == 409:
+                # The server has a different acknowledged offset (e.g. our previous acknowledgement was lost)
+                offset = int(response.json()['offset'])
+                continue
+            if response.status_code != 200:
+                log_communication_with_www_server(
+                    f"For upload_file_in_chunks({note_id}, {file_path}) - Error at offset {offset}: HTTP {response.status_code}\n"
+                )
+                failures += 1
+                continue
+
+            failures = 0
+            result = response.json()
+            offset = int(result['offset'])
+            if on_progress is not None:
+                on_progress(offset, size)
+            if offset >= size:
+                return result.get('message') == 'File on Server'
+
+
+def create_reference_server(directory: str, host: str = "127.0.0.1", port: int = 0, drop_every: int = 0,
+                            drop_mode: str = "alternate"):
+    """
+    Creates a local stand-in of the server implementing the chunked upload API, `/api/upload_file` and
+    `/api/manifest` (content deduplication, see `communication_with_www_server.exchange_manifest`).
+
+    Parts are stored as `<directory>/<upload_id>.part`; the acknowledged offset is the size of that file, so the
+    server needs no other state. Completed files are moved to `<directory>/<note_id>/<file_name>`; files with
+    content already stored (by SHA-256 and size) are hard-linked there when listed in a manifest.
+
+    Args:
+        directory (str): The directory for received files.
+        host (str, optional): The address to listen on. Defaults to `127.0.0.1`.
+        port (int, optional): The port (0 chooses a free one, see `server.server_address`).
+        drop_every (int, optional): Simulates a flaky link - every `drop_every`-th chunk request is dropped
+            without a response (0 disables).
+        drop_mode (str, optional): When dropped requests are cut off: `'before_store'` (the chunk is lost),
+            `'after_store'` (only the acknowledgement is lost) or `'alternate'` (both in turn, the first
+            before storing). Defaults to `'alternate'`.
+
+    Returns:
+        http.server.ThreadingHTTPServer: The server (run it with `serve_forever()` in a thread). Its `stats`
+            dictionary counts `chunk_requests`, `dropped` and `bytes_received`.
+
+    Example:
+        >>> server = create_reference_server("../tmp/server", drop_every=3)
+        >>> threading.Thread(target=server.serve_forever, daemon=True).start()
+        >>> upload_file_in_chunks("1", "video.mp4", f"http://127.0.0.1:{server.server_address[1]}")
+        True
+    """
+    from email.parser import BytesParser
+    from email.policy import HTTP
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+
+    os.makedirs(directory, exist_ok=True)
+    uploads = {}
+    lock = threading.Lock()
+    stats = {'chunk_requests': 0, 'dropped': 0, 'bytes_received': 0}
+    contents = {}  # (sha256, size) -> path of a stored file with this content
+
+    def store_content(file_path):
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            while block := file.read(1024 * 1024):
+                sha256.update(block)
+        with lock:
+            contents[(sha256.hexdigest(), os.path.getsize(file_path))] = file_path
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status, data):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        def read_form(self):
+            """Returns form fields as {name: (file_name, bytes)} (file_name is None for text fields)."""
+            body = self.read_body()
+            content_type = self.headers.get("Content-Type", "")
+            if content_type.startswith("multipart/form-data"):
+                message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+                return {part.get_param('name', header='content-disposition'): (part.get_filename(), part.get_payload(decode=True))
+                        for part in message.iter_parts()}
+            return {name: (None, values[0].encode()) for name, values in parse_qs(body.decode()).items()}
+
+        def upload_state(self):
+            upload_id = self.path.rsplit('/', 1)[-1]
+            with lock:
+                upload = uploads.get(upload_id)
+            if upload is None:
+                self.send_json(404, {"error": "unknown upload"})
+                return None, None
+            part_path = os.path.join(directory, f"{upload_id}.part")
+            return upload, part_path
+
+        def do_POST(self):
+            if self.path == "/api/manifest":
+                manifest = json.loads(self.read_body())
+                note_dir = os.path.join(directory, manifest["note_id"])
+                os.makedirs(note_dir, exist_ok=True)
+                missing = []
+                for file in manifest["files"]:
+                    with lock:
+                        stored_path = contents.get((file["sha256"], file["size"]))
+                    target_path = os.path.join(note_dir, os.path.basename(file["name"]))
+                    if stored_path is None:
+                        missing.append(file["name"])
+                    elif not os.path.exists(target_path):
+                        os.link(stored_path, target_path)
+                self.send_json(200, {"missing": missing})
+                return
+
+            form = self.read_form()
+            field = lambda name: form[name][1].decode()
+            if self.path == "/api/upload_file":
+                note_dir = os.path.join(directory, field("note_id"))
+                os.makedirs(note_dir, exist_ok=True)
+                file_name, data = form["file"]
+                file_path = os.path.join(note_dir, os.path.basename(file_name))
+                with open(file_path, 'wb') as file:
+                    file.write(data)
+                store_content(file_path)
+                self.send_json(200, {"message": "File on Server"})
+            elif self.path == "/api/chunked_upload":
+                note_id, file_name = field("note_id"), os.path.basename(field("file_name"))
+                size = int(field("size"))
+                upload_id = upload_id_for(note_id, file_name, size)
+                part_path = os.path.join(directory, f"{upload_id}.part")
+                with lock:
+                    upload = uploads.setdefault(upload_id, {"note_id": note_id, "file_name": file_name, "size": size})
+                    is_complete = upload.get("complete", False)
+                offset = size if is_complete else os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                self.send_json(200, {"upload_id": upload_id, "offset": offset})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_GET(self):
+            upload, part_path = self.upload_state()
+            if upload is not None:
+                # The .part file is renamed once complete; before the first chunk is stored it does not exist
+                if upload.get("complete"):
+                    offset = upload["size"]
+                else:
+                    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                self.send_json(200, {"upload_id": self.path.rsplit('/', 1)[-1], "offset": offset, "size": upload["size"]})
+
+        def do_PUT(self):
+            upload, part_path = self.upload_state()
+            if upload is None:
+                self.read_body()
+                return
+            chunk = self.read_body()
+            with lock:
+                stats['chunk_requests'] += 1
+                stats['bytes_received'] += len(chunk)
+                drop = drop_every and stats['chunk_requests'] % drop_every == 0
+                drop_after_store = drop and (
+                    drop_mode == 'after_store' or drop_mode == 'alternate' and stats['dropped'] % 2 == 1
+                )
+                if drop:
+                    stats['dropped'] += 1
+            if drop and not drop_after_store:
+                self.close_connection = True
+                self.connection.close()
+                return
+
+            if upload.get("complete"):
+                self.send_json(200, {"offset": upload["size"], "message": "File on Server"})
+                return
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            if int(self.headers.get("Upload-Offset", -1)) != offset:
+                self.send_json(409, {"offset": offset})
+                return
+            if hashlib.sha256(chunk).hexdigest() != self.headers.get("Chunk-SHA256"):
+                self.send_json(422, {"error": "checksum mismatch", "offset": offset})
+                return
+            with open(part_path, 'ab') as part_file:
+                part_file.write(chunk)
+            offset += len(chunk)
+
+            if offset >= upload["size"]:
+                note_dir = os.path.join(directory, upload["note_id"])
+                os.makedirs(note_dir, exist_ok=True)
+                file_path = os.path.join(note_dir, upload["file_name"])
+                os.replace(part_path, file_path)
+                upload["complete"] = True
+                store_content(file_path)
+            if drop_after_store:
+                self.close_connection = True
+                self.connection.close()
+                return
+            result = {"offset": offset}
+            if offset >= upload["size"]:
+                result["message"] = "File on Server"
+            self.send_json(200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+# Demo: python -m app_backend.chunked_upload
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_path = os.path.join(tmp_dir, "combined.mp4")
+        with open(source_path, 'wb') as source_file:
+            source_file.write(os.urandom(50 * 1024 * 1024))
+
+        server = create_reference_server(os.path.join(tmp_dir, "server"), drop_every=3)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        start = time.perf_counter()
+        is_uploaded = upload_file_in_chunks("demo", source_path, f"http://127.0.0.1:{server.server_address[1]}",
+                                            chunk_size=4 * 1024 * 1024)
+        seconds = time.perf_counter() - start
+        server.shutdown()
+
+        with open(source_path, 'rb') as source_file, open(os.path.join(tmp_dir, "server", "demo", "combined.mp4"), 'rb') as target_file:
+            is_identical = source_file.read() == target_file.read()
+        print(f"uploaded: {is_uploaded}, identical: {is_identical}, {seconds:.2f} s, "
+              f"{server.stats['dropped']} dropped requests, "
+              f"{server.stats['bytes_received'] / 2 ** 20:.0f} MiB received for a 50 MiB file")
@@ -1,8 +1,8 @@
-import requests
-from app_backend.logging_f import log_communication_with_www_server
+import os
 
-# Request Warning will not show up in console
-requests.packages.urllib3.disable_warnings()
+from app_backend.chunked_upload import CHUNKED_UPLOAD_THRESHOLD, ChunkedUploadUnsupported, upload_file_in_chunks
+from app_backend.http_client import TIMEOUT, ThrottledMultipartFile, get_bandwidth_limiter, get_session
+from app_backend.logging_f import log_communication_with_www_server
 
 # URL of WEB Server:
 URL = "https://ioprojekt.atwebpages.com"
@@ -29,6 +29,7 @@ def get_info_of_notes_from_server(url: str = f"{URL}/api/get_notes_list") -> [di
         - Returns `None` if an exception occurs.
 
     Notes:
+        - Uses the shared keep-alive session (`http_client.get_session`) with connect/read timeouts (`TIMEOUT`).
         - SSL certificate verification is disabled (`verify=False`), which may introduce security risks.
         - Ensure the `requests` library is installed to use this function.
 
@@ -40,7 +41,7 @@ def get_info_of_notes_from_server(url: str = f"{URL}/api/get_notes_list") -> [di
         ...     print("Failed to fetch notes information.")
     """
     try:
-        response = requests.get(url, verify=False)
+        response = get_session().get(url, timeout=TIMEOUT)
         response.raise_for_status()
         return response.json()
 
@@ -49,15 +50,79 @@ def get_info_of_notes_from_server(url: str = f"{URL}/api/get_notes_list") -> [di
         return None
 
 
-def upload_file_on_server(note_id: str, file_path: str, url: str = f"{URL}/api/upload_file") -> bool:
+def get_notes_list_changes(
+        etag: str = None,
+        last_modified: str = None,
+        cursor: str = None,
+        url: str = f"{URL}/api/get_notes_list"
+) -> [dict|None]:
+    """
+    Fetches the note list from the server only if it changed since the previous fetch.
+
+    The request carries `If-None-Match` (`etag`) and `If-Modified-Since` (`last_modified`) headers and, if the server
+    returned a cursor before, a `since` parameter. A server supporting incremental lists answers `since` requests with
+    `{"notes": [changed notes], "deleted": [note IDs], "cursor": "..."}`; otherwise the full list is returned.
+
+    Args:
+        etag (str, optional): The `ETag` header of the previous response.
+        last_modified (str, optional): The `Last-Modified` header of the previous response.
+        cursor (str, optional): The `cursor` of the previous response.
+        url (str, optional): The API endpoint. Defaults to `https://ioprojekt.atwebpages.com/api/get_notes_list`.
+
+    Returns:
+        dict | None: `None` if an error occurs, otherwise a dictionary with keys:
+            - `not_modified` (bool): `True` on `304 Not Modified` (the other keys are then empty).
+            - `notes` (list), `deleted` (list): Changed (or all) notes and IDs of deleted notes.
+            - `incremental` (bool): Whether `notes` contains only changes since `cursor`.
+            - `etag`, `last_modified`, `cursor` (str | None): Values to send with the next request.
+
+    Behavior on Exception:
+        - Logs errors using `log_communication_with_www_server`.
+        - Returns `None` if an exception occurs.
+    """
+    try:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        params = {"since": cursor} if cursor else None
+
+        response = get_session().get(url, headers=headers, params=params, timeout=TIMEOUT)
+        changes = {"not_modified": response.status_code == 304, "notes": [], "deleted": [], "incremental": False,
+                   "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                   "cursor": None}
+        if changes["not_modified"]:
+            return changes
+        response.raise_for_status()
+
+        data = response.json()
+        changes["notes"] = data.get("notes", [])
+        changes["deleted"] = data.get("deleted", [])
+        changes["cursor"] = data.get("cursor")
+        changes["incremental"] = bool(cursor) and changes["cursor"] is not None
+        return changes
+
+    except Exception as e:
+        log_communication_with_www_server(f"For get_notes_list_changes({url}) - Error: {e}\n")
+        return None
+
+
+def upload_file_on_server(note_id: str, file_path: str, url: str = f"{URL}/api/upload_file", on_progress=None) -> bool:
     """
     Uploads a file to a server for a specified note.
 
+    Files larger than `CHUNKED_UPLOAD_THRESHOLD` are uploaded in resumable chunks (`chunked_upload`), so a dropped
+    connection only repeats the unacknowledged chunk. If the server does not support chunked uploads, the file is
+    sent in a single request. Both ways the file is streamed through the shared bandwidth limiter
+    (`http_client.set_bandwidth_limit`).
+
     Args:
         note_id (str): The unique identifier of the note associated with the file.
         file_path (str): The local file path of the file to be uploaded.
         url (str, optional): The server API endpoint for file uploads. Defaults to
-            "https://ioprojekt.atwebpages.com/api/upload_file".
+            "https://ioprojekt.atwebpages.com/api/upload_file". Chunked uploads use the API under the same host.
+        on_progress (callable, optional): Called as `on_progress(bytes_sent, total_bytes)` while uploading.
 
     Returns:
         bool: `True` if the file upload is successful and the server responds with the expected message.
@@ -73,6 +138,7 @@ def upload_file_on_server(note_id: str, file_path: str, url: str = f"{URL}/api/u
 
     Notes:
         - Requires the `requests` library.
+        - Uses the shared keep-alive session, so uploading many files of a note reuses one TLS connection.
         - SSL certificate verification is disabled (`verify=False`), which may pose a security risk.
         - Ensures the file is properly closed after the upload attempt.
 
@@ -84,13 +150,23 @@ def upload_file_on_server(note_id: str, file_path: str, url: str = f"{URL}/api/u
         ...     print("File upload failed. Check the 'unsuccessful_uploads' directory for details.")
     """
     try:
-        text_data = {"note_id": note_id}
-        files = {"file": open(file_path, "rb")}
-
-        response = requests.post(url, data=text_data, files=files, verify=False)
+        size = os.path.getsize(file_path)
+        if size > CHUNKED_UPLOAD_THRESHOLD:
+            try:
+                if upload_file_in_chunks(note_id, file_path, url.split("/api/")[0], on_progress=on_progress):
+                    return True
+                raise Exception("Chunked upload was given up")
+            except ChunkedUploadUnsupported:
+                pass
 
-        files['file'].close()
+        # The file is streamed from disk block by block through the bandwidth limiter, so a single request
+        # (also a large file when the server has no chunked upload API) does not saturate the uplink
+        text_data = {"note_id": note_id}
+        with ThrottledMultipartFile(text_data, "file", file_path, get_bandwidth_limiter(), on_progress) as body:
+            response = get_session().post(url, data=body, headers={"Content-Type": body.content_type}, timeout=TIMEOUT)
 
+        if on_progress is not None and response.status_code == 200:
+            on_progress(size, size)
         if response.status_code == 200 and response.json()['message'] == 'File on Server':
             return True
         raise Exception
@@ -125,6 +201,7 @@ def get_info_of_notes_from_server_if_note_contain_search_word(search_word: str,
             - Returns `None` if an exception occurs.
 
         Notes:
+            - Uses the shared keep-alive session (`http_client.get_session`) with connect/read timeouts (`TIMEOUT`).
             - SSL certificate verification is disabled (`verify=False`), which may introduce security risks.
             - Ensure the `requests` library is installed to use this function.
 
@@ -137,10 +214,57 @@ def get_info_of_notes_from_server_if_note_contain_search_word(search_word: str,
     """
     try:
         text_data = {"phrase": search_word}
-        response = requests.post(url, data=text_data, verify=False)
+        response = get_session().post(url, data=text_data, timeout=TIMEOUT)
         response.raise_for_status()
         return response.json()
 
     except Exception as e:
         log_communication_with_www_server(f"For get_info_of_notes_from_server_if_note_contain_search_word({search_word}, {url}) - Error: {e}\n")
-        return None
\ No newline at end of file
+        return None
+
+
+def exchange_manifest(manifest: dict, url: str = f"{URL}/api/manifest") -> [list|None]:
+    """
+    Sends the artifact manifest of a note (see `artifact_manifest.build_manifest`) to the server.
+
+    The server attaches to the note every listed file whose content (SHA-256 and size) it already stores and answers
+    with the names of the files it still needs: `{"missing": ["combined.mp4", ...]}`.
+
+    Args:
+        manifest (dict): The manifest, `{"note_id": ..., "files": [{"name": ..., "size": ..., "sha256": ...}]}`.
+        url (str, optional): The server API endpoint. Defaults to "https://ioprojekt.atwebpages.com/api/manifest".
+
+    Returns:
+        list | None: The names of the files to upload, or `None` if the server does not support manifests
+                     or an error occurs (then all files should be uploaded).
+
+    Behavior on Exception:
+        - Logs errors using `log_communication_with_www_server` (a 404 - no manifest support - is not logged).
+        - Returns `None` if an exception occurs.
+    """
+    try:
+        response = get_session().post(url, json=manifest, timeout=TIMEOUT)
+        if response.status_code in (404, 405):
+            return None
+        response.raise_for_status()
+        return list(response.json()["missing"])
+
+    except Exception as e:
+        log_communication_with_www_server(f"For exchange_manifest({manifest.get('note_id')}, {url}) - Error: {e}\n")
+        return None
+
+
+def note_url(note_id: str, timestamp: int = None, url: str = URL) -> str:
+    """
+    Returns the address of a note in the web viewer, optionally at a moment of the recording.
+
+    The moment is passed as a Media Fragments time fragment (`#t=<seconds>`): fragments are not sent to the server,
+    so the link opens the note in any viewer, and a viewer reading `location.hash` starts the recording there.
+
+    Example:
+        >>> note_url("5f4d2b", 754)
+        'https://ioprojekt.atwebpages.com/5f4d2b#t=754'
+    """
+    if timestamp is None:
+        return f"{url}/{note_id}"
+    return f"{url}/{note_id}#t={int(timestamp)}"
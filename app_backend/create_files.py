@@ -1,41 +1,13 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from docx import Document
 from docx.shared import Inches
 
+from app_backend.docx_stream import StreamingDocxWriter
 from app_backend.logging_f import log_file_creation
-
-
-def format_timestamp(seconds: int) -> str:
-    """
-    Converts a time duration in seconds into a formatted timestamp string.
-
-    This function takes an integer value representing a time duration in seconds and converts it
-    into a human-readable timestamp in the format `[HH:MM:SS]`.
-
-    Args:
-        seconds (int): The time duration in seconds to format.
-
-    Returns:
-        str: A formatted string representing the time duration in `[HH:MM:SS]` format,
-             where `HH` is hours, `MM` is minutes, and `SS` is seconds, all zero-padded to two digits.
-
-    Example:
-        >>> format_timestamp(3661)
-        '[01:01:01]'
-
-        >>> format_timestamp(45)
-        '[00:00:45]'
-
-    Notes:
-        - Handles durations longer than 24 hours (e.g., 90000 seconds -> '[25:00:00]').
-        - The input should be a non-negative integer. Negative values may result in unexpected output.
-    """
-    hours = seconds // 3600
-    minutes = (seconds % 3600) // 60
-    seconds = seconds % 60
-
-    return f"[{hours:02}:{minutes:02}:{seconds:02}]"
+from app_backend.note_json import write_compact_note
+from app_backend.note_model import Note, build_note, format_timestamp
 
 
 def create_docx_file(note_title: str, note_summary: str,  note_content: list, docx_file_path: str, language: str ='pl') -> bool:
@@ -84,32 +56,57 @@ def create_docx_file(note_title: str, note_summary: str,  note_content: list, do
         - Only supports adding images, speaker annotations, and plain text. Unsupported types are not handled.
         - Does not validate file paths for images; ensure images exist before calling this function.
     """
-    title = "Title"
-    summary = "Summary"
+    return render_docx_file(build_note(note_title, note_summary, note_content, language=language), docx_file_path)
+
+
+def headings(language: str) -> tuple:
+    """
+    Returns the document headings (title, summary) for the given language (`'pl'` or `'en'`).
+    """
     if language == 'pl':
-        title = "Tytuł"
-        summary = "Podsumowanie"
+        return "Tytuł", "Podsumowanie"
+    return "Title", "Summary"
+
+
+def render_docx_file(note: Note, docx_file_path: str) -> bool:
+    """
+    Renders the intermediate note representation to a .docx file.
+
+    Args:
+        note (Note): The note built by `build_note`.
+        docx_file_path (str): The file path where the .docx file will be saved.
+
+    Returns:
+        bool: `True` if the file is successfully created, otherwise `False`.
+
+    Behavior on Error:
+        - Logs error details with `log_file_creation` and returns `False`.
+
+    Notes:
+        - Produces the same document as `create_docx_file`.
+    """
+    title, summary = headings(note.language)
 
     try:
         docx_file = Document()
-        docx_file.add_heading(f"{title}: {note_title}", level=1)
+        docx_file.add_heading(f"{title}: {note.title}", level=1)
         docx_file.add_heading(f"{summary}:", level=1)
-        docx_file.add_paragraph(note_summary)
+        docx_file.add_paragraph(note.summary)
         docx_file.add_paragraph()
 
-        for content in note_content:
-            if content['type'] == 'img':
-                docx_file.add_paragraph(format_timestamp(content['timestamp']))
-                docx_file.add_picture(content['file_path'], width=Inches(4))
-            elif content['type'] == 'speaker':
-                docx_file.add_paragraph(f"{format_timestamp(content['timestamp'])} {content['name']}:")
-            elif content['type'] == 'text':
-                docx_file.add_paragraph(f"{format_timestamp(content['timestamp'])} {content['value']}")
+        for entry in note.entries:
+            if entry.type == 'img':
+                docx_file.add_paragraph(entry.timestamp_str)
+                docx_file.add_picture(entry.value, width=Inches(4))
+            elif entry.type == 'speaker':
+                docx_file.add_paragraph(f"{entry.timestamp_str} {entry.value}:")
+            elif entry.type == 'text':
+                docx_file.add_paragraph(f"{entry.timestamp_str} {entry.value}")
 
         docx_file.save(docx_file_path)
         return True
     except Exception as e:
-        log_file_creation(f"For create_docx_file() - Error: {e}\n")
+        log_file_creation(f"For render_docx_file() - Error: {e}\n")
         return False
 
 
@@ -152,26 +149,39 @@ def create_txt_file(note_title: str, note_summary: str, note_content: list, txt_
         - Images (`'img'` type) are skipped and not included in the text file.
         - The file is written with UTF-8 encoding for compatibility with various languages.
     """
-    title = "Title"
-    summary = "Summary"
-    if language == 'pl':
-        title = "Tytuł"
-        summary = "Podsumowanie"
+    return render_txt_file(build_note(note_title, note_summary, note_content, language=language), txt_file_path)
+
+
+def render_txt_file(note: Note, txt_file_path: str) -> bool:
+    """
+    Renders the intermediate note representation to a .txt file (UTF-8, images are skipped).
+
+    Args:
+        note (Note): The note built by `build_note`.
+        txt_file_path (str): The file path where the .txt file will be saved.
+
+    Returns:
+        bool: `True` if the file is successfully created, otherwise `False`.
+
+    Behavior on Error:
+        - Logs error details with `log_file_creation` and returns `False`.
+    """
+    title, summary = headings(note.language)
 
     try:
         with open(txt_file_path, "w", encoding='utf-8') as txt_file:
-            txt_file.write(f"{title}: {note_title}\n")
+            txt_file.write(f"{title}: {note.title}\n")
             txt_file.write(f"{summary}:\n")
-            txt_file.write(f"{note_summary}\n\n")
+            txt_file.write(f"{note.summary}\n\n")
 
-            for content in note_content:
-                if content['type'] == 'speaker':
-                    txt_file.write(f"{format_timestamp(content['timestamp'])} {content['name']}:\n")
-                elif content['type'] == 'text':
-                    txt_file.write(f"{format_timestamp(content['timestamp'])} {content['value']}\n")
+            for entry in note.entries:
+                if entry.type == 'speaker':
+                    txt_file.write(f"{entry.timestamp_str} {entry.value}:\n")
+                elif entry.type == 'text':
+                    txt_file.write(f"{entry.timestamp_str} {entry.value}\n")
         return True
     except Exception as e:
-        log_file_creation(f"For create_txt_file() - Error: {e}\n")
+        log_file_creation(f"For render_txt_file() - Error: {e}\n")
         return False
 
 
@@ -251,24 +261,99 @@ def create_json_file(note_title: str, note_summary: str, note_content: list, not
         - JSON is written with UTF-8 encoding and formatted with an indentation of 4 spaces.
         - The `note_id` is derived from the JSON file name (excluding the `.json` extension).
     """
-    data_content = []
-    for content in note_content:
-        if content['type'] == 'img':
-            data_content.append({"type": "img", "val": f"{os.path.basename(content['file_path'])}", "timestamp_str": f"{format_timestamp(content['timestamp'])}"})
-        elif content['type'] == 'speaker':
-            data_content.append({"type": "speaker", "val": f"{content['name']}", "timestamp_str": f"{format_timestamp(content['timestamp'])}"})
-        elif content['type'] == 'text':
-            data_content.append({"type": "txt", "val": f"{content['value']}", "timestamp_str": f"{format_timestamp(content['timestamp'])}"})
+    note = build_note(
+        note_title,
+        note_summary,
+        note_content,
+        note_datetime=note_datetime,
+        note_id=os.path.basename(json_file_path)[:-5], # -5 -> without .json
+        video_file_name=video_file_name,
+        docx_file_name=docx_file_name,
+        txt_file_name=txt_file_name,
+        language=language
+    )
+    return render_json_file(note, json_file_path)
+
+
+def render_streamed_docx_file(note: Note, docx_file_path: str) -> bool:
+    """
+    Renders the intermediate note representation to a .docx file with `StreamingDocxWriter`.
+
+    Produces the same document as `render_docx_file`, but `document.xml` is streamed into the zip file, so
+    memory use does not grow with the note length and very long transcripts are written in linear time.
+
+    Args:
+        note (Note): The note built by `build_note`.
+        docx_file_path (str): The file path where the .docx file will be saved.
+
+    Returns:
+        bool: `True` if the file is successfully created, otherwise `False`.
+
+    Behavior on Error:
+        - Logs error details with `log_file_creation`, removes the partial file and returns `False`.
+    """
+    title, summary = headings(note.language)
+
+    try:
+        with StreamingDocxWriter(docx_file_path) as docx_file:
+            docx_file.add_heading(f"{title}: {note.title}")
+            docx_file.add_heading(f"{summary}:")
+            docx_file.add_paragraph(note.summary)
+            docx_file.add_paragraph()
+
+            for entry in note.entries:
+                if entry.type == 'img':
+                    docx_file.add_paragraph(entry.timestamp_str)
+                    docx_file.add_picture(entry.value, width_inches=4)
+                elif entry.type == 'speaker':
+                    docx_file.add_paragraph(f"{entry.timestamp_str} {entry.value}:")
+                elif entry.type == 'text':
+                    docx_file.add_paragraph(f"{entry.timestamp_str} {entry.value}")
+        return True
+    except Exception as e:
+        log_file_creation(f"For render_streamed_docx_file() - Error: {e}\n")
+        return False
+
+
+# Names of the content types in the JSON file
+JSON_TYPES = {'img': 'img', 'speaker': 'speaker', 'text': 'txt'}
+
+
+def render_json_file(note: Note, json_file_path: str) -> bool:
+    """
+    Renders the intermediate note representation to a .json file (schema: `docs/json_file_doc.json`).
+
+    Args:
+        note (Note): The note built by `build_note`.
+        json_file_path (str): The file path where the JSON file will be saved.
+
+    Returns:
+        bool: `True` if the file is successfully created, otherwise `False`.
+
+    Behavior on Error:
+        - Logs error details with `log_file_creation` and returns `False`.
+
+    Notes:
+        - Images are stored by file name only (`val`), as on the server they share one directory.
+    """
+    data_content = [
+        {
+            "type": JSON_TYPES[entry.type],
+            "val": entry.file_name if entry.type == 'img' else entry.value,
+            "timestamp_str": entry.timestamp_str
+        }
+        for entry in note.entries
+    ]
 
     data = {
-        "note_id": os.path.basename(json_file_path)[:-5], # -5 -> without .json
-        "title": note_title,
-        "datetime": note_datetime,
-        "summary": note_summary,
-        "language": language,
-        "video": video_file_name,
-        "docx": docx_file_name,
-        "txt": txt_file_name,
+        "note_id": note.note_id,
+        "title": note.title,
+        "datetime": note.datetime,
+        "summary": note.summary,
+        "language": note.language,
+        "video": note.video,
+        "docx": note.docx,
+        "txt": note.txt,
         "content": data_content
     }
 
@@ -277,5 +362,65 @@ def create_json_file(note_title: str, note_summary: str, note_content: list, not
             json.dump(data, f, ensure_ascii=False, indent=4)
         return True
     except Exception as e:
-        log_file_creation(f"For create_json_file() - Error: {e}\n")
-        return False
\ No newline at end of file
+        log_file_creation(f"For render_json_file() - Error: {e}\n")
+        return False
+
+
+# Note file renderers: format name -> function(note, file_path) -> bool
+RENDERERS = {
+    'docx': render_streamed_docx_file,
+    'txt': render_txt_file,
+    'json': render_json_file,
+    'json_compact': write_compact_note,
+}
+
+
+def register_renderer(file_format: str, renderer) -> None:
+    """
+    Registers (or replaces) the renderer used by `render_note_files` for the given file format.
+
+    Args:
+        file_format (str): The name of the format, e.g. `'docx'`.
+        renderer (Callable[[Note, str], bool]): The function writing the note to the given file path.
+    """
+    RENDERERS[file_format] = renderer
+
+
+def render_note_files(note: Note, file_paths: dict, max_workers: int = None) -> dict:
+    """
+    Renders the note to several file formats concurrently.
+
+    Args:
+        note (Note): The note built by `build_note`.
+        file_paths (dict): Maps a format name from `RENDERERS` to the output file path,
+            e.g. `{'docx': 'note.docx', 'txt': 'note.txt'}`.
+        max_workers (int, optional): The number of worker threads. Defaults to one per format.
+
+    Returns:
+        dict: Maps each format name to `True` if the file was created, otherwise `False`.
+
+    Example:
+        >>> note = build_note("Meeting", "Summary", note_content, language='en')
+        >>> render_note_files(note, {'docx': 'meeting.docx', 'txt': 'meeting.txt'})
+        {'docx': True, 'txt': True}
+
+    Notes:
+        - The note is immutable, so renderers share it without copying or locking.
+        - A thread pool is used: renderers spend much of their time in file I/O and zlib compression,
+          which release the GIL, and worker processes would have to re-import the application.
+        - An unknown format is logged and reported as `False`.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(file_paths), 1)) as executor:
+        futures = {}
+        for file_format, file_path in file_paths.items():
+            renderer = RENDERERS.get(file_format)
+            if renderer is None:
+                log_file_creation(f"For render_note_files() - Error: unknown format {file_format}\n")
+                results[file_format] = False
+                continue
+            futures[file_format] = executor.submit(renderer, note, file_path)
+
+        for file_format, future in futures.items():
+            results[file_format] = future.result()
+    return results
\ No newline at end of file
@@ -0,0 +1,293 @@
+import os
+import re
+import struct
+import zipfile
+from xml.sax.saxutils import escape
+
+# EMU (English Metric Units) per inch, used by DrawingML for image sizes
+EMU_PER_INCH = 914400
+
+# Size of the document.xml buffer flushed into the zip stream
+FLUSH_SIZE = 64 * 1024
+
+# Characters not allowed in XML 1.0 (python-docx rejects them, here they are dropped)
+INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:wp="http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing" '
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture"'
+)
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Default Extension="jpeg" ContentType="image/jpeg"/>'
+    '<Default Extension="jpg" ContentType="image/jpeg"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/>'
+    '<w:qFormat/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+    '<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:keepNext/><w:spacing w:before="480" w:after="0"/><w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:color w:val="365F91"/><w:sz w:val="28"/></w:rPr></w:style>'
+    '</w:styles>'
+)
+
+# Section properties of the python-docx default template (Letter, 1"/1.25" margins)
+SECTION = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="720" w:footer="720" w:gutter="0"/></w:sectPr>'
+)
+
+IMAGE_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+STYLES_RELATIONSHIP = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+
+def image_size(image_path: str) -> tuple:
+    """
+    Returns the (width, height) of an image in pixels.
+
+    PNG sizes are read from the IHDR chunk without decoding the image. Other formats fall back to Pillow.
+
+    Args:
+        image_path (str): The path to the image file.
+
+    Returns:
+        tuple: The image width and height in pixels.
+    """
+    with open(image_path, 'rb') as image_file:
+        header = image_file.read(24)
+    if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        return image.size
+
+
+class StreamingDocxWriter:
+    """
+    Writes a .docx (OOXML) file incrementally, without building the document in memory.
+
+    Paragraphs are appended to `word/document.xml`, which is compressed straight into the zip file through a
+    small buffer, so memory use is bounded by a single entry regardless of the document length. Images are
+    referenced while streaming and stored afterwards as separate media parts (`word/media/imageN.png`).
+
+    Example:
+        >>> with StreamingDocxWriter("note.docx") as docx_file:
+        ...     docx_file.add_heading("Title: Meeting")
+        ...     docx_file.add_paragraph("[00:00:05] Alice:")
+        ...     docx_file.add_picture("../tmp/recording/5.png", width_inches=4)
+
+    Notes:
+        - Only the subset used by notes is supported: level-1 headings, plain paragraphs and inline pictures.
+        - The output opens in Word and LibreOffice and can be read back with python-docx.
+    """
+
+    def __init__(self, docx_file_path: str):
+        self.docx_file_path = docx_file_path
+        self.zip_file = zipfile.ZipFile(docx_file_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.zip_file.writestr('[Content_Types].xml', CONTENT_TYPES)
+        self.zip_file.writestr('_rels/.rels', PACKAGE_RELS)
+        self.zip_file.writestr('word/styles.xml', STYLES)
+
+        self.document = self.zip_file.open('word/document.xml', 'w', force_zip64=True)
+        self.buffer = []
+        self.buffer_size = 0
+        self.images = {}  # image path -> (relationship id, part name)
+        self.picture_count = 0
+        self._write(
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<w:document {NAMESPACES}><w:body>'
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _write(self, xml: str) -> None:
+        self.buffer.append(xml)
+        self.buffer_size += len(xml)
+        if self.buffer_size >= FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        self.document.write(''.join(self.buffer).encode('utf-8'))
+        self.buffer = []
+        self.buffer_size = 0
+
+    @staticmethod
+    def _run(text: str) -> str:
+        # Line breaks become <w:br/>, as in python-docx
+        text = escape(INVALID_XML_CHARS.sub('', text)).replace(
+            '\n', '</w:t><w:br/><w:t xml:space="preserve">'
+        )
+        return f'<w:r><w:t xml:space="preserve">{text}</w:t></w:r>'
+
+    def add_heading(self, text: str) -> None:
+        """Appends a level-1 heading."""
+        self._write(f'<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr>{self._run(text)}</w:p>')
+
+    def add_paragraph(self, text: str = "") -> None:
+        """Appends a paragraph of plain text (an empty paragraph for empty text)."""
+        self._write(f'<w:p>{self._run(text)}</w:p>' if text else '<w:p/>')
+
+    def add_picture(self, image_path: str, width_inches: float = 4) -> None:
+        """
+        Appends an inline picture scaled to the given width (the aspect ratio is kept).
+
+        The image file is only referenced here; it is copied into the package when the writer is closed.
+        """
+        if image_path not in self.images:
+            extension = os.path.splitext(image_path)[1].lower() or '.png'
+            number = len(self.images) + 1
+            self.images[image_path] = (f'rId{number}', f'media/image{number}{extension}')
+        relationship_id, part_name = self.images[image_path]
+
+        width, height = image_size(image_path)
+        cx = int(width_inches * EMU_PER_INCH)
+        cy = int(cx * height / width)
+        self.picture_count += 1
+        number = self.picture_count
+        name = escape(os.path.basename(image_path), {'"': '&quot;'})
+        self._write(
+            f'<w:p><w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0">'
+            f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{number}" name="Picture {number}"/>'
+            f'<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+            f'<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+            f'<pic:pic><pic:nvPicPr><pic:cNvPr id="{number}" name="{name}"/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="{relationship_id}"/><a:stretch><a:fillRect/></a:stretch>'
+            f'</pic:blipFill><pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr></pic:pic>'
+            f'</a:graphicData></a:graphic></wp:inline></w:drawing></w:r></w:p>'
+        )
+
+    def close(self) -> None:
+        """Finishes `document.xml`, adds the media parts with their relationships and closes the file."""
+        self._write(f'{SECTION}</w:body></w:document>')
+        self._flush()
+        self.document.close()
+
+        # Without this relationship Word ignores styles.xml and headings are shown as plain paragraphs
+        relationships = [f'<Relationship Id="rIdStyles" Type="{STYLES_RELATIONSHIP}" Target="styles.xml"/>']
+        for image_path, (relationship_id, part_name) in self.images.items():
+            # Images are already compressed, so they are stored without deflate
+            self.zip_file.write(image_path, f'word/{part_name}', compress_type=zipfile.ZIP_STORED)
+            relationships.append(
+                f'<Relationship Id="{relationship_id}" Type="{IMAGE_RELATIONSHIP}" Target="{part_name}"/>'
+            )
+        self.zip_file.writestr(
+            'word/_rels/document.xml.rels',
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{"".join(relationships)}</Relationships>'
+        )
+        self.zip_file.close()
+
+    def abort(self) -> None:
+        """Closes and removes a partially written file."""
+        try:
+            self.document.close()
+            self.zip_file.close()
+        finally:
+            if os.path.exists(self.docx_file_path):
+                os.remove(self.docx_file_path)
+
+
+def benchmark(entry_counts: tuple = (1000, 10000, 50000), image_every: int = 500) -> list:
+    """
+    Compares the streaming writer with python-docx on generated notes.
+
+    Args:
+        entry_counts (tuple): Numbers of note entries to benchmark.
+        image_every (int): Every `image_every`-th entry is an image (0 disables images).
+
+    Returns:
+        list: One dictionary per entry count and writer with `entries`, `writer`, `seconds` and `peak_mb`
+              (the peak memory allocated while writing, measured with `tracemalloc` - it does not see the
+              lxml tree python-docx builds in C, so the python-docx figure is a lower bound).
+    """
+    import tempfile
+    import time
+    import tracemalloc
+    import zlib
+
+    from app_backend.create_files import render_docx_file, render_streamed_docx_file
+    from app_backend.note_model import build_note
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = os.path.join(tmp_dir, 'frame.png')
+        with open(image_path, 'wb') as image_file:
+            # 640x360 grayscale PNG
+            raw = b''.join(b'\x00' + bytes([x % 256 for x in range(640)]) for _ in range(360))
+            chunks = [
+                (b'IHDR', struct.pack('>IIBBBBB', 640, 360, 8, 0, 0, 0, 0)),
+                (b'IDAT', zlib.compress(raw)),
+                (b'IEND', b''),
+            ]
+            image_file.write(b'\x89PNG\r\n\x1a\n')
+            for chunk_type, data in chunks:
+                image_file.write(struct.pack('>I', len(data)) + chunk_type + data)
+                image_file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+        for entry_count in entry_counts:
+            note_content = []
+            for i in range(entry_count):
+                if image_every and i % image_every == 0:
+                    note_content.append({'type': 'img', 'timestamp': i, 'file_path': image_path})
+                elif i % 10 == 0:
+                    note_content.append({'type': 'speaker', 'timestamp': i, 'name': f'SPEAKER_{i % 3:02}'})
+                else:
+                    note_content.append({'type': 'text', 'timestamp': i, 'value': f'Sentence number {i} ' * 4})
+            note = build_note("Benchmark", "Summary", note_content)
+
+            for writer, renderer in (('python-docx', render_docx_file), ('streaming', render_streamed_docx_file)):
+                tracemalloc.start()
+                start = time.perf_counter()
+                is_created = renderer(note, os.path.join(tmp_dir, f'{writer}.docx'))
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                if not is_created:
+                    raise RuntimeError(f"{writer} failed to render {entry_count} entries (see file_creation.log)")
+                results.append({'entries': entry_count, 'writer': writer, 'seconds': seconds, 'peak_mb': peak / 1e6})
+    return results
+
+
+# Benchmark: python -m app_backend.docx_stream
+if __name__ == "__main__":
+    for result in benchmark():
+        print(f"{result['entries']:>6} entries  {result['writer']:<12} {result['seconds']:8.2f} s  "
+              f"{result['peak_mb']:8.1f} MB peak")
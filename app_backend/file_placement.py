@@ -0,0 +1,115 @@
+import os
+import shutil
+import sys
+
+# Size of the blocks used when the file has to be copied
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# ioctl request cloning a whole file (Linux, copy-on-write file systems such as Btrfs or XFS)
+FICLONE = 0x40049409
+
+# Placement methods, from the cheapest one
+PLACEMENT_METHODS = ('moved', 'linked', 'reflinked', 'copied')
+
+
+def reflink_file(source_path: str, target_path: str) -> None:
+    """
+    Creates `target_path` as a copy-on-write clone of `source_path` (no data is copied).
+
+    Raises:
+        OSError: If the platform or the file system does not support cloning.
+    """
+    if not sys.platform.startswith('linux'):
+        raise OSError("reflink is only supported on Linux")
+    import fcntl
+
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(target_path)
+            raise
+
+
+def copy_file_chunked(source_path: str, target_path: str, chunk_size: int = COPY_CHUNK_SIZE) -> None:
+    """
+    Copies a file in fixed-size blocks, so memory use does not depend on the file size.
+    """
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        shutil.copyfileobj(source, target, chunk_size)
+
+
+def place_file(source_path: str, target_path: str, move: bool = False) -> tuple:
+    """
+    Places a file at the target path using the cheapest method available.
+
+    The methods are tried in order:
+        1. Atomic move (`os.replace`) if `move` is `True` and both paths are on the same file system.
+        2. Hard link - the target shares the data with the source (same file system).
+        3. Reflink - a copy-on-write clone (Linux, e.g. Btrfs or XFS).
+        4. Chunked copy.
+
+    The file is first created under a temporary `<target>.part` name and then renamed, so the target path
+    never points to a partially written file and an existing target is replaced atomically.
+
+    Args:
+        source_path (str): The path of the file to place.
+        target_path (str): The destination path (including the file name).
+        move (bool, optional): Whether the source may be removed. If `True`, the source no longer exists
+            after a successful call, whichever method was used. Defaults to `False`.
+
+    Returns:
+        tuple: The method used (`'moved'`, `'linked'`, `'reflinked'` or `'copied'`) and the file size in bytes.
+
+    Raises:
+        OSError: If the file cannot be placed (e.g. the source is missing or the target is not writable).
+
+    Example:
+        >>> place_file("../tmp/recording/combined.mp4", "../default_save_folder/combined.mp4")
+        ('linked', 734003200)
+
+    Notes:
+        - A hard-linked target shares its data with the source; this is safe here because sources in
+          `../tmp/` are never modified, only deleted.
+        - Placing a file onto its own path raises `shutil.SameFileError`, like `shutil.copyfile`; a target that is
+          already a hard link of the source is left as it is.
+    """
+    if os.path.realpath(source_path) == os.path.realpath(target_path):
+        raise shutil.SameFileError(f"{source_path} and {target_path} are the same file")
+    size = os.path.getsize(source_path)
+
+    if not move and os.path.exists(target_path) and os.path.samefile(source_path, target_path):
+        return 'linked', size  # already hard-linked by an earlier call
+
+    if move:
+        try:
+            os.replace(source_path, target_path)
+            return 'moved', size
+        except OSError:
+            pass  # different file systems
+
+    part_path = f"{target_path}.part"
+    if os.path.exists(part_path):
+        os.remove(part_path)
+
+    method = 'copied'
+    try:
+        os.link(source_path, part_path)
+        method = 'linked'
+    except OSError:
+        try:
+            reflink_file(source_path, part_path)
+            method = 'reflinked'
+        except OSError:
+            copy_file_chunked(source_path, part_path)
+
+    os.replace(part_path, target_path)
+    if move:
+        os.remove(source_path)
+    return method, size
+
+
+def empty_placement_stats() -> dict:
+    """Returns placement statistics with zero files and bytes for every method."""
+    return {method: {'files': 0, 'bytes': 0} for method in PLACEMENT_METHODS}
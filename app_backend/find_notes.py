@@ -1,48 +1,38 @@
 import os
-import re
+
+from app_backend.note_index import NoteIndex
 
 
 def find_word_in_notes(directory_path: str, word: str) -> list[str]:
     """
     Searches for a specific word in all `.txt` files within a given directory.
 
-    This function scans each `.txt` file in the specified directory and checks if the
-    given word appears in the file's content. The search is case-insensitive and matches
-    whole words only (not substrings). If the word is found in a file, the filename is
-    added to the result list.
+    The search uses the local full-text index (`note_index.NoteIndex`) instead of reading the files: `.txt` files that
+    are new or changed since they were indexed are indexed first (unchanged files are only `stat`-ed), then the
+    index is queried. The search is case-insensitive and matches whole words only (not substrings). If the word is
+    found in a file, the filename is added to the result list.
 
     Args:
         directory_path (str): The path to the directory containing `.txt` files to search.
-        word (str): The word to search for within the files.
+        word (str): The word to search for within the files. Several words, `"phrases"` and `prefix*` words are
+                    also accepted (see `note_index.build_match_query`).
 
     Returns:
-        list: A list of filenames where the word was found.
+        list: A list of filenames where the word was found, best matches first.
 
     Notes:
         - If a file cannot be opened due to encoding or file access issues, an error message
           will be printed, and the file will be skipped.
-        - The function uses regular expressions to ensure whole-word matching.
+        - Diacritics are ignored (`budzet` finds `budżet`).
 
     Example:
         >>> find_word_in_notes('/path/to/directory', 'example')
         ['file1.txt', 'file2.txt']
     """
-    matching_files = []
-    pattern = r'\b' + re.escape(word) + r'\b'
-
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.txt'):
-            file_path = os.path.join(directory_path, filename)
-
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    for line in file:
-                        if re.search(pattern, line, re.IGNORECASE):
-                            matching_files.append(filename)
-                            break
-            except (UnicodeDecodeError, FileNotFoundError) as e:
-                print(f"Nie można otworzyć pliku {filename}: {e}")
-
-    return matching_files
-
-
+    index = NoteIndex()
+    index.update_directory(directory_path)
+    directory_path = os.path.abspath(directory_path)
+    return [
+        os.path.basename(note["txt_path"]) for note in index.search_notes(word, limit=-1)
+        if note["txt_path"] and os.path.dirname(note["txt_path"]) == directory_path
+    ]
@@ -0,0 +1,331 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Request Warning will not show up in console
+requests.packages.urllib3.disable_warnings()
+
+# Number of hosts with a kept connection pool (the application talks to a single server)
+POOL_CONNECTIONS = 4
+# Maximum number of kept-alive connections per host (should cover the number of parallel uploads)
+POOL_MAXSIZE = 8
+# (connect, read) timeouts in seconds
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Upload bandwidth cap in bytes per second (None - no limit)
+BANDWIDTH_LIMIT = None
+# Size of the blocks in which throttled request bodies are sent
+THROTTLE_BLOCK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE) -> requests.Session:
+    """
+    Creates an HTTP session with a keep-alive connection pool.
+
+    Connections (TCP + TLS) are reused between requests to the same host, so only the first request to the server
+    pays for the handshake. Up to `pool_maxsize` connections per host are kept open for parallel requests.
+
+    Args:
+        pool_connections (int, optional): The number of per-host pools to keep. Defaults to `POOL_CONNECTIONS`.
+        pool_maxsize (int, optional): The number of connections kept per host. Defaults to `POOL_MAXSIZE`.
+
+    Returns:
+        requests.Session: The configured session (`verify=False`, no automatic retries - failed uploads are
+                          handled by `retry_logic`).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0, pool_block=False)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = False
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the session shared by all server calls, creating it on first use (thread-safe).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def configure_session(pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE) -> requests.Session:
+    """
+    Replaces the shared session with one using the given pool sizes and closes the previous one.
+
+    Example:
+        >>> configure_session(pool_maxsize=16)  # e.g. before uploading with 16 threads
+    """
+    global _session
+    with _session_lock:
+        old_session, _session = _session, create_session(pool_connections, pool_maxsize)
+    if old_session is not None:
+        old_session.close()
+    return _session
+
+
+def close_session() -> None:
+    """Closes the shared session and its kept-alive connections (e.g. when the application exits)."""
+    global _session
+    with _session_lock:
+        old_session, _session = _session, None
+    if old_session is not None:
+        old_session.close()
+
+
+class BandwidthLimiter:
+    """
+    Token bucket limiting the total upload rate of all threads.
+
+    `consume(n)` blocks until `n` bytes may be sent. The bucket holds at most one second of traffic, so after an
+    idle period the rate briefly reaches at most twice the limit.
+    """
+
+    def __init__(self, bytes_per_second: float = None):
+        self.bytes_per_second = bytes_per_second
+        self.tokens = bytes_per_second or 0
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_limit(self, bytes_per_second: float = None) -> None:
+        """Changes the limit (None disables it); uploads in progress follow the new limit at once."""
+        with self.lock:
+            # Tokens are refilled at the old rate up to now - a bucket that was disabled does not start full
+            now = time.monotonic()
+            if self.bytes_per_second:
+                self.tokens = min(self.bytes_per_second, self.tokens + (now - self.timestamp) * self.bytes_per_second)
+            self.timestamp = now
+            self.bytes_per_second = bytes_per_second
+            self.tokens = min(self.tokens, bytes_per_second or 0)
+
+    def consume(self, byte_count: int) -> None:
+        """Blocks until `byte_count` bytes may be sent."""
+        while True:
+            with self.lock:
+                if not self.bytes_per_second:
+                    return
+                now = time.monotonic()
+                self.tokens = min(self.bytes_per_second, self.tokens + (now - self.timestamp) * self.bytes_per_second)
+                self.timestamp = now
+                # Blocks larger than the bucket are let through once the bucket is full
+                needed = min(byte_count, self.bytes_per_second)
+                if self.tokens >= needed:
+                    self.tokens -= byte_count
+                    return
+                wait = (needed - self.tokens) / self.bytes_per_second
+            time.sleep(wait)
+
+
+class ThrottledReader:
+    """
+    File-like request body that sends `data` through the bandwidth limiter, block by block.
+
+    `requests` takes the body length from `len()` and `http.client` sends the body by calling `read()`.
+    """
+
+    def __init__(self, data: bytes, limiter: BandwidthLimiter):
+        self.data = memoryview(data)
+        self.position = 0
+        self.limiter = limiter
+
+    def __len__(self) -> int:
+        return len(self.data) - self.position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self)
+        size = min(size, THROTTLE_BLOCK_SIZE, len(self))
+        block = self.data[self.position:self.position + size].tobytes()
+        self.position += size
+        self.limiter.consume(size)
+        return block
+
+
+class ThrottledMultipartFile:
+    """
+    File-like `multipart/form-data` request body that streams one file from disk through the bandwidth limiter.
+
+    The body is read block by block (at most `THROTTLE_BLOCK_SIZE` bytes) while it is sent, so the upload rate
+    stays at the limit for the whole request and the file is never loaded into memory. Pass it as `data=` with
+    the `Content-Type` header set to `content_type`.
+
+    Example:
+        >>> with ThrottledMultipartFile({"note_id": "12345"}, "file", "../tmp/rec/combined.mp4",
+        ...                             get_bandwidth_limiter()) as body:
+        ...     get_session().post(url, data=body, headers={"Content-Type": body.content_type})
+    """
+
+    def __init__(self, fields: dict, file_field: str, file_path: str, limiter: BandwidthLimiter, on_progress=None):
+        boundary = os.urandom(16).hex()
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        quote = lambda value: f"{value}".replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+        head = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{quote(name)}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        head += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{quote(file_field)}"; '
+            f'filename="{quote(os.path.basename(file_path))}"\r\nContent-Type: application/octet-stream\r\n\r\n'
+        )
+        self.head = head.encode('utf-8')
+        self.tail = f"\r\n--{boundary}--\r\n".encode('utf-8')
+        self.file = open(file_path, 'rb')
+        self.file_size = os.fstat(self.file.fileno()).st_size
+        self.position = 0
+        self.limiter = limiter
+        self.on_progress = on_progress
+
+    def __len__(self) -> int:
+        return len(self.head) + self.file_size + len(self.tail) - self.position
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self)
+        size = min(size, THROTTLE_BLOCK_SIZE, len(self))
+        file_end = len(self.head) + self.file_size
+        if self.position < len(self.head):
+            block = self.head[self.position:self.position + size]
+        elif self.position < file_end:
+            block = self.file.read(min(size, file_end - self.position))
+        else:
+            block = self.tail[self.position - file_end:self.position - file_end + size]
+        self.position += len(block)
+        self.limiter.consume(len(block))
+        if self.on_progress is not None and len(self.head) < self.position <= file_end:
+            self.on_progress(self.position - len(self.head), self.file_size)
+        return block
+
+    def close(self) -> None:
+        self.file.close()
+
+
+_bandwidth_limiter = BandwidthLimiter(BANDWIDTH_LIMIT)
+
+
+def get_bandwidth_limiter() -> BandwidthLimiter:
+    """Returns the limiter shared by all uploads."""
+    return _bandwidth_limiter
+
+
+def set_bandwidth_limit(bytes_per_second: float = None) -> None:
+    """
+    Caps the total upload rate of the application, e.g. `set_bandwidth_limit(512 * 1024)` for 512 KiB/s.
+    `None` removes the cap.
+    """
+    _bandwidth_limiter.set_limit(bytes_per_second)
+
+
+def throttled_body(data: bytes):
+    """Returns `data` wrapped in a `ThrottledReader`, or `data` itself when no bandwidth limit is set."""
+    if not _bandwidth_limiter.bytes_per_second:
+        return data
+    return ThrottledReader(data, _bandwidth_limiter)
+
+
+def benchmark(request_count: int = 30, payload_size: int = 200 * 1024) -> list:
+    """
+    Compares bare `requests.post` calls with the shared session against a local HTTPS stand-in server.
+
+    The stand-in server answers like `/api/upload_file` and counts accepted TCP connections, i.e. TLS handshakes.
+    A self-signed certificate is generated with the `openssl` command line tool.
+
+    Args:
+        request_count (int): Number of uploads per client (e.g. the keyframes of one note).
+        payload_size (int): Size of each uploaded file in bytes.
+
+    Returns:
+        list: One dictionary per client with `client`, `requests`, `handshakes` and `seconds`.
+    """
+    import json
+    import ssl
+    import subprocess
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class UploadHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = json.dumps({"message": "File on Server"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class CountingServer(ThreadingHTTPServer):
+        daemon_threads = True
+        connections = 0
+
+        def get_request(self):
+            request = super().get_request()
+            self.connections += 1
+            return request
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cert_path = os.path.join(tmp_dir, "cert.pem")
+        key_path = os.path.join(tmp_dir, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+             "-keyout", key_path, "-out", cert_path],
+            check=True, capture_output=True
+        )
+        file_path = os.path.join(tmp_dir, "frame.png")
+        with open(file_path, "wb") as file:
+            file.write(os.urandom(payload_size))
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+        server = CountingServer(("127.0.0.1", 0), UploadHandler)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"https://127.0.0.1:{server.server_address[1]}/api/upload_file"
+
+        try:
+            session = create_session()
+            for client, post in (("requests.post", requests.post), ("pooled session", session.post)):
+                server.connections = 0
+                start = time.perf_counter()
+                for _ in range(request_count):
+                    with open(file_path, "rb") as file:
+                        response = post(url, data={"note_id": "benchmark"}, files={"file": file}, verify=False,
+                                        timeout=TIMEOUT)
+                    response.raise_for_status()
+                seconds = time.perf_counter() - start
+                results.append({"client": client, "requests": request_count, "handshakes": server.connections,
+                                "seconds": seconds})
+            session.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+# Benchmark: python -m app_backend.http_client
+if __name__ == "__main__":
+    for result in benchmark():
+        print(f"{result['client']:>15}: {result['requests']} requests, {result['handshakes']} handshakes, "
+              f"{result['seconds']:.3f} s")
@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from app_backend.communication_with_www_server import get_notes_list_changes
+from app_backend.logging_f import log_communication_with_www_server
+
+# Local database with the list of notes (relative to app_front, like ../tmp and ../unsuccessful_uploads)
+CATALOG_PATH = "../note_catalog.db"
+
+# Columns shown in the note list, in the order of the server's JSON
+NOTE_COLUMNS = ("note_id", "datetime", "title", "language")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    note_id TEXT PRIMARY KEY,
+    datetime TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    language TEXT NOT NULL DEFAULT '',
+    on_server INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class NoteCatalog:
+    """
+    Local SQLite catalog of note metadata (ID, date, title, language).
+
+    The note list is shown from the catalog at once; the catalog is filled by `save_files` when a note is created
+    and synchronized with the server in the background (`sync_with_server`).
+
+    Example:
+        >>> catalog = NoteCatalog()
+        >>> catalog.add_note("5f4d2b", "2025-01-11 18:50:49", "Meeting", "en")
+        >>> catalog.list_notes()
+        [{'note_id': '5f4d2b', 'datetime': '2025-01-11 18:50:49', 'title': 'Meeting', 'language': 'en'}]
+    """
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        """
+        Opens a connection for one transaction (committed on success) and closes it; a connection per call lets
+        the catalog be used from any thread.
+        """
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def add_note(self, note_id: str, datetime: str, title: str, language: str = "", on_server: bool = False) -> None:
+        """Adds or updates a note."""
+        with self.lock, self.connect() as connection:
+            connection.execute(
+                """INSERT INTO notes (note_id, datetime, title, language, on_server, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(note_id) DO UPDATE SET datetime = excluded.datetime, title = excluded.title,
+                       language = excluded.language, on_server = MAX(on_server, excluded.on_server),
+                       updated_at = excluded.updated_at""",
+                (note_id, datetime, title, language, int(on_server), time.time())
+            )
+
+    def list_notes(self) -> list:
+        """Returns all notes, newest first, as dictionaries with `NOTE_COLUMNS` keys."""
+        with self.connect() as connection:
+            rows = connection.execute(
+                f"SELECT {', '.join(NOTE_COLUMNS)} FROM notes ORDER BY datetime DESC, note_id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_sync_state(self) -> dict:
+        with self.connect() as connection:
+            return {row["key"]: row["value"] for row in connection.execute("SELECT key, value FROM sync_state")}
+
+    def apply_server_notes(self, notes: list, deleted: list = (), is_full_list: bool = True, sync_state: dict = None) -> dict:
+        """
+        Applies a note list received from the server and returns what changed.
+
+        Args:
+            notes (list): Notes from the server (dictionaries with at least `note_id`).
+            deleted (list, optional): IDs of notes deleted on the server (incremental sync).
+            is_full_list (bool, optional): Whether `notes` is the complete list - then notes known from the server
+                but missing from it are removed. Notes only saved locally are kept (their upload may be pending).
+            sync_state (dict, optional): Synchronization state to store together with the changes
+                (`etag`, `last_modified`, `cursor`).
+
+        Returns:
+            dict: `{'added': [note, ...], 'updated': [note, ...], 'removed': [note_id, ...]}`, notes as dictionaries
+                  with `NOTE_COLUMNS` keys.
+        """
+        diff = {'added': [], 'updated': [], 'removed': []}
+        now = time.time()
+        with self.lock, self.connect() as connection:
+            current = {row["note_id"]: dict(row) for row in connection.execute("SELECT * FROM notes")}
+            received = set()
+            for note in notes:
+                old_row = current.get(f"{note['note_id']}")
+                # Columns missing from the server's list (e.g. language) keep their local value
+                row = {
+                    column: f"{note[column]}" if column in note else old_row[column] if old_row else ""
+                    for column in NOTE_COLUMNS
+                }
+                received.add(row["note_id"])
+                if old_row is None:
+                    diff['added'].append(row)
+                elif any(old_row[column] != row[column] for column in NOTE_COLUMNS):
+                    diff['updated'].append(row)
+                elif old_row["on_server"]:
+                    continue
+                connection.execute(
+                    """INSERT OR REPLACE INTO notes (note_id, datetime, title, language, on_server, updated_at)
+                       VALUES (?, ?, ?, ?, 1, ?)""",
+                    (*(row[column] for column in NOTE_COLUMNS), now)
+                )
+
+            removed = set(deleted)
+            if is_full_list:
+                removed |= {note_id for note_id, row in current.items() if row["on_server"] and note_id not in received}
+            for note_id in removed:
+                if note_id in current:
+                    connection.execute("DELETE FROM notes WHERE note_id = ?", (note_id,))
+                    diff['removed'].append(note_id)
+
+            for key, value in (sync_state or {}).items():
+                connection.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+        return diff
+
+    def sync_with_server(self):
+        """
+        Fetches changes of the note list from the server and applies them.
+
+        The request is conditional: the stored `ETag` / `Last-Modified` are sent as `If-None-Match` /
+        `If-Modified-Since`, and the stored cursor as `since` if the server supports incremental lists.
+
+        Returns:
+            dict | None: The changes (see `apply_server_notes`), an empty diff if nothing changed,
+                         or `None` if the server could not be reached.
+        """
+        state = self.get_sync_state()
+        changes = get_notes_list_changes(etag=state.get("etag"), last_modified=state.get("last_modified"),
+                                         cursor=state.get("cursor"))
+        if changes is None:
+            return None
+        if changes["not_modified"]:
+            return {'added': [], 'updated': [], 'removed': []}
+        try:
+            return self.apply_server_notes(
+                changes["notes"],
+                deleted=changes["deleted"],
+                is_full_list=not changes["incremental"],
+                sync_state={key: changes[key] for key in ("etag", "last_modified", "cursor") if changes.get(key)}
+            )
+        except Exception as e:
+            log_communication_with_www_server(f"For NoteCatalog.sync_with_server() - Error: {e}\n")
+            return None
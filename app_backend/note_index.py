@@ -0,0 +1,389 @@
+import bisect
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app_backend.note_model import Note, format_timestamp
+
+# Local full-text index of notes (relative to app_front, like ../note_catalog.db)
+INDEX_PATH = "../note_index.db"
+
+# Number of search results returned by default
+SEARCH_LIMIT = 50
+# Snippets of search results: markers around matched words and the maximum number of words
+SNIPPET_START = '«'
+SNIPPET_END = '»'
+SNIPPET_ELLIPSIS = '…'
+SNIPPET_WORDS = 12
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_notes (
+    note_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    datetime TEXT NOT NULL DEFAULT '',
+    txt_path TEXT UNIQUE,
+    mtime_ns INTEGER,
+    size INTEGER
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    note_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    speaker TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL DEFAULT 'text',
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_note_id ON segments (note_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text,
+    content = 'segments',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS segments_insert AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_delete AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+# Lines of a .txt note (see create_files.render_txt_file)
+TXT_SPEAKER_LINE = re.compile(r'^\[(\d+):(\d{2}):(\d{2})\] (.*):$')
+TXT_TEXT_LINE = re.compile(r'^\[(\d+):(\d{2}):(\d{2})\] (.*)$')
+TXT_TITLE_LINE = re.compile(r'^(?:Tytuł|Title): (.*)$')
+TXT_SUMMARY_LINE = re.compile(r'^(?:Podsumowanie|Summary):$')
+# Words and "quoted phrases" of a search query
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def note_segments(note: Note, ocr_texts: list = ()) -> list:
+    """
+    Splits a note into searchable segments: the title and summary, every text entry with its timestamp and the
+    speaker talking at that time, and the text recognized on keyframes.
+
+    Args:
+        note (Note): The note built by `build_note`.
+        ocr_texts (list, optional): Text of keyframes as dictionaries with `timestamp` and `value`
+            (see `image_files_analyze.keyframes_text`).
+
+    Returns:
+        list: Tuples `(text, timestamp, speaker, kind)` with kind `'title'`, `'summary'`, `'text'` or `'ocr'`.
+    """
+    segments = [(value, 0, "", kind) for value, kind in ((note.title, 'title'), (note.summary, 'summary')) if value.strip()]
+    speaker = ""
+    speaker_changes = []
+    for entry in note.entries:
+        if entry.type == 'speaker':
+            speaker = entry.value
+            speaker_changes.append((entry.timestamp, entry.value))
+        elif entry.type == 'text' and entry.value.strip():
+            segments.append((entry.value, entry.timestamp, speaker, 'text'))
+
+    # A keyframe gets the speaker talking when it was shown (entries are sorted by timestamp)
+    change_times = [timestamp for timestamp, _ in speaker_changes]
+    for ocr_text in ocr_texts:
+        if not ocr_text["value"].strip():
+            continue
+        i = bisect.bisect_right(change_times, ocr_text["timestamp"]) - 1
+        segments.append((ocr_text["value"], ocr_text["timestamp"], speaker_changes[i][1] if i >= 0 else "", 'ocr'))
+    return segments
+
+
+def txt_note_segments(txt_path: str) -> tuple:
+    """
+    Reads the title and segments of a .txt note written by `render_txt_file` (for notes created before the index).
+
+    Returns:
+        tuple: The title and a list of segments as in `note_segments`.
+    """
+    title = ""
+    segments = []
+    speaker = ""
+    summary_lines = None
+    is_in_summary = False
+    with open(txt_path, 'r', encoding='utf-8') as txt_file:
+        for line in txt_file:
+            line = line.rstrip('\n')
+            if is_in_summary:
+                # The summary lasts until the first empty line
+                if line:
+                    summary_lines.append(line)
+                    continue
+                is_in_summary = False
+                if summary_lines:
+                    segments.append(("\n".join(summary_lines), 0, "", 'summary'))
+            elif not title and (match := TXT_TITLE_LINE.match(line)):
+                title = match.group(1)
+                segments.append((title, 0, "", 'title'))
+            elif summary_lines is None and TXT_SUMMARY_LINE.match(line):
+                summary_lines = []
+                is_in_summary = True
+            elif match := TXT_SPEAKER_LINE.match(line):
+                speaker = match.group(4)
+            elif match := TXT_TEXT_LINE.match(line):
+                hours, minutes, seconds = (int(match.group(i)) for i in (1, 2, 3))
+                segments.append((match.group(4), hours * 3600 + minutes * 60 + seconds, speaker, 'text'))
+            elif line.strip():
+                # Lines without a timestamp (e.g. a .txt file edited or written by hand)
+                segments.append((line, 0, speaker, 'text'))
+    return title, segments
+
+
+def build_match_query(query: str):
+    """
+    Converts a search query typed by the user into an FTS5 MATCH expression.
+
+    Words must all occur (in any order), `"quoted words"` must occur as a phrase and a word ending with `*` matches
+    any word starting with it. Special characters are quoted, so any input is a valid expression.
+
+    Example:
+        >>> build_match_query('budżet "plan sprzedaży" kwart*')
+        '"budżet" "plan sprzedaży" "kwart"*'
+
+    Returns:
+        str | None: The expression, or `None` for an empty query.
+    """
+    terms = []
+    for phrase, word in QUERY_TOKEN.findall(query):
+        if phrase.strip():
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        elif word:
+            is_prefix = word.endswith('*')
+            word = word.rstrip('*').replace('"', '""')
+            if word:
+                terms.append(f'"{word}"' + ('*' if is_prefix else ''))
+    return ' '.join(terms) or None
+
+
+class NoteIndex:
+    """
+    Incremental full-text index of note contents (SQLite FTS5, BM25 ranking).
+
+    Segments are stored in a regular table (indexed by note ID, so a note is replaced without scanning the index)
+    and the FTS5 table `segments_fts` indexes their text as external content, kept up to date by triggers.
+
+    Each indexed segment keeps the note ID, the timestamp and the speaker, so a search answers with positions in
+    notes (and snippets of the matching text) without opening any note files. Besides the transcript, the text
+    recognized on keyframes (OCR) is indexed at the time the keyframe was shown. Notes are added by `save_files`;
+    .txt notes created earlier are indexed by `update_directory`.
+
+    Example:
+        >>> index = NoteIndex()
+        >>> index.search('"plan sprzedaży"')
+        [{'note_id': '5f4d2b', 'title': 'Meeting', 'timestamp': 754, 'timestamp_str': '[00:12:34]',
+          'speaker': 'SPEAKER_01', 'text': 'Omówmy plan sprzedaży na przyszły kwartał',
+          'snippet': 'Omówmy «plan» «sprzedaży» na przyszły kwartał', 'kind': 'text', 'score': -3.2}]
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self):
+        """Opens a connection for one transaction (committed on success) and closes it."""
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _replace_note(self, connection, note_id, title, datetime, txt_path, segments):
+        if txt_path is not None:
+            txt_path = os.path.abspath(txt_path)
+        connection.execute("DELETE FROM segments WHERE note_id = ?", (note_id,))
+        if txt_path is not None:
+            connection.execute("DELETE FROM indexed_notes WHERE txt_path = ? AND note_id != ?", (txt_path, note_id))
+        stat = os.stat(txt_path) if txt_path is not None and os.path.exists(txt_path) else None
+        connection.execute(
+            "INSERT OR REPLACE INTO indexed_notes (note_id, title, datetime, txt_path, mtime_ns, size) VALUES (?, ?, ?, ?, ?, ?)",
+            (note_id, title, datetime, txt_path, stat.st_mtime_ns if stat else None, stat.st_size if stat else None)
+        )
+        connection.executemany(
+            "INSERT INTO segments (text, note_id, timestamp, speaker, kind) VALUES (?, ?, ?, ?, ?)",
+            ((text, note_id, timestamp, speaker, kind) for text, timestamp, speaker, kind in segments)
+        )
+
+    def add_note(self, note: Note, txt_path: str = None, ocr_texts: list = ()) -> None:
+        """
+        Indexes a note (replacing its previous version).
+
+        Args:
+            note (Note): The note built by `build_note`.
+            txt_path (str, optional): The path of the note's .txt file in the user directory, so `update_directory`
+                does not index the file again.
+            ocr_texts (list, optional): Text recognized on the keyframes of the note (see `note_segments`).
+        """
+        segments = note_segments(note, ocr_texts)
+        with self.lock, self.connect() as connection:
+            self._replace_note(connection, note.note_id, note.title, note.datetime, txt_path, segments)
+
+    def remove_note(self, note_id: str) -> None:
+        with self.lock, self.connect() as connection:
+            connection.execute("DELETE FROM segments WHERE note_id = ?", (note_id,))
+            connection.execute("DELETE FROM indexed_notes WHERE note_id = ?", (note_id,))
+
+    def update_directory(self, directory_path: str) -> int:
+        """
+        Indexes .txt notes in a directory that are new or changed since they were indexed (by size and modification
+        time - unchanged files are not read). Notes whose .txt file was deleted are removed from the index.
+
+        Returns:
+            int: The number of (re)indexed files.
+        """
+        directory_path = os.path.abspath(directory_path)
+        with self.connect() as connection:
+            known = {
+                row["txt_path"]: (row["note_id"], row["mtime_ns"], row["size"])
+                for row in connection.execute(
+                    "SELECT note_id, txt_path, mtime_ns, size FROM indexed_notes WHERE txt_path LIKE ?",
+                    (os.path.join(directory_path, '%'),)
+                )
+            }
+
+        changed = []
+        present = set()
+        for entry in os.scandir(directory_path):
+            if not entry.name.endswith('.txt') or not entry.is_file():
+                continue
+            present.add(entry.path)
+            stat = entry.stat()
+            note_id, mtime_ns, size = known.get(entry.path, (None, None, None))
+            if mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+                changed.append((entry.path, note_id or f"txt:{entry.path}"))
+
+        for txt_path, note_id in changed:
+            try:
+                title, segments = txt_note_segments(txt_path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Nie można otworzyć pliku {txt_path}: {e}")
+                continue
+            with self.lock, self.connect() as connection:
+                self._replace_note(connection, note_id, title, "", txt_path, segments)
+
+        for txt_path, (note_id, _, _) in known.items():
+            if txt_path not in present and os.path.dirname(txt_path) == directory_path:
+                self.remove_note(note_id)
+        return len(changed)
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT, note_ids: list = None) -> list:
+        """
+        Finds note segments matching a query, best matches (BM25) first.
+
+        Args:
+            query (str): Words, `"phrases"` and `prefix*` words (see `build_match_query`); case and Polish
+                diacritics are ignored.
+            limit (int, optional): The maximum number of results. Defaults to `SEARCH_LIMIT`.
+            note_ids (list, optional): Restricts the search to these notes.
+
+        Returns:
+            list: Dictionaries with `note_id`, `title` (of the note), `timestamp` (seconds), `timestamp_str`
+                  (`[HH:MM:SS]`), `speaker`, `text`, `snippet` (at most `SNIPPET_WORDS` words around the match,
+                  matched words between `SNIPPET_START` and `SNIPPET_END`), `kind` (`'title'`, `'summary'`,
+                  `'text'` or `'ocr'`) and `score` (lower is better).
+        """
+        match_query = build_match_query(query)
+        if match_query is None:
+            return []
+        sql = """SELECT s.note_id, COALESCE(n.title, '') AS title, s.timestamp, s.speaker, s.text,
+                        snippet(segments_fts, 0, ?, ?, ?, ?) AS snippet, s.kind, bm25(segments_fts) AS score
+                 FROM segments_fts JOIN segments AS s ON s.id = segments_fts.rowid
+                 LEFT JOIN indexed_notes AS n ON n.note_id = s.note_id
+                 WHERE segments_fts MATCH ?"""
+        params = [SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_WORDS, match_query]
+        if note_ids is not None:
+            sql += f" AND s.note_id IN ({', '.join('?' * len(note_ids))})"
+            params.extend(note_ids)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        with self.connect() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return [dict(row, timestamp_str=format_timestamp(row["timestamp"])) for row in rows]
+
+    def search_notes(self, query: str, limit: int = SEARCH_LIMIT) -> list:
+        """
+        Finds notes containing a query, ranked by their best matching segment.
+
+        Returns:
+            list: Dictionaries with `note_id`, `title`, `datetime`, `txt_path`, `hits` (number of matching segments)
+                  and `score`.
+        """
+        match_query = build_match_query(query)
+        if match_query is None:
+            return []
+        with self.connect() as connection:
+            rows = connection.execute(
+                """WITH matches AS MATERIALIZED (
+                       SELECT s.note_id, bm25(segments_fts) AS score
+                       FROM segments_fts JOIN segments AS s ON s.id = segments_fts.rowid
+                       WHERE segments_fts MATCH ?
+                   )
+                   SELECT n.note_id, n.title, n.datetime, n.txt_path, COUNT(*) AS hits, MIN(matches.score) AS score
+                   FROM matches JOIN indexed_notes AS n ON n.note_id = matches.note_id
+                   GROUP BY n.note_id
+                   ORDER BY score LIMIT ?""",
+                (match_query, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def benchmark(note_count: int = 1000, segments_per_note: int = 200) -> dict:
+    """
+    Compares the index with scanning .txt files (the previous `find_word_in_notes`) on generated notes.
+
+    Returns:
+        dict: `notes`, `index_seconds` (building the index), `scan_ms` and `search_ms` (one query).
+    """
+    import tempfile
+    import time
+
+    from app_backend.note_model import build_note
+
+    words = ["budżet", "sprzedaż", "kwartał", "projekt", "termin", "klient", "raport", "zespół", "wdrożenie", "plan"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = NoteIndex(os.path.join(tmp_dir, "index.db"))
+        start = time.perf_counter()
+        for n in range(note_count):
+            content = []
+            for i in range(segments_per_note):
+                if i % 10 == 0:
+                    content.append({'type': 'speaker', 'timestamp': i * 5, 'name': f'SPEAKER_{i % 3:02}'})
+                sentence = ' '.join(words[(n * 7 + i * j) % len(words)] for j in range(1, 9))
+                content.append({'type': 'text', 'timestamp': i * 5, 'value': f'{sentence} {n}x{i}'})
+            note = build_note(f"Note {n}", "", content, note_id=f"{n:08}")
+            txt_path = os.path.join(tmp_dir, f"{n}.txt")
+            with open(txt_path, 'w', encoding='utf-8') as txt_file:
+                for entry in note.entries:
+                    txt_file.write(f"{entry.timestamp_str} {entry.value}\n")
+            index.add_note(note, txt_path)
+        index_seconds = time.perf_counter() - start
+
+        needle = f"{note_count - 1}x{segments_per_note - 1}"
+        start = time.perf_counter()
+        pattern = re.compile(r'\b' + re.escape(needle) + r'\b', re.IGNORECASE)
+        found = []
+        for filename in os.listdir(tmp_dir):
+            if filename.endswith('.txt'):
+                with open(os.path.join(tmp_dir, filename), 'r', encoding='utf-8') as file:
+                    if any(pattern.search(line) for line in file):
+                        found.append(filename)
+        scan_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        hits = index.search(needle)
+        search_ms = (time.perf_counter() - start) * 1000
+        assert len(found) == 1 and len(hits) == 1
+    return {'notes': note_count, 'index_seconds': index_seconds, 'scan_ms': scan_ms, 'search_ms': search_ms}
+
+
+# Benchmark: python -m app_backend.note_index
+if __name__ == "__main__":
+    print(benchmark())
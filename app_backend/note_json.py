@@ -0,0 +1,264 @@
+import gzip
+import io
+import json
+
+from app_backend.logging_f import log_file_creation
+from app_backend.note_model import Note, format_timestamp
+
+# Version of the compact note format; version 1 is the schema described in docs/json_file_doc.json
+NOTE_JSON_VERSION = 2
+NOTE_JSON_FORMAT = "io-note"
+
+# One character per content element in the `type` column
+TYPE_CODES = {'img': 'i', 'speaker': 's', 'text': 't'}
+CODE_TYPES = {'i': 'img', 's': 'speaker', 't': 'txt'}
+
+# File name suffixes of the supported compressions
+COMPRESSION_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Number of content elements serialized per write in the streaming writer
+WRITE_BATCH = 1000
+
+
+def parse_timestamp(timestamp_str: str) -> int:
+    """
+    Converts a `[HH:MM:SS]` timestamp string back into seconds (the inverse of `format_timestamp`).
+    """
+    hours, minutes, seconds = timestamp_str.strip('[]').split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def compression_for_path(file_path: str) -> str:
+    """
+    Returns the compression implied by the file name (`'gzip'` for `.gz`, `'zstd'` for `.zst`, otherwise None).
+    """
+    for suffix, compression in COMPRESSION_SUFFIXES.items():
+        if file_path.endswith(suffix):
+            return compression
+    return None
+
+
+def open_note_file(file_path: str, mode: str, compression: str = None):
+    """
+    Opens a note JSON file as a UTF-8 text stream, optionally compressed.
+
+    Args:
+        file_path (str): The path to the file.
+        mode (str): `'w'` to write or `'r'` to read.
+        compression (str, optional): `None`, `'gzip'` or `'zstd'`. When reading, the compression is detected
+            from the file's magic bytes and this argument is ignored.
+
+    Returns:
+        io.TextIOBase: A text stream; closing it closes the underlying file.
+
+    Notes:
+        - zstd requires the optional `zstandard` package; an `ImportError` is raised if it is missing.
+    """
+    if mode == 'r':
+        with open(file_path, 'rb') as raw_file:
+            magic = raw_file.read(4)
+        compression = None
+        if magic.startswith(GZIP_MAGIC):
+            compression = 'gzip'
+        elif magic == ZSTD_MAGIC:
+            compression = 'zstd'
+
+    if compression == 'gzip':
+        return gzip.open(file_path, f'{mode}t', encoding='utf-8')
+    if compression == 'zstd':
+        import zstandard
+
+        raw_file = open(file_path, f'{mode}b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=10).stream_writer(raw_file)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw_file)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(file_path, mode, encoding='utf-8')
+
+
+def write_compact_note(note: Note, file_path: str, compression: str = None) -> bool:
+    """
+    Writes a note in the compact, versioned JSON format (version 2), streaming it to the file.
+
+    Compared with version 1 the content is columnar: a `type` string with one character per element
+    (`i` image, `s` speaker, `t` text), integer `timestamp` seconds and a `val` column in which speakers are
+    indexes into the `speakers` table and images are file names. Repeated keys and `[HH:MM:SS]` strings
+    are gone, and the output can additionally be gzip or zstd compressed.
+
+    Args:
+        note (Note): The note built by `build_note`.
+        file_path (str): The path of the output file.
+        compression (str, optional): `None`, `'gzip'` or `'zstd'`. Defaults to the compression implied by
+            the file name (`.gz`, `.zst`).
+
+    Returns:
+        bool: `True` if the file is successfully created, otherwise `False`.
+
+    JSON Structure:
+        ```json
+        {
+            "format": "io-note",
+            "version": 2,
+            "note_id": "...", "title": "...", "datetime": "...", "summary": "...", "language": "pl",
+            "video": "...", "docx": "...", "txt": "...",
+            "speakers": ["SPEAKER_00", "SPEAKER_01"],
+            "content": {
+                "type": "ist",
+                "timestamp": [0, 3, 3],
+                "val": ["0.png", 0, "text"]
+            }
+        }
+        ```
+
+    Behavior on Error:
+        - Logs error details with `log_file_creation` and returns `False`.
+
+    Notes:
+        - Elements are serialized in batches of `WRITE_BATCH`, so the whole document is never held in memory.
+        - `read_note` reads both this format and version 1.
+    """
+    if compression is None:
+        compression = compression_for_path(file_path)
+    speaker_index = {name: i for i, name in enumerate(note.speakers)}
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def write_column(json_file, values):
+        json_file.write('[')
+        batch = []
+        first = True
+        for value in values:
+            batch.append(value)
+            if len(batch) == WRITE_BATCH:
+                json_file.write(('' if first else ',') + dumps(batch)[1:-1])
+                batch = []
+                first = False
+        if batch:
+            json_file.write(('' if first else ',') + dumps(batch)[1:-1])
+        json_file.write(']')
+
+    try:
+        with open_note_file(file_path, 'w', compression) as json_file:
+            header = {
+                "format": NOTE_JSON_FORMAT,
+                "version": NOTE_JSON_VERSION,
+                "note_id": note.note_id,
+                "title": note.title,
+                "datetime": note.datetime,
+                "summary": note.summary,
+                "language": note.language,
+                "video": note.video,
+                "docx": note.docx,
+                "txt": note.txt,
+                "speakers": list(note.speakers)
+            }
+            json_file.write(dumps(header)[:-1])
+            json_file.write(',"content":{"type":')
+            json_file.write(dumps(''.join(TYPE_CODES[entry.type] for entry in note.entries)))
+            json_file.write(',"timestamp":')
+            write_column(json_file, (entry.timestamp for entry in note.entries))
+            json_file.write(',"val":')
+            write_column(json_file, (
+                entry.file_name if entry.type == 'img'
+                else speaker_index[entry.value] if entry.type == 'speaker'
+                else entry.value
+                for entry in note.entries
+            ))
+            json_file.write('}}')
+        return True
+    except Exception as e:
+        log_file_creation(f"For write_compact_note() - Error: {e}\n")
+        return False
+
+
+class NoteReader:
+    """
+    Read-only view of a note JSON file in version 1 or version 2 (compact) format.
+
+    The whole file is parsed when it is opened (`json.load`); for version 2 the parsed content stays in its
+    compact columnar form (three lists instead of one dictionary per element). Content elements are only
+    expanded into the version 1 form when iterated (`iter_content`), one at a time:
+    `{"type": ..., "val": ..., "timestamp_str": "[HH:MM:SS]"}` (plus integer `timestamp`). Metadata is
+    available as attributes (`reader.title`, `reader.note_id`, ...).
+
+    Example:
+        >>> note = read_note("../default_save_folder/5f4d2b.json.gz")
+        >>> note.title, len(note)
+        ('Meeting', 1532)
+        >>> next(note.iter_content())
+        {'type': 'img', 'val': '0.png', 'timestamp_str': '[00:00:00]', 'timestamp': 0}
+    """
+
+    METADATA_KEYS = ("note_id", "title", "datetime", "summary", "language", "video", "docx", "txt")
+
+    def __init__(self, data: dict):
+        self.version = data.get("version", 1)
+        for key in self.METADATA_KEYS:
+            setattr(self, key, data.get(key, ""))
+        self._data = data
+
+    def __len__(self) -> int:
+        content = self._data.get("content", [])
+        if self.version >= 2:
+            return len(content.get("type", ""))
+        return len(content)
+
+    @property
+    def speakers(self) -> list:
+        """The speaker table (in version 1 built from the content)."""
+        if self.version >= 2:
+            return list(self._data.get("speakers", []))
+        return list(dict.fromkeys(c["val"] for c in self._data.get("content", []) if c["type"] == "speaker"))
+
+    def iter_content(self):
+        """Yields content elements in the version 1 form, expanding the parsed columns one element at a time."""
+        content = self._data.get("content", [])
+        if self.version < 2:
+            for element in content:
+                yield dict(element, timestamp=parse_timestamp(element["timestamp_str"]))
+            return
+
+        speakers = self._data.get("speakers", [])
+        timestamps_str = {}
+        for code, timestamp, value in zip(content["type"], content["timestamp"], content["val"]):
+            timestamp_str = timestamps_str.get(timestamp)
+            if timestamp_str is None:
+                timestamp_str = timestamps_str[timestamp] = format_timestamp(timestamp)
+            yield {
+                "type": CODE_TYPES[code],
+                "val": speakers[value] if code == 's' else value,
+                "timestamp_str": timestamp_str,
+                "timestamp": timestamp
+            }
+
+    def to_v1(self) -> dict:
+        """Returns the note as a dictionary in the version 1 schema (`docs/json_file_doc.json`)."""
+        data = {key: getattr(self, key) for key in self.METADATA_KEYS}
+        data["content"] = [
+            {"type": c["type"], "val": c["val"], "timestamp_str": c["timestamp_str"]}
+            for c in self.iter_content()
+        ]
+        return data
+
+
+def read_note(file_path: str) -> NoteReader:
+    """
+    Opens a note JSON file (version 1 or 2, plain, gzip or zstd compressed).
+
+    The file is decompressed and parsed completely; only the expansion of the content into version 1
+    elements is deferred (see `NoteReader`).
+
+    Args:
+        file_path (str): The path to the note file.
+
+    Returns:
+        NoteReader: The parsed note with lazily expanded content.
+
+    Raises:
+        OSError, ValueError: If the file cannot be read or is not valid JSON.
+    """
+    with open_note_file(file_path, 'r') as json_file:
+        return NoteReader(json.load(json_file))
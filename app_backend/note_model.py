@@ -0,0 +1,151 @@
+import os
+import sys
+from typing import NamedTuple
+
+
+def format_timestamp(seconds: int) -> str:
+    """
+    Converts a time duration in seconds into a formatted timestamp string.
+
+    This function takes an integer value representing a time duration in seconds and converts it
+    into a human-readable timestamp in the format `[HH:MM:SS]`.
+
+    Args:
+        seconds (int): The time duration in seconds to format.
+
+    Returns:
+        str: A formatted string representing the time duration in `[HH:MM:SS]` format,
+             where `HH` is hours, `MM` is minutes, and `SS` is seconds, all zero-padded to two digits.
+
+    Example:
+        >>> format_timestamp(3661)
+        '[01:01:01]'
+
+        >>> format_timestamp(45)
+        '[00:00:45]'
+
+    Notes:
+        - Handles durations longer than 24 hours (e.g., 90000 seconds -> '[25:00:00]').
+        - The input should be a non-negative integer. Negative values may result in unexpected output.
+    """
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    seconds = seconds % 60
+
+    return f"[{hours:02}:{minutes:02}:{seconds:02}]"
+
+
+class NoteEntry(NamedTuple):
+    """
+    A single, already formatted element of a note's content.
+
+    Attributes:
+        type (str): The type of the element (`'img'`, `'speaker'` or `'text'`).
+        timestamp (int): The timestamp in seconds.
+        timestamp_str (str): The timestamp formatted once as `[HH:MM:SS]`.
+        value (str): The image file path, the (interned) speaker name or the text content.
+    """
+    type: str
+    timestamp: int
+    timestamp_str: str
+    value: str
+
+    @property
+    def file_name(self) -> str:
+        """The base name of the image file (for `'img'` entries)."""
+        return os.path.basename(self.value)
+
+
+class Note(NamedTuple):
+    """
+    Intermediate note representation shared by all file renderers (DOCX, TXT, JSON).
+
+    The note is built once by `build_note` and is immutable, so renderers can safely run in parallel.
+    """
+    note_id: str
+    title: str
+    summary: str
+    datetime: str
+    language: str
+    video: str
+    docx: str
+    txt: str
+    entries: tuple
+    speakers: tuple
+
+
+# Keys holding the value of each content type in the note content dictionaries
+VALUE_KEYS = {'img': 'file_path', 'speaker': 'name', 'text': 'value'}
+
+
+def build_note(
+    note_title: str,
+    note_summary: str,
+    note_content: list,
+    note_datetime: str = "",
+    note_id: str = "",
+    video_file_name: str = "",
+    docx_file_name: str = "",
+    txt_file_name: str = "",
+    language: str = 'pl'
+) -> Note:
+    """
+    Builds the intermediate note representation from note content dictionaries in a single pass.
+
+    Every timestamp is formatted once (repeated timestamps reuse the formatted string) and speaker names are
+    interned, so a speaker name is stored once no matter how many times the speaker appears.
+
+    Args:
+        note_title (str): The title of the note.
+        note_summary (str): A summary of the note.
+        note_content (list): A sorted list of content elements (see `sort_note_content`). Each element is a
+            dictionary with `type`, `timestamp` and `file_path` (img), `name` (speaker) or `value` (text).
+        note_datetime (str, optional): The date and time of the note.
+        note_id (str, optional): The unique identifier of the note.
+        video_file_name (str, optional): The name of the associated video file.
+        docx_file_name (str, optional): The name of the associated DOCX file.
+        txt_file_name (str, optional): The name of the associated TXT file.
+        language (str, optional): The language of the note (`'pl'` or `'en'`). Defaults to `'pl'`.
+
+    Returns:
+        Note: The immutable note representation.
+
+    Example:
+        >>> note = build_note("Meeting", "Summary", [{'type': 'speaker', 'timestamp': 61, 'name': 'Alice'}])
+        >>> note.entries[0]
+        NoteEntry(type='speaker', timestamp=61, timestamp_str='[00:01:01]', value='Alice')
+
+    Notes:
+        - Elements of unsupported types are skipped.
+    """
+    timestamps = {}
+    speakers = {}
+    entries = []
+    for content in note_content:
+        value_key = VALUE_KEYS.get(content['type'])
+        if value_key is None:
+            continue
+
+        timestamp = content['timestamp']
+        timestamp_str = timestamps.get(timestamp)
+        if timestamp_str is None:
+            timestamp_str = timestamps[timestamp] = format_timestamp(timestamp)
+
+        value = f"{content[value_key]}"
+        if content['type'] == 'speaker':
+            value = speakers.setdefault(value, sys.intern(value))
+
+        entries.append(NoteEntry(content['type'], timestamp, timestamp_str, value))
+
+    return Note(
+        note_id=note_id,
+        title=note_title,
+        summary=note_summary,
+        datetime=note_datetime,
+        language=language,
+        video=video_file_name,
+        docx=docx_file_name,
+        txt=txt_file_name,
+        entries=tuple(entries),
+        speakers=tuple(speakers.values())
+    )
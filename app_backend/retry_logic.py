@@ -1,7 +1,15 @@
 import json
 import os
 import shutil
+import threading
+from app_backend.artifact_manifest import files_to_upload
 from app_backend.communication_with_www_server import upload_file_on_server
+from app_backend.file_placement import place_file
+
+# Uploads run in parallel threads (upload_engine), so updates of failed_files.json are serialized
+failed_files_lock = threading.Lock()
+# send_failed_files is started at application start and on every refresh - only one retry runs at a time
+_send_failed_files_lock = threading.Lock()
 
 def check_and_create_unsuccessful_uploads_folder():
     """
@@ -53,9 +61,10 @@ def save_unsuccessful_upload(note_id: str, file_path: str) -> None:
 
     Notes:
         - If the JSON file already contains an entry for the specified note ID,
-          the new file is appended to the existing entry.
+          the new file is appended to the existing entry (unless the file is already listed).
         - If the file is already located at the target path, it will silently skip copying.
         - If the `../unsuccessful_uploads` or subdirectories do not exist, they are created automatically.
+        - Safe to call from several upload threads at once (`failed_files_lock`).
 
     Exceptions:
         - Silently handles `shutil.SameFileError` if the source and destination file paths are the same.
@@ -63,48 +72,52 @@ def save_unsuccessful_upload(note_id: str, file_path: str) -> None:
     Example:
         >>> save_unsuccessful_upload("80dd89ff24bd287237c31639ed6eff5b6a7e854a9e0b2b919598d1798bccf5bd", "example.txt")
     """
-    check_and_create_unsuccessful_uploads_folder()
-    dir_for_unsuccessful_uploads = '../unsuccessful_uploads'
-    fail_file_name = os.path.basename(file_path)
-    try:
-        if not os.path.exists(f'{dir_for_unsuccessful_uploads}/{note_id}'):
-            os.mkdir(f'{dir_for_unsuccessful_uploads}/{note_id}')
-        shutil.copyfile(file_path, f'{dir_for_unsuccessful_uploads}/{note_id}/{fail_file_name}')
-    except shutil.SameFileError as e:
-        pass
+    with failed_files_lock:
+        check_and_create_unsuccessful_uploads_folder()
+        dir_for_unsuccessful_uploads = '../unsuccessful_uploads'
+        fail_file_name = os.path.basename(file_path)
+        try:
+            if not os.path.exists(f'{dir_for_unsuccessful_uploads}/{note_id}'):
+                os.mkdir(f'{dir_for_unsuccessful_uploads}/{note_id}')
+            # Hard link (or copy on another file system) - the file in ../tmp/ is deleted after the upload
+            place_file(file_path, f'{dir_for_unsuccessful_uploads}/{note_id}/{fail_file_name}')
+        except shutil.SameFileError as e:
+            pass
+
+        json_path = f'{dir_for_unsuccessful_uploads}/failed_files.json'
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            data = {"elements": []}
 
-    json_path = f'{dir_for_unsuccessful_uploads}/failed_files.json'
-    if os.path.exists(json_path):
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    else:
-        data = {"elements": []}
-
-    is_added = False
-    for element in data["elements"]:
-        if element["dir_name"] == note_id:
-            new_dir_content = {
-                "note_id": note_id,
-                "file_name": fail_file_name
-            }
-            element["dir_content"].append(new_dir_content)
-            is_added = True
-            break
-
-    if not is_added:
-        new_element = {
-            "dir_name": note_id,
-            "dir_content": [
-                {
+        is_added = False
+        for element in data["elements"]:
+            if element["dir_name"] == note_id:
+                new_dir_content = {
                     "note_id": note_id,
                     "file_name": fail_file_name
                 }
-            ]
-        }
-        data["elements"].append(new_element)
+                # A file that fails again during send_failed_files is already listed
+                if new_dir_content not in element["dir_content"]:
+                    element["dir_content"].append(new_dir_content)
+                is_added = True
+                break
+
+        if not is_added:
+            new_element = {
+                "dir_name": note_id,
+                "dir_content": [
+                    {
+                        "note_id": note_id,
+                        "file_name": fail_file_name
+                    }
+                ]
+            }
+            data["elements"].append(new_element)
 
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
 
 
 def send_failed_files() -> None:
@@ -113,19 +126,25 @@ def send_failed_files() -> None:
 
     This function processes a JSON file located in the `../unsuccessful_uploads` directory
     that tracks failed file uploads. For each entry in the JSON file:
-    - Attempts to re-upload the files using the `upload_file_on_server` function.
-    - If a file is successfully uploaded, it is deleted from the local filesystem.
-    - If all files in a directory are successfully uploaded, the directory is removed.
-    - If some files in a directory still fail to upload, the JSON file is updated to reflect the remaining files.
+    - Sends the artifact manifest of the files to the server (`artifact_manifest.files_to_upload`); files the
+      server already stores are not uploaded again and are deleted locally.
+    - Attempts to re-upload the remaining files using the `upload_file_on_server` function.
+    - If a file is successfully uploaded, it is deleted from the local filesystem and its entry is removed
+      from the JSON file.
+    - If a directory has no entries left, the directory is removed.
 
     If the JSON file does not exist or contains no elements, the function exits without performing any action.
 
     Exceptions:
-        - `FileNotFoundError`: If a file listed in the JSON is not found during upload, it is ignored.
+        - `FileNotFoundError`: If a file listed in the JSON is not found during upload, its entry is dropped.
 
     Notes:
         - The `upload_file_on_server` function must be implemented separately and is assumed to handle the actual upload logic.
-        - The function modifies the `failed_files.json` file to reflect the current status of uploads.
+        - Upload workers may record new failures (`save_unsuccessful_upload`) while the files are being sent.
+          `failed_files_lock` is therefore held only while the JSON file is read and written - not during
+          the uploads - and the file is re-read before writing, so only the sent entries are removed and
+          entries added in the meantime are kept.
+        - Only one retry runs at a time; a call made while another retry is in progress returns immediately.
 
     Returns:
         None
@@ -133,41 +152,73 @@ def send_failed_files() -> None:
     Example:
         >>> send_failed_files()
     """
-    check_and_create_unsuccessful_uploads_folder()
+    if not _send_failed_files_lock.acquire(blocking=False):
+        return
+    try:
+        _send_failed_files()
+    finally:
+        _send_failed_files_lock.release()
+
+
+def _send_failed_files() -> None:
     dir_for_unsuccessful_uploads = '../unsuccessful_uploads'
     json_path = f'{dir_for_unsuccessful_uploads}/failed_files.json'
 
-    if not os.path.exists(json_path):
-        return
-
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with failed_files_lock:
+        check_and_create_unsuccessful_uploads_folder()
+        if not os.path.exists(json_path):
+            return
+        with open(json_path, "r", encoding="utf-8") as f:
+            elements = json.load(f)["elements"]
 
-    elements = data["elements"]
     if len(elements) == 0:
         return
 
-    failed_elements = []
+    # (note_id, file_name) of the entries that no longer have to be sent
+    sent = set()
     for element in elements:
-        failed_dir_content = []
+        # Files the server already has (e.g. uploaded before the connection dropped) are not sent again
+        existing_paths = [
+            f'{dir_for_unsuccessful_uploads}/{c["note_id"]}/{c["file_name"]}' for c in element["dir_content"]
+            if os.path.exists(f'{dir_for_unsuccessful_uploads}/{c["note_id"]}/{c["file_name"]}')
+        ]
+        paths_to_upload = files_to_upload(element["dir_name"], existing_paths)
         for dir_content in element["dir_content"]:
             note_id = dir_content["note_id"]
             file_name = dir_content["file_name"]
             file_path = f'{dir_for_unsuccessful_uploads}/{note_id}/{file_name}'
 
-            try:
-                if upload_file_on_server(note_id, file_path):
-                    os.remove(file_path)
-                else:
-                    failed_dir_content.append(dir_content)
-            except FileNotFoundError:
-                pass
-        if len(failed_dir_content) == 0:
-            shutil.rmtree(f'{dir_for_unsuccessful_uploads}/{element["dir_name"]}')
-        else:
-            element["dir_content"] = failed_dir_content
-            failed_elements.append(element)
+            if file_path not in existing_paths or file_path not in paths_to_upload:
+                sent.add((note_id, file_name))
+            else:
+                try:
+                    if upload_file_on_server(note_id, file_path):
+                        sent.add((note_id, file_name))
+                except FileNotFoundError:
+                    sent.add((note_id, file_name))
+
+    with failed_files_lock:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
 
-    data["elements"] = failed_elements
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
\ No newline at end of file
+        remaining_elements = []
+        for element in data["elements"]:
+            remaining_dir_content = []
+            for dir_content in element["dir_content"]:
+                key = (dir_content["note_id"], dir_content["file_name"])
+                if key not in sent:
+                    remaining_dir_content.append(dir_content)
+                    continue
+                try:
+                    os.remove(f'{dir_for_unsuccessful_uploads}/{key[0]}/{key[1]}')
+                except FileNotFoundError:
+                    pass
+            if len(remaining_dir_content) == 0:
+                shutil.rmtree(f'{dir_for_unsuccessful_uploads}/{element["dir_name"]}', ignore_errors=True)
+            else:
+                element["dir_content"] = remaining_dir_content
+                remaining_elements.append(element)
+
+        data["elements"] = remaining_elements
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
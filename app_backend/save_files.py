@@ -1,12 +1,14 @@
 from datetime import datetime
 import os.path
 import random
-import shutil
-from app_backend.create_files import create_docx_file, create_txt_file, create_json_file
-from app_backend.communication_with_www_server import upload_file_on_server
+from app_backend.create_files import render_note_files
+from app_backend.note_model import build_note
+from app_backend.upload_engine import get_upload_engine
 import hashlib
-import threading
 from app_backend.logging_f import log_file_creation
+from app_backend.file_placement import empty_placement_stats, place_file
+from app_backend.note_catalog import NoteCatalog
+from app_backend.note_index import NoteIndex
 import app_front.quickstart as google_cal
 
 
@@ -91,14 +93,16 @@ def send_and_delete_files(
         docx_file_path: str,
         is_docx_txt_created: bool,
         txt_file_path: str,
-        tmp_dir_name: str
-) -> None:
+        tmp_dir_name: str,
+        on_progress=None
+):
     """
-    Sends files to a server and deletes them from the local temporary directory after uploading.
+    Queues files for upload to a server and deletes them from the local temporary directory after uploading.
 
-    This function handles the upload of various files associated with a specific note to the server.
+    This function hands the files associated with a specific note to the shared upload engine
+    (`upload_engine.get_upload_engine`), which uploads them in the background, several at a time.
     It uploads the JSON file, image files, and video file, and optionally uploads a DOCX or TXT file if created.
-    Once all the files are uploaded, it deletes all files from the temporary directory to clean up.
+    Once all the files are processed, the temporary directory is deleted to clean up.
 
     Args:
         note_id (str): The unique identifier of the note for which the files are being uploaded.
@@ -110,13 +114,16 @@ def send_and_delete_files(
         is_docx_txt_created (bool): A flag indicating whether a TXT file has been created.
         txt_file_path (str): The path to the TXT file to be uploaded (if created).
         tmp_dir_name (str): The name of tmp directory where are files.
+        on_progress (callable, optional): Per-file progress callback,
+            `on_progress(file_path, state, bytes_sent, total_bytes)` (see `UploadEngine.submit_note`).
 
     Returns:
-        None: This function does not return a value. It performs file uploads and deletes files locally.
+        concurrent.futures.Future: Completed when all files are processed and the temporary directory is removed,
+                                   with a dictionary `{file_path: bool}` of upload results.
 
     Behavior on Failure:
-        - The function assumes that the `upload_file_on_server` function handles errors during file upload.
-        - If any file cannot be uploaded, the function does not retry or log the failure.
+        - The function assumes that the `upload_file_on_server` function handles errors during file upload
+          (failed files are saved for a later retry by `retry_logic`).
 
     Example:
         >>> send_and_delete_files(
@@ -134,19 +141,17 @@ def send_and_delete_files(
     Notes:
         - The function deletes directory '../tmp/<tmp_dir_name>' with all files after uploading, so use this with caution.
         - Ensure that the `upload_file_on_server` function is working correctly, as this function relies on it for uploads.
-        - The `shutil` and `os` modules are used for file operations. Ensure they are imported at the top of the script.
+        - The function returns immediately; use `.result()` on the returned future to wait for the uploads.
     """
-    upload_file_on_server(note_id, json_file_path)
-    upload_file_on_server(note_id, video_file_path)
-    for img_file in img_files_name:
-        upload_file_on_server(note_id, f"../tmp/{tmp_dir_name}/{img_file}")
-
+    file_paths = [json_file_path, video_file_path]
+    file_paths.extend(f"../tmp/{tmp_dir_name}/{img_file}" for img_file in img_files_name)
     if is_docx_file_created:
-        upload_file_on_server(note_id, docx_file_path)
+        file_paths.append(docx_file_path)
     if is_docx_txt_created:
-        upload_file_on_server(note_id, txt_file_path)
+        file_paths.append(txt_file_path)
 
-    shutil.rmtree(f"../tmp/{tmp_dir_name}")
+    return get_upload_engine().submit_note(note_id, file_paths, on_progress=on_progress,
+                                           cleanup_dir=f"../tmp/{tmp_dir_name}")
 
 
 def save_files_to_user_directory(
@@ -158,12 +163,13 @@ def save_files_to_user_directory(
         txt_file_path: str,
         img_files_name: list,
         video_file_path: str
-) -> None:
+) -> dict:
     """
-    Copies specific files to a user-specified directory and logs any errors encountered during the process.
+    Places specific files in a user-specified directory and logs any errors encountered during the process.
 
-    This function checks if DOCX, TXT, image, and video files have been created and, if so, attempts to copy
-    them to the specified directory. Any failures during the copying process are logged with detailed error
+    This function checks if DOCX, TXT, image, and video files have been created and, if so, places them in the
+    specified directory with `place_file`: a hard link or reflink when the user directory is on the same file
+    system as `../tmp/`, otherwise a chunked copy. Any failures during the process are logged with detailed error
     messages to the file creation log.
 
     Args:
@@ -177,11 +183,12 @@ def save_files_to_user_directory(
         video_file_path (str): The path to the video file to be uploaded.
 
     Returns:
-        None: This function does not return a value. It performs file copying and logging.
+        dict: Placement statistics - for each method (`'linked'`, `'reflinked'`, `'copied'`, `'moved'`)
+              the number of files and bytes, e.g. `{'linked': {'files': 4, 'bytes': 734003200}, ...}`.
 
     Behavior on Failure:
         - Logs the error to `error_logs/file_creation.log` with a timestamp, indicating the source of the failure.
-        - If copying any file fails, the process continues with the next file.
+        - If placing any file fails, the process continues with the next file.
 
     Example:
         >>> save_files_to_user_directory(
@@ -196,41 +203,31 @@ def save_files_to_user_directory(
         ... )
 
     Notes:
-        - The `shutil` and `os` modules are used for file operations. Ensure they are imported at the top of the script.
-        - The function handles each file type separately and logs any issues during the copying process.
+        - Files are never moved: the upload reads them from `../tmp/<tmp_dir_name>` afterwards.
+        - The function handles each file separately and logs any issues during the placement process.
         - The function assumes that the source files are located in the `../tmp/<tmp_dir_name>` directory for image.
         - The `error_logs/` directory should exist for logging; otherwise, the function will fail to log errors.
     """
+    source_paths = []
     if is_docx_file_created:
-        try:
-            shutil.copyfile(docx_file_path, f'{directory_path}/{os.path.basename(docx_file_path)}')
-        except Exception as e:
-            log_file_creation(
-                f"For save_files()->shutil.copyfile({docx_file_path}, {directory_path}/{os.path.basename(docx_file_path)}) - Error: {e} - Cannot copy file\n"
-            )
-
+        source_paths.append(docx_file_path)
     if is_txt_file_created:
-        try:
-            shutil.copyfile(txt_file_path, f'{directory_path}/{os.path.basename(txt_file_path)}')
-        except Exception as e:
-            log_file_creation(
-                f"For save_files()->shutil.copyfile({txt_file_path}, {directory_path}/{os.path.basename(txt_file_path)}) - Error: {e} - Cannot copy file\n"
-            )
+        source_paths.append(txt_file_path)
+    source_paths.extend(f"../tmp/{tmp_dir_name}/{img_file_name}" for img_file_name in img_files_name)
+    source_paths.append(video_file_path)
 
-    for img_file_name in img_files_name:
+    stats = empty_placement_stats()
+    for source_path in source_paths:
+        target_path = f'{directory_path}/{os.path.basename(source_path)}'
         try:
-            shutil.copyfile(f"../tmp/{tmp_dir_name}/{img_file_name}", f'{directory_path}/{img_file_name}')
+            method, size = place_file(source_path, target_path)
+            stats[method]['files'] += 1
+            stats[method]['bytes'] += size
         except Exception as e:
             log_file_creation(
-                f"For save_files()->shutil.copyfile(../tmp/{tmp_dir_name}/{img_file_name}, {directory_path}/{img_file_name}) - Error: {e} - Cannot copy file\n"
+                f"For save_files()->place_file({source_path}, {target_path}) - Error: {e} - Cannot place file\n"
             )
-
-    try:
-        shutil.copyfile(video_file_path, f'{directory_path}/{os.path.basename(video_file_path)}')
-    except Exception as e:
-        log_file_creation(
-            f"For save_files()->shutil.copyfile({video_file_path}, {directory_path}/{os.path.basename(video_file_path)}) - Error: {e} - Cannot copy file\n"
-        )
+    return stats
 
 
 def save_files(
@@ -243,14 +240,17 @@ def save_files(
     video_file_name: str,
     tmp_dir_name: str,
     directory_path: str,
-    language: str = 'pl'
-) -> None:
+    language: str = 'pl',
+    note_json_version: int = 1,
+    on_upload_progress=None,
+    note_content_ocr: list = None
+):
     """
     Saves structured content from a note to specified directories and prepares files for upload to a server.
 
     This function organizes and compiles content from different parts of a note, creates various file formats
-    (e.g., DOCX, TXT, JSON) and saves them to a designated directory. It then initiates a background process to
-    upload the files to a server while handling file creation and potential errors.
+    (e.g., DOCX, TXT, JSON) and saves them to a designated directory. It then queues the files for a background
+    upload to a server and returns as soon as the files are on the local disk.
 
     Args:
         note_title (str): The title of the note.
@@ -264,18 +264,33 @@ def save_files(
         directory_path (str): The path to the directory where the files should be saved.
         language (str, optional): The language for the document headings (`'pl'` for Polish or `'en'` for English).
                                   Defaults to `'pl'`.
+        note_json_version (int, optional): The format of the note JSON file: `1` (`docs/json_file_doc.json`,
+                                  `<note_id>.json`) or `2` (compact, gzip compressed `<note_id>.json.gz`).
+                                  Defaults to `1`, the format read by the web viewer.
+        on_upload_progress (callable, optional): Per-file upload progress callback (see `send_and_delete_files`).
+        note_content_ocr (list, optional): Text recognized on the keyframes, as dictionaries with `timestamp` and
+                                  `value`. It is only added to the search index, not to the note files.
 
     Returns:
-        None: This function does not return a value. It performs file creation, saving, and initiates an upload.
+        concurrent.futures.Future | None: The completion future of the background upload, or `None` if the JSON
+                                          file could not be created (nothing is uploaded then).
 
     File Creation Process:
         - Organizes content into a single list and sorts it based on timestamp and type.
         - Generates a unique note ID and paths for DOCX, TXT, and JSON files.
-        - Creates a DOCX and a TXT file with the note's content.
-        - Copies the created files and other media (images and video) to the specified directory.
+        - Builds the intermediate note representation once (`build_note`) and renders the DOCX, TXT and JSON
+          files from it concurrently (`render_note_files`).
+        - Adds the note to the local note catalog (`note_catalog.NoteCatalog`), so it is listed before it reaches
+          the server.
+        - Places the created files and other media (images and video) in the specified directory, linking instead
+          of copying where possible (bytes linked and copied are logged per note).
+        - Adds the note, with the text recognized on its keyframes, to the local full-text search index
+          (`note_index.NoteIndex`).
 
     Upload Process:
-        - Initiates a background thread to upload the created files (JSON, DOCX, TXT, images, and video) to the server.
+        - Queues the created files (JSON, DOCX, TXT, images, and video) in the shared upload engine, which uploads
+          up to `MAX_PARALLEL_UPLOADS` files at a time in background threads: the JSON, DOCX and TXT first, then
+          the images and the video last, so the note page is complete before the video upload finishes.
         - Deletes temporary files after uploading to maintain a clean working directory.
 
     Behavior on Failure:
@@ -297,7 +312,7 @@ def save_files(
 
     Notes:
         - Ensure the `python-docx` library is installed for DOCX file creation.
-        - Ensure `shutil`, `os`, `threading`, and `datetime` libraries are imported and available.
+        - Ensure `os` and `datetime` libraries are imported and available.
         - The `../tmp/{tmp_dir_name}` directory should be writable for temporary file creation.
         - The function assumes that images have the `.png` extension for image processing.
         - The `error_logs/` directory should exist for error logging; otherwise, logging will fail silently.
@@ -314,19 +329,49 @@ def save_files(
     docx_file_path = f"../tmp/{tmp_dir_name}/{docx_file_name}"
     txt_file_name =  f"{note_title} {note_datetime.strftime("%Y-%m-%d %H-%M-%S")}.txt"
     txt_file_path = f"../tmp/{tmp_dir_name}/{txt_file_name}"
-    json_file_path = f"../tmp/{tmp_dir_name}/{note_id}.json"
+    json_format = 'json_compact' if note_json_version == 2 else 'json'
+    json_file_path = f"../tmp/{tmp_dir_name}/{note_id}.json{'.gz' if note_json_version == 2 else ''}"
     video_file_path = f"../tmp/{tmp_dir_name}/{video_file_name}"
     img_files_name = [f for f in os.listdir(f"../tmp/{tmp_dir_name}") if f.endswith('.png')]
 
-    is_docx_file_created = create_docx_file(note_title, note_summary, note_content, docx_file_path=docx_file_path, language=language)
-    is_txt_file_created = create_txt_file(note_title, note_summary, note_content, txt_file_path=txt_file_path, language=language)
+    note = build_note(
+        note_title,
+        note_summary,
+        note_content,
+        note_datetime=note_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+        note_id=note_id,
+        video_file_name=video_file_name,
+        docx_file_name=docx_file_name,
+        txt_file_name=txt_file_name,
+        language=language
+    )
+    created = render_note_files(note, {'docx': docx_file_path, 'txt': txt_file_path, json_format: json_file_path})
+
+    try:
+        NoteCatalog().add_note(note_id, note.datetime, note_title, language)
+    except Exception as e:
+        log_file_creation(f"For save_files()->NoteCatalog.add_note({note_id}) - Error: {e}\n")
+    is_docx_file_created = created['docx']
+    is_txt_file_created = created['txt']
+
+    placement_stats = save_files_to_user_directory(directory_path, tmp_dir_name, is_docx_file_created, docx_file_path, is_txt_file_created, txt_file_path, img_files_name, video_file_path)
+    linked_bytes = sum(placement_stats[m]['bytes'] for m in ('linked', 'reflinked', 'moved'))
+    log_file_creation(
+        f"For save_files() - Note {note_id} placed in {directory_path}: {linked_bytes} bytes linked, "
+        f"{placement_stats['copied']['bytes']} bytes copied - {placement_stats}\n"
+    )
 
-    save_files_to_user_directory(directory_path, tmp_dir_name, is_docx_file_created, docx_file_path, is_txt_file_created, txt_file_path, img_files_name, video_file_path)
+    try:
+        NoteIndex().add_note(note, txt_path=f'{directory_path}/{txt_file_name}' if is_txt_file_created else None,
+                             ocr_texts=note_content_ocr or ())
+    except Exception as e:
+        log_file_creation(f"For save_files()->NoteIndex.add_note({note_id}) - Error: {e}\n")
 
-    if create_json_file(note_title, note_summary, note_content, note_datetime.strftime("%Y-%m-%d %H:%M:%S"), video_file_name=video_file_name, docx_file_name=docx_file_name, txt_file_name=txt_file_name, json_file_path=json_file_path, language=language):
-        threading.Thread(
-            send_and_delete_files(note_id, json_file_path, img_files_name, video_file_path, is_docx_file_created,
-                                  docx_file_path, is_txt_file_created, txt_file_path, tmp_dir_name)
-        )
+    upload_future = None
+    if created[json_format]:
+        upload_future = send_and_delete_files(note_id, json_file_path, img_files_name, video_file_path,
+                                              is_docx_file_created, docx_file_path, is_txt_file_created,
+                                              txt_file_path, tmp_dir_name, on_progress=on_upload_progress)
         google_cal.Calendar().add_event(note_title, note_datetime.strftime("%Y-%m-%dT%H:%M:%S"),
-                                        f"https://ioprojekt.atwebpages.com/{note_id}")
\ No newline at end of file
+                                        f"https://ioprojekt.atwebpages.com/{note_id}")
+    return upload_future
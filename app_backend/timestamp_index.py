@@ -0,0 +1,86 @@
+import os
+import struct
+from array import array
+from bisect import bisect_right
+
+# Timestamp index file written during recording (app_front.session_clock.TimestampIndexWriter): a header
+# (magic, version, kind, rate) followed by records (position in the media file - sample or frame number,
+# session time in seconds). Read here, so data analysis does not depend on the GUI package.
+INDEX_MAGIC = b"TSIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBBxxd")
+INDEX_RECORD = struct.Struct("<Id")
+KIND_AUDIO = 0
+KIND_VIDEO = 1
+
+# Index file names in the recording directory
+AUDIO_INDEX_NAME = "audio_output.tsi"
+VIDEO_INDEX_NAME = "video_output.tsi"
+
+
+class TimestampIndex:
+    """A loaded timestamp index converting media file time to session time and back."""
+
+    def __init__(self, kind, rate, positions, times):
+        self.kind = kind
+        self.rate = rate
+        self.positions = positions
+        self.times = times
+
+    def to_session(self, media_seconds):
+        """Session time of the moment `media_seconds` of the media file."""
+        position = media_seconds * self.rate
+        i = max(bisect_right(self.positions, position) - 1, 0)
+        return self.times[i] + (position - self.positions[i]) / self.rate
+
+    def to_media(self, session_time):
+        """Moment of the media file recorded at session time `session_time`."""
+        i = max(bisect_right(self.times, session_time) - 1, 0)
+        return (self.positions[i] + (session_time - self.times[i]) * self.rate) / self.rate
+
+
+def read_timestamp_index(filename):
+    """
+    Reads an index written by `TimestampIndexWriter`.
+
+    The file may still be written by a running recording: records are flushed at least once per second and at
+    every segment rotation, and an incomplete last record is skipped.
+
+    Returns:
+        TimestampIndex | None: The index, or None if the file does not exist, is empty or damaged.
+    """
+    if not os.path.exists(filename):
+        return None
+    with open(filename, "rb") as file:
+        data = file.read()
+    if len(data) < INDEX_HEADER.size:
+        return None
+    magic, version, kind, rate = INDEX_HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        return None
+
+    # An incomplete last record (interrupted recording or a write in progress) is skipped
+    body = data[INDEX_HEADER.size :]
+    body = body[: len(body) - len(body) % INDEX_RECORD.size]
+    positions = array("I")
+    times = array("d")
+    for position, session_time in INDEX_RECORD.iter_unpack(body):
+        positions.append(position)
+        times.append(session_time)
+    if not positions:
+        return None
+    return TimestampIndex(kind, rate, positions, times)
+
+
+def video_to_audio_offset(directory):
+    """
+    The moment of the audio recording (in seconds of the audio file) at which the first video frame was grabbed.
+
+    Used when merging the recordings (`-itsoffset`), so image and sound in combined.mp4 share one time axis.
+    Returns 0.0 if either index is missing.
+    """
+    audio_index = read_timestamp_index(os.path.join(directory, AUDIO_INDEX_NAME))
+    video_index = read_timestamp_index(os.path.join(directory, VIDEO_INDEX_NAME))
+    if audio_index is None or video_index is None:
+        return 0.0
+    return audio_index.to_media(video_index.to_session(0.0))
@@ -0,0 +1,244 @@
+import atexit
+import itertools
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import Future
+
+from app_backend.artifact_manifest import files_to_upload
+from app_backend.communication_with_www_server import upload_file_on_server
+from app_backend.http_client import get_bandwidth_limiter, set_bandwidth_limit
+from app_backend.logging_f import log_communication_with_www_server
+
+# Maximum number of files uploaded at the same time (must not exceed http_client.POOL_MAXSIZE,
+# otherwise connections are not kept alive)
+MAX_PARALLEL_UPLOADS = 4
+
+# States reported to progress callbacks
+UPLOAD_QUEUED = 'queued'
+UPLOAD_STARTED = 'uploading'
+UPLOAD_DONE = 'done'
+UPLOAD_FAILED = 'failed'
+
+# Priority classes - lower values are uploaded first: the note page needs the metadata and text, then the
+# slides, and only then the video. The manifest of a note is exchanged before any of its files is uploaded.
+PRIORITY_MANIFEST = -1
+PRIORITY_METADATA = 0
+PRIORITY_IMAGE = 1
+PRIORITY_VIDEO = 2
+PRIORITY_OTHER = 3
+PRIORITY_EXTENSIONS = {
+    '.json': PRIORITY_METADATA, '.gz': PRIORITY_METADATA, '.zst': PRIORITY_METADATA,
+    '.txt': PRIORITY_METADATA, '.docx': PRIORITY_METADATA,
+    '.png': PRIORITY_IMAGE, '.jpg': PRIORITY_IMAGE, '.jpeg': PRIORITY_IMAGE,
+    '.mp4': PRIORITY_VIDEO, '.mkv': PRIORITY_VIDEO, '.avi': PRIORITY_VIDEO, '.webm': PRIORITY_VIDEO,
+}
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def upload_priority(file_path: str) -> int:
+    """Returns the priority class of a file based on its extension."""
+    return PRIORITY_EXTENSIONS.get(os.path.splitext(file_path)[1].lower(), PRIORITY_OTHER)
+
+
+class UploadEngine:
+    """
+    Uploads note files to the server in the background with bounded concurrency and priority scheduling.
+
+    Files are uploaded by `max_workers` threads sharing the keep-alive session (`http_client`). Waiting files are
+    taken by priority class (metadata and text, then images, then video - see `upload_priority`) and in order of
+    submission within a class, also across notes, so the text of a new note does not wait for an earlier video.
+    The total upload rate can be capped (`set_bandwidth_limit`).
+
+    Before uploading, the artifact manifest of the note is exchanged with the server (`artifact_manifest`) and
+    files the server already stores are skipped. Every submitted note gets a completion future; failed files go to
+    the retry queue (`retry_logic.save_unsuccessful_upload`) exactly as with synchronous uploads.
+
+    Example:
+        >>> engine = UploadEngine(max_workers=4)
+        >>> engine.set_bandwidth_limit(512 * 1024)  # 512 KiB/s
+        >>> future = engine.submit_note("12345", ["../tmp/rec/12345.json", "../tmp/rec/combined.mp4"],
+        ...                             on_progress=lambda path, state, sent, total: print(path, state))
+        >>> engine.get_queue_state()
+        [{'note_id': '12345', 'file_path': '../tmp/rec/12345.json', 'priority': 0, 'state': 'uploading', ...}, ...]
+        >>> future.result()
+        {'../tmp/rec/12345.json': True, '../tmp/rec/combined.mp4': True}
+    """
+
+    def __init__(self, max_workers: int = MAX_PARALLEL_UPLOADS):
+        self.max_workers = max_workers
+        self.tasks = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.files = {}  # (note_id, file_path) -> state of a waiting or uploading file
+        self.files_lock = threading.Lock()
+        self.workers = []
+        for i in range(max_workers):
+            worker = threading.Thread(target=self._work, name=f'upload_{i}', daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        self.is_shut_down = False
+        atexit.register(self.shutdown)
+
+    def _work(self):
+        while True:
+            _, _, task = self.tasks.get()
+            if task is None:
+                return
+            task()
+
+    def submit_note(self, note_id: str, file_paths: list, on_progress=None, cleanup_dir: str = None,
+                    deduplicate: bool = True) -> Future:
+        """
+        Queues the upload of the files of a note and returns immediately.
+
+        Args:
+            note_id (str): The unique identifier of the note.
+            file_paths (list): Paths of the files to upload; the order does not matter, files are scheduled
+                by `upload_priority`.
+            on_progress (callable, optional): Called from the upload threads as
+                `on_progress(file_path, state, bytes_sent, total_bytes)` with state `'queued'`, `'uploading'`,
+                `'done'` or `'failed'`. Exceptions raised by the callback are logged and ignored.
+            cleanup_dir (str, optional): A directory removed (`shutil.rmtree`) once all files are processed.
+            deduplicate (bool, optional): Whether to skip files the server already has (reported as `'done'`).
+                Defaults to `True`.
+
+        Returns:
+            concurrent.futures.Future: Completed when every file has been processed, with a dictionary
+                                       `{file_path: bool}` telling which files are on the server.
+        """
+        note_future = Future()
+        results = {}
+        remaining = [len(file_paths)]
+        lock = threading.Lock()
+
+        def report(file_path, state, bytes_sent, total_bytes):
+            with self.files_lock:
+                if state in (UPLOAD_DONE, UPLOAD_FAILED):
+                    self.files.pop((note_id, file_path), None)
+                elif (note_id, file_path) in self.files:
+                    self.files[(note_id, file_path)].update(state=state, bytes_sent=bytes_sent, total_bytes=total_bytes)
+            if on_progress is None:
+                return
+            try:
+                on_progress(file_path, state, bytes_sent, total_bytes)
+            except Exception as e:
+                log_communication_with_www_server(f"For UploadEngine.submit_note({note_id}) - Progress callback error: {e}\n")
+
+        def finish():
+            if cleanup_dir is not None:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+            note_future.set_result(results)
+
+        def complete(file_path, is_uploaded, total_bytes):
+            report(file_path, UPLOAD_DONE if is_uploaded else UPLOAD_FAILED, total_bytes if is_uploaded else 0, total_bytes)
+            with lock:
+                results[file_path] = is_uploaded
+                remaining[0] -= 1
+                is_last = remaining[0] == 0
+            if is_last:
+                finish()
+
+        def upload(file_path, total_bytes):
+            report(file_path, UPLOAD_STARTED, 0, total_bytes)
+            try:
+                is_uploaded = upload_file_on_server(
+                    note_id, file_path, on_progress=lambda sent, total: report(file_path, UPLOAD_STARTED, sent, total)
+                )
+            except Exception as e:
+                log_communication_with_www_server(f"For UploadEngine.submit_note({note_id}, {file_path}) - Error: {e}\n")
+                is_uploaded = False
+            complete(file_path, is_uploaded, total_bytes)
+
+        def queue_uploads(paths):
+            for file_path in paths:
+                self.tasks.put((
+                    upload_priority(file_path),
+                    next(self.sequence),
+                    lambda file_path=file_path: upload(file_path, sizes[file_path])
+                ))
+
+        def exchange_manifest():
+            paths = [file_path for file_path in file_paths if os.path.exists(file_path)]
+            missing = files_to_upload(note_id, paths)
+            skipped = [file_path for file_path in paths if file_path not in missing]
+            if skipped:
+                log_communication_with_www_server(
+                    f"For UploadEngine.submit_note({note_id}) - {len(skipped)} files already on server, "
+                    f"{sum(sizes[file_path] for file_path in skipped)} bytes not sent\n"
+                )
+            # Missing local files are still passed to the upload, which reports them as failed
+            queue_uploads([file_path for file_path in file_paths if file_path not in skipped])
+            for file_path in skipped:
+                complete(file_path, True, sizes[file_path])
+
+        if not file_paths:
+            finish()
+            return note_future
+
+        sizes = {file_path: os.path.getsize(file_path) if os.path.exists(file_path) else 0 for file_path in file_paths}
+        with self.files_lock:
+            for file_path in file_paths:
+                self.files[(note_id, file_path)] = {
+                    'note_id': note_id,
+                    'file_path': file_path,
+                    'priority': upload_priority(file_path),
+                    'state': UPLOAD_QUEUED,
+                    'bytes_sent': 0,
+                    'total_bytes': sizes[file_path]
+                }
+        for file_path in file_paths:
+            report(file_path, UPLOAD_QUEUED, 0, sizes[file_path])
+        if deduplicate:
+            self.tasks.put((PRIORITY_MANIFEST, next(self.sequence), exchange_manifest))
+        else:
+            queue_uploads(file_paths)
+        return note_future
+
+    def get_queue_state(self) -> list:
+        """
+        Returns the waiting and uploading files, uploading first, then in scheduling order.
+
+        Returns:
+            list: Dictionaries with `note_id`, `file_path`, `priority`, `state` (`'queued'` or `'uploading'`),
+                  `bytes_sent` and `total_bytes`.
+        """
+        with self.files_lock:
+            files = [dict(file) for file in self.files.values()]
+        return sorted(files, key=lambda file: (file['state'] != UPLOAD_STARTED, file['priority']))
+
+    @staticmethod
+    def set_bandwidth_limit(bytes_per_second: float = None) -> None:
+        """Caps the total upload rate (None removes the cap); applies to uploads in progress too."""
+        set_bandwidth_limit(bytes_per_second)
+
+    @staticmethod
+    def get_bandwidth_limit():
+        """Returns the current upload rate cap in bytes per second, or None."""
+        return get_bandwidth_limiter().bytes_per_second
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the workers once the queued uploads are done; with `wait=True` blocks until then."""
+        if self.is_shut_down:
+            return
+        self.is_shut_down = True
+        for _ in self.workers:
+            # Sentinels go after every queued upload
+            self.tasks.put((PRIORITY_OTHER + 1, next(self.sequence), None))
+        if wait:
+            for worker in self.workers:
+                worker.join()
+
+
+def get_upload_engine() -> UploadEngine:
+    """
+    Returns the upload engine shared by the application, creating it on first use (thread-safe).
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = UploadEngine()
+    return _engine
@@ -0,0 +1,50 @@
+import queue
+import threading
+
+import numpy as np
+import soxr
+
+from app_front.wav_writer import StreamingWavWriter
+
+
+class AnalysisSidecar:
+    """
+    Tworzy równolegle z nagraniem kopię dźwięku 16 kHz mono do analizy (Whisper, pyannote).
+
+    Bloki nagrania są przekazywane przez kolejkę do osobnego wątku, który miksuje kanały do
+    mono, strumieniowo zmienia częstotliwość próbkowania (soxr) i zapisuje wynik do pliku WAV.
+    Wątek nagrywania wykonuje tylko `put` do kolejki.
+    """
+
+    def __init__(self, filename, channels, rate, analysis_rate=16000):
+        self.filename = filename
+        self.channels = channels
+        self.resampler = soxr.ResampleStream(rate, analysis_rate, 1, dtype="int16")
+        self.writer = StreamingWavWriter(filename, 1, 2, analysis_rate)
+        self.chunks = queue.Queue()
+        self.thread = threading.Thread(target=self._convert_chunks, daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        """Przekazuje blok nagrania (int16, przeplatane kanały) do przetworzenia."""
+        self.chunks.put(data)
+
+    def _convert_chunks(self):
+        while True:
+            data = self.chunks.get()
+            last = data is None
+            if last:
+                mono = np.zeros(0, dtype=np.int16)
+            else:
+                samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+                mono = (samples.sum(axis=1, dtype=np.int32) // self.channels).astype(np.int16)
+
+            self.writer.write(self.resampler.resample_chunk(mono, last=last).tobytes())
+            if last:
+                break
+        self.writer.close()
+
+    def close(self):
+        """Przetwarza pozostałe bloki i zamyka plik."""
+        self.chunks.put(None)
+        self.thread.join()
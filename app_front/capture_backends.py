@@ -0,0 +1,249 @@
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import ImageGrab
+
+
+def list_monitors():
+    """
+    Zwraca prostokąty (left, top, right, bottom) monitorów w kolejności screeninfo.
+
+    Monitor główny jest pierwszy na liście.
+    """
+    from screeninfo import get_monitors
+
+    monitors = sorted(get_monitors(), key=lambda m: not m.is_primary)
+    return [(m.x, m.y, m.x + m.width, m.y + m.height) for m in monitors]
+
+
+def capture_bbox(monitor=None, region=None):
+    """
+    Wyznacza nagrywany prostokąt ekranu (left, top, right, bottom).
+
+    Args:
+        monitor: Numer monitora z `list_monitors()` (None - monitor główny).
+        region: Fragment monitora (left, top, right, bottom) we współrzędnych monitora,
+            np. okno aplikacji spotkania. None - cały monitor.
+
+    Returns:
+        Prostokąt ekranu albo None (cały ekran główny wyznaczany przez backend).
+    """
+    if monitor is None and region is None:
+        return None
+
+    if monitor is None:
+        left, top = 0, 0
+        right, bottom = None, None
+    else:
+        left, top, right, bottom = list_monitors()[monitor]
+
+    if region is not None:
+        left, top, right, bottom = (
+            left + region[0],
+            top + region[1],
+            left + region[2],
+            top + region[3],
+        )
+    # Koder H.264 (yuv420p) wymaga parzystych wymiarów klatki
+    right -= (right - left) % 2
+    bottom -= (bottom - top) % 2
+    return left, top, right, bottom
+
+
+def fit_size(width, height, max_size):
+    """Wymiary (parzyste) obrazu zmniejszonego tak, aby mieścił się w `max_size` (szer., wys.)."""
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return int(width * scale) // 2 * 2, int(height * scale) // 2 * 2
+
+
+class CaptureBackend:
+    """
+    Wspólny interfejs źródeł obrazu dla ScreenRecorder.
+
+    Metoda `grab(out)` zapisuje bieżący obraz ekranu w formacie BGR (format używany przez
+    koder wideo) do przekazanego, wcześniej zaalokowanego bufora o wymiarach (height, width, 3).
+    Przy podanym `output_size` obraz jest zmniejszany przed konwersją kolorów, więc konwersja,
+    kodowanie i analiza obejmują tylko piksele klatki wyjściowej.
+    """
+
+    name = "base"
+
+    def __init__(self, bbox=None, output_size=None):
+        # bbox = (left, top, right, bottom); None oznacza cały ekran główny
+        self.bbox = bbox if bbox is not None else self._screen_bbox()
+        self.capture_width = self.bbox[2] - self.bbox[0]
+        self.capture_height = self.bbox[3] - self.bbox[1]
+        self.width, self.height = self.capture_width, self.capture_height
+        if output_size is not None:
+            self.width, self.height = fit_size(self.width, self.height, output_size)
+        self.scaled = (self.width, self.height) != (self.capture_width, self.capture_height)
+        self.scaled_buffer = None
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def new_buffer(self):
+        """Tworzy bufor klatki, który można wielokrotnie przekazywać do `grab`."""
+        return np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def _screen_bbox(self):
+        raise NotImplementedError
+
+    def _convert(self, image, code, out):
+        """Konwersja kolorów obrazu do bufora `out`, poprzedzona zmniejszeniem obrazu."""
+        if self.scaled:
+            if self.scaled_buffer is None:
+                self.scaled_buffer = np.empty(
+                    (self.height, self.width, image.shape[2]), dtype=np.uint8
+                )
+            image = cv2.resize(
+                image,
+                (self.width, self.height),
+                dst=self.scaled_buffer,
+                interpolation=cv2.INTER_AREA,
+            )
+        return cv2.cvtColor(image, code, dst=out)
+
+    def grab(self, out):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PILCaptureBackend(CaptureBackend):
+    """Zapasowe źródło obrazu oparte o PIL ImageGrab (kopiuje każdą klatkę)."""
+
+    name = "pil"
+
+    def _screen_bbox(self):
+        width, height = ImageGrab.grab().size
+        return 0, 0, width, height
+
+    def grab(self, out):
+        # all_screens - prostokąt może leżeć na innym monitorze niż główny (Windows)
+        img = ImageGrab.grab(bbox=self.bbox, all_screens=True)
+        return self._convert(np.asarray(img), cv2.COLOR_RGB2BGR, out)
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """
+    Szybkie źródło obrazu oparte o bibliotekę mss.
+
+    Surowy bufor BGRA zwracany przez mss jest widziany przez NumPy bez kopiowania, a jedyna
+    kopia to konwersja BGRA -> BGR zapisywana bezpośrednio do bufora `out`.
+    """
+
+    name = "mss"
+
+    def __init__(self, bbox=None, output_size=None):
+        import mss
+
+        self._mss = mss
+        self.sct = None  # tworzone w wątku nagrywania, mss nie może zmieniać wątku
+        super().__init__(bbox, output_size)
+        self.monitor = {
+            "left": self.bbox[0],
+            "top": self.bbox[1],
+            "width": self.capture_width,
+            "height": self.capture_height,
+        }
+
+    def _screen_bbox(self):
+        with self._mss.mss() as sct:
+            primary = sct.monitors[1]
+        return (
+            primary["left"],
+            primary["top"],
+            primary["left"] + primary["width"],
+            primary["top"] + primary["height"],
+        )
+
+    def grab(self, out):
+        if self.sct is None:
+            self.sct = self._mss.mss()
+        shot = self.sct.grab(self.monitor)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(
+            shot.height, shot.width, 4
+        )
+        return self._convert(bgra, cv2.COLOR_BGRA2BGR, out)
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+# Kolejność prób dla backendu "auto"
+BACKENDS = {
+    MSSCaptureBackend.name: MSSCaptureBackend,
+    PILCaptureBackend.name: PILCaptureBackend,
+}
+
+
+def create_backend(name="auto", bbox=None, output_size=None):
+    """
+    Tworzy źródło obrazu o podanej nazwie ("mss", "pil" lub "auto").
+
+    Dla "auto" wybierany jest pierwszy dostępny backend, a PIL jest zawsze ostatnią opcją.
+    """
+    names = list(BACKENDS) if name == "auto" else [name, PILCaptureBackend.name]
+    for backend_name in names:
+        try:
+            return BACKENDS[backend_name](bbox, output_size)
+        except Exception as e:
+            print(f"Capture backend '{backend_name}' unavailable: {e}")
+    raise RuntimeError("No screen capture backend available")
+
+
+def benchmark(backend, frames=100):
+    """
+    Mierzy liczbę klatek na sekundę i pamięć alokowaną podczas pobrania jednej klatki.
+
+    Zwraca słownik z kluczami: fps, avg_grab_ms, peak_bytes_per_frame i frame_copies
+    (szczytowa alokacja wyrażona w rozmiarach pełnej klatki).
+    """
+    out = backend.new_buffer()
+    backend.grab(out)  # rozgrzanie (np. utworzenie połączenia z serwerem X)
+
+    tracemalloc.start()
+    peak_total = 0
+    start = time.perf_counter()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        backend.grab(out)
+        _, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - current
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    peak_per_frame = peak_total / frames
+    return {
+        "fps": frames / elapsed,
+        "avg_grab_ms": elapsed * 1000 / frames,
+        "peak_bytes_per_frame": peak_per_frame,
+        "frame_copies": peak_per_frame / out.nbytes,
+    }
+
+
+# Mikro-benchmark, również bez monitora:
+#   xvfb-run -s "-screen 0 1920x1080x24" python -m app_front.capture_backends
+if __name__ == "__main__":
+    for backend_name in BACKENDS:
+        try:
+            backend = BACKENDS[backend_name]()
+        except Exception as e:
+            print(f"{backend_name}: unavailable ({e})")
+            continue
+        result = benchmark(backend)
+        backend.close()
+        print(
+            f"{backend_name}: {backend.width}x{backend.height} "
+            f"{result['fps']:.1f} frames/s, {result['avg_grab_ms']:.1f} ms/frame, "
+            f"{result['peak_bytes_per_frame'] / 1e6:.1f} MB allocated per frame "
+            f"({result['frame_copies']:.2f} frame copies)"
+        )
@@ -1,21 +1,60 @@
+import os
+import queue
 import time
-import wave
 import pyaudio
 import threading
 
+from app_backend.timestamp_index import KIND_AUDIO
+from app_front.session_clock import SessionClock, TimestampIndexWriter
+from app_front.wav_writer import StreamingWavWriter
+
 
 class AudioRecorder:
-    def __init__(self, filename, channels=2, rate=44100, chunk=1024):
+    def __init__(
+        self,
+        filename,
+        channels=2,
+        rate=44100,
+        chunk=1024,
+        analysis_rate=16000,
+        mode="callback",
+        segments=None,
+        clock=None,
+    ):
         self.filename = filename
         self.channels = channels
         self.rate = rate
         self.chunk = chunk
 
+        # "callback" - PyAudio przekazuje bloki z własnego wątku przez kolejkę (nie blokuje się
+        # na obciążonym CPU), "blocking" - wątek nagrywania wywołuje stream.read
+        self.mode = mode
+        self.buffers = queue.SimpleQueue()
+
+        # Wspólny zegar z nagrywaniem obrazu; czasy bloków trafiają do indeksu audio_output.tsi
+        self.clock = clock or SessionClock()
+        self.index = None
+        self.frames_recorded = 0
+        self.stats = self._empty_stats()
+
+        # Plik do analizy (16 kHz mono) obok pełnej jakości nagrania, None wyłącza jego tworzenie
+        self.analysis_rate = analysis_rate
+        self.analysis_filename = None
+        self.sidecar = None
+
+        # Nagrywanie segmentowe (SegmentManifest): pliki są zamykane co segment_seconds sekund
+        # nagrania, dokładnie na granicy próbki, i od razu zgłaszane do analizy
+        self.segments = segments
+        self.segment_frames = int(segments.segment_seconds * rate) if segments else 0
+        self.segment_index = 0
+        self.frames_in_segment = 0
+        self.closing_threads = []
+
         # Inicjalizacja PyAudio
         self.p = pyaudio.PyAudio()
         self.stream = None
         self.device_index = self.find_input_device()
-        self.frames = []
+        self.writer = None  # dane zapisywane na bieżąco, pamięć nie rośnie z długością nagrania
         self.is_recording = False
 
         if self.device_index is None:
@@ -31,10 +70,41 @@ class AudioRecorder:
                 return i
         return None
 
+    def _empty_stats(self):
+        return {
+            "mode": self.mode,
+            "buffers": 0,
+            "overflows": 0,  # bloki oznaczone przez PortAudio jako przepełnienie wejścia
+            "overflow_times": [],  # sekundy od początku nagrania
+            "gaps": 0,  # przerwy w czasie ADC dłuższe niż półtora bloku
+            "gap_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    def get_stats(self):
+        """Zwraca statystyki zgubionych danych dla bieżącego nagrania."""
+        return dict(self.stats)
+
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        """Wywoływane przez PyAudio w jego wątku - tylko przekazuje blok do kolejki."""
+        self.buffers.put(
+            (in_data, self.clock.now(), time_info.get("input_buffer_adc_time", 0.0), status_flags)
+        )
+        return None, pyaudio.paContinue
+
     def start_recording(self):
         """Rozpoczyna nagrywanie dźwięku."""
         print("Rozpoczynanie nagrywania dźwięku...")
-        self.frames = []  # Wyczyszczenie wcześniejszych danych
+        self.buffers = queue.SimpleQueue()
+        self.stats = self._empty_stats()
+        self.sample_width = self.p.get_sample_size(pyaudio.paInt16)
+        self.frames_recorded = 0
+        self.index = TimestampIndexWriter(
+            f"{os.path.splitext(self.filename)[0]}.tsi", KIND_AUDIO, self.rate
+        )
+        self.segment_index = 0
+        self.closing_threads = []
+        self._open_files(self.filename)
         self.stream = self.p.open(
             format=pyaudio.paInt16,
             channels=self.channels,
@@ -42,37 +112,161 @@ class AudioRecorder:
             input=True,
             input_device_index=self.device_index,
             frames_per_buffer=self.chunk,
+            stream_callback=self._callback if self.mode == "callback" else None,
         )
+        self.start_time = self.clock.now()
         self.is_recording = True
         # Rozpoczynamy nagrywanie w osobnym wątku
-        self.recording_thread = threading.Thread(target=self.record_chunks)
+        target = self.write_buffers if self.mode == "callback" else self.record_chunks
+        self.recording_thread = threading.Thread(target=target)
         self.recording_thread.start()
 
+    def _open_files(self, filename):
+        """Otwiera plik nagrania (i plik do analizy) bieżącego segmentu."""
+        if self.segments:
+            filename = f"{self.segments.file_stem('audio_output', self.segment_index)}.wav"
+        self.current_filename = filename
+        self.frames_in_segment = 0
+        self.writer = StreamingWavWriter(filename, self.channels, self.sample_width, self.rate)
+        if self.analysis_rate:
+            try:
+                from app_front.audio_sidecar import AnalysisSidecar
+
+                self.analysis_filename = f"{os.path.splitext(filename)[0]}_16k.wav"
+                self.sidecar = AnalysisSidecar(
+                    self.analysis_filename, self.channels, self.rate, self.analysis_rate
+                )
+            except Exception as e:
+                print(f"Nie można utworzyć pliku do analizy: {e}")
+                self.analysis_filename = None
+                self.sidecar = None
+
+    def _close_files(self, writer, sidecar, index, filename, analysis_filename, frames):
+        writer.close()
+        if sidecar is not None:
+            sidecar.close()
+        if self.segments and frames == 0 and index > 0:
+            # Zatrzymanie dokładnie na granicy segmentu - pusty segment nie jest zapisywany
+            os.remove(filename)
+            if analysis_filename:
+                os.remove(analysis_filename)
+        elif self.segments:
+            self.segments.add_file(
+                "audio",
+                index,
+                audio=filename,
+                audio_analysis=analysis_filename,
+                duration=frames / self.rate,
+            )
+
+    def _rotate_segment(self):
+        """Zamyka pliki segmentu w tle (bez wstrzymywania zapisu) i otwiera kolejny segment."""
+        # Analiza zamkniętego segmentu czyta indeks czasów w trakcie nagrania
+        self.index.flush()
+        thread = threading.Thread(
+            target=self._close_files,
+            args=(
+                self.writer,
+                self.sidecar,
+                self.segment_index,
+                self.current_filename,
+                self.analysis_filename,
+                self.frames_in_segment,
+            ),
+        )
+        thread.start()
+        self.closing_threads.append(thread)
+        self.segment_index += 1
+        self._open_files(self.filename)
+
+    def _write_data(self, data):
+        self.writer.write(data)
+        if self.sidecar is not None:
+            self.sidecar.write(data)
+        self.frames_in_segment += len(data) // (self.channels * self.sample_width)
+
+    def _save_chunk(self, data, capture_time):
+        self.stats["buffers"] += 1
+        # Blok jest oddawany po nagraniu, więc jego pierwsza próbka powstała o długość bloku wcześniej
+        frames = len(data) // (self.channels * self.sample_width)
+        self.index.write(self.frames_recorded, capture_time - frames / self.rate)
+        self.frames_recorded += frames
+        if self.segment_frames:
+            # Blok przekraczający granicę segmentu jest dzielony na granicy próbki
+            frame_bytes = self.channels * self.sample_width
+            while True:
+                room = (self.segment_frames - self.frames_in_segment) * frame_bytes
+                if len(data) < room:
+                    break
+                self._write_data(data[:room])
+                data = data[room:]
+                self._rotate_segment()
+        if data:
+            self._write_data(data)
+
     def record_chunks(self):
-        """Nagrywa pojedyncze bloki danych w wątku."""
+        """Nagrywa pojedyncze bloki danych w wątku (tryb "blocking")."""
         while self.is_recording:
-            data = self.stream.read(self.chunk)
-            self.frames.append(data)
+            data = self.stream.read(self.chunk, exception_on_overflow=False)
+            self._save_chunk(data, self.clock.now())
+
+    def write_buffers(self):
+        """Zapisuje bloki przekazane przez callback PyAudio (tryb "callback")."""
+        expected_interval = self.chunk / self.rate
+        previous_adc_time = 0.0
+        while True:
+            item = self.buffers.get()
+            if item is None:
+                break
+            data, capture_time, adc_time, status_flags = item
+            self.stats["max_queue_depth"] = max(
+                self.stats["max_queue_depth"], self.buffers.qsize() + 1
+            )
+
+            if status_flags & pyaudio.paInputOverflow:
+                self.stats["overflows"] += 1
+                self.stats["overflow_times"].append(round(capture_time - self.start_time, 3))
+
+            # Czas ADC nie jest dostępny we wszystkich sterownikach (wtedy wynosi 0)
+            if adc_time and previous_adc_time:
+                interval = adc_time - previous_adc_time
+                if interval > 1.5 * expected_interval:
+                    self.stats["gaps"] += 1
+                    self.stats["gap_seconds"] += interval - expected_interval
+            previous_adc_time = adc_time
+
+            self._save_chunk(data, capture_time)
 
     def stop_recording(self):
-        """Zatrzymuje nagrywanie i zapisuje dane do pliku."""
+        """Zatrzymuje nagrywanie i zamyka plik WAV."""
         print("Zatrzymywanie nagrywania...")
         self.is_recording = False  # Zatrzymujemy nagrywanie
+        if self.stream and self.mode == "callback":
+            self.stream.stop_stream()  # po zatrzymaniu strumienia callback nie jest już wywoływany
+            self.buffers.put(None)
         self.recording_thread.join()  # Czekamy na zakończenie wątku nagrywania
 
         if self.stream:
-            self.stream.stop_stream()
+            if self.stream.is_active():
+                self.stream.stop_stream()
             self.stream.close()
             self.stream = None
 
-            # Zapisz nagrany dźwięk do pliku WAV
-            with wave.open(self.filename, "wb") as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(self.p.get_sample_size(pyaudio.paInt16))
-                wf.setframerate(self.rate)
-                wf.writeframes(b"".join(self.frames))
+            # Uzupełnienie nagłówka pliku WAV (w trybie segmentowym - ostatniego segmentu)
+            self._close_files(
+                self.writer,
+                self.sidecar,
+                self.segment_index,
+                self.current_filename,
+                self.analysis_filename,
+                self.frames_in_segment,
+            )
+            for thread in self.closing_threads:
+                thread.join()
+            self.index.close()
 
-            print(f"Nagrywanie zakończone. Plik zapisany jako '{self.filename}'.")
+            print(f"Nagrywanie zakończone. Plik zapisany jako '{self.current_filename}'.")
+            print(f"Statystyki nagrania dźwięku: {self.get_stats()}")
             return self.filename
 
     def terminate(self):
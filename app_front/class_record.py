@@ -1,37 +1,221 @@
-import cv2
-import numpy as np
-from PIL import ImageGrab
-import datetime
+import math
+import time
+import zlib
 from threading import Thread
 
+import app_front.capture_backends as capture_backends
+import app_front.video_encoder as video_encoder
+from app_backend.timestamp_index import KIND_VIDEO
+from app_front.session_clock import SessionClock, TimestampIndexWriter
+
+
+class FrameChangeDetector:
+    """
+    Tani test, czy obraz ekranu zmienił się od ostatniej zapisanej klatki.
+
+    Liczona jest suma kontrolna CRC32 co `row_step`-tego wiersza klatki (wiersze są ciągłe
+    w pamięci, więc nic nie jest kopiowane). Zmiana wysokości co najmniej `row_step` pikseli,
+    np. nowa linia tekstu czy przełączenie slajdu, zawsze zmienia sumę.
+    """
+
+    def __init__(self, row_step=4):
+        self.row_step = row_step
+        self.signature = None
+
+    def changed(self, image):
+        """Zwraca True, jeśli klatka różni się od poprzedniej (i zapamiętuje jej sumę)."""
+        signature = 0
+        for row in image[:: self.row_step]:
+            signature = zlib.crc32(row, signature)
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        return True
+
 
 class ScreenRecorder:
-    def __init__(self, directory):
+    def __init__(
+        self,
+        directory,
+        fast_finalize=True,
+        fps=10.0,
+        backend="auto",
+        out_of_process=True,
+        queue_slots=8,
+        queue_policy="block",
+        segments=None,
+        clock=None,
+        skip_unchanged=True,
+        monitor=None,
+        region=None,
+        output_size=None,
+    ):
+        # Źródło obrazu (mss, a gdy niedostępne - PIL ImageGrab)
+        # monitor - numer monitora (None - główny), region - fragment monitora (left, top, right,
+        # bottom), output_size - maksymalne wymiary klatki (szer., wys.), np. (1920, 1080)
+        self.backend = capture_backends.create_backend(
+            backend, capture_backends.capture_bbox(monitor, region), output_size
+        )
+        print(
+            f"Screen capture backend: {self.backend.name}, area {self.backend.bbox}, "
+            f"frame {self.backend.width}x{self.backend.height}"
+        )
+
         # Zmienne ekranu
-        self.width, self.height = ImageGrab.grab().size  # Pobiera wymiary ekranu
+        self.width, self.height = self.backend.size  # Wymiary klatki wideo
+        self.fps = fps
 
-        # Nazwa pliku wideo
-        current_time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        file_name = f"../tmp/{directory}/video_output.avi"
+        # Zmienna liczba klatek na sekundę: niezmieniony ekran nie jest kodowany, a poprzednia
+        # klatka trwa dłużej (przerwa w numeracji klatek zapisana w pliku wideo)
+        self.change_detector = FrameChangeDetector() if skip_unchanged else None
 
-        # Inicjalizacja VideoWriter
-        self.fourcc = cv2.VideoWriter_fourcc(*"XVID")
-        self.captured_video = cv2.VideoWriter(
-            file_name, self.fourcc, 10.0, (self.width, self.height)
+        # Wspólny zegar z nagrywaniem dźwięku; czasy klatek trafiają do indeksu video_output.tsi
+        self.clock = clock or SessionClock()
+        self.index_file_name = f"../tmp/{directory}/video_output.tsi"
+        self.index = None
+
+        # Nagrywanie segmentowe (SegmentManifest): nowy plik co segment_seconds sekund nagrania
+        self.segments = segments
+        self.segment_index = 0
+        self.file_segments = {}  # plik wideo -> numer segmentu
+        file_stem = f"../tmp/{directory}/video_output"
+        if segments:
+            self.frames_per_segment = round(segments.segment_seconds * fps)
+            file_stem = segments.file_stem("video_output", 0)
+
+        # Inicjalizacja kodera wideo
+        # Domyślnie klatki trafiają przez bufor pierścieniowy do osobnego procesu kodującego H.264,
+        # więc kodowanie nie opóźnia pobierania klatek, a po zatrzymaniu nagrania wystarczy
+        # skopiować strumień. Zapasowo używany jest cv2.VideoWriter w wątku nagrywania.
+        self.encoder = video_encoder.create_encoder(
+            file_stem,
+            self.width,
+            self.height,
+            self.fps,
+            fast_finalize=fast_finalize,
+            out_of_process=out_of_process,
+            slots=queue_slots,
+            policy=queue_policy,
+            on_file_closed=self._on_file_closed,
         )
+        self.file_name = self.encoder.file_name
+        self.file_segments[self.file_name] = 0
+        self.delivery_codec = self.encoder.delivery_codec
         self.record_status = False
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "captured": 0,  # pobrane zrzuty ekranu
+            "written": 0,  # klatki przekazane do kodera
+            "duplicated": 0,  # terminy wypełnione poprzednią klatką
+            "dropped": 0,  # zrzuty odrzucone (termin już zapisany lub pełny bufor kodera)
+            "late": 0,  # zrzuty pobrane po terminie kolejnej klatki
+            "unchanged": 0,  # zrzuty identyczne z poprzednią klatką (niekodowane)
+            "grab_ms_total": 0.0,
+        }
+
+    def get_stats(self):
+        """Zwraca liczniki nagrania wraz ze średnim czasem pobrania klatki w ms i licznikami kodera."""
+        stats = dict(self.stats)
+        stats["avg_grab_ms"] = (
+            stats["grab_ms_total"] / stats["captured"] if stats["captured"] else 0.0
+        )
+        stats["encoder"] = self.encoder.get_stats()
+        return stats
+
+    def _on_file_closed(self, file_name):
+        if self.segments:
+            self.segments.add_file("video", self.file_segments[file_name], video=file_name)
+
+    def _rotate_until(self, slot, include_boundary=True):
+        """Zamyka segmenty, których koniec przypada przed klatką `slot` (lub na nią)."""
+        while self.segments:
+            boundary = (self.segment_index + 1) * self.frames_per_segment
+            if slot < boundary or (slot == boundary and not include_boundary):
+                break
+            self.segment_index += 1
+            # Analiza zamkniętego segmentu czyta indeks czasów w trakcie nagrania
+            self.index.flush()
+            self.encoder.rotate(
+                self.segments.file_stem("video_output", self.segment_index), boundary
+            )
+            self.file_segments[self.encoder.file_name] = self.segment_index
 
     def _screen_record(self):
-        """Wątek odpowiedzialny za nagrywanie wideo."""
+        """
+        Wątek odpowiedzialny za nagrywanie wideo.
+
+        Klatka numer n odpowiada chwili start + n / fps zegara sesji. Spóźnione terminy
+        są wypełniane poprzednią klatką, a zrzuty pobrane w już zapisanym terminie są odrzucane,
+        dzięki czemu czas nagrania odpowiada rzeczywistemu czasowi. Zrzuty identyczne
+        z poprzednią klatką nie są kodowane - poprzednia klatka trwa dalej.
+        """
+        self.stats = self._empty_stats()
+        if self.change_detector is not None:
+            self.change_detector.signature = None
+        frame_interval = 1.0 / self.fps
+        self.index = TimestampIndexWriter(self.index_file_name, KIND_VIDEO, self.fps)
+        start = self.clock.now()
+        next_slot = 0  # numer kolejnej klatki do zapisania
+        has_frame = False
+
         while self.record_status:
-            # Pobranie klatki ekranu
-            img = ImageGrab.grab(bbox=(0, 0, self.width, self.height))
-            np_img = np.array(img)
-            cvt_img = cv2.cvtColor(np_img, cv2.COLOR_BGR2RGB)  # Konwersja kolorów
+            # Wolny bufor kodera, do którego zostanie pobrana klatka
+            buffer_slot, buffer = self.encoder.acquire_buffer()
+            grab_start = self.clock.now()
+            # Termin, w którym zrzut jest pobierany (1e-6 chroni przed błędem zaokrąglenia)
+            slot = math.floor((grab_start - start) * self.fps + 1e-6)
+
+            if buffer is None:
+                # Pełny bufor kodera - poprzednia klatka trwa dłużej
+                self.stats["dropped"] += 1
+                next_slot = max(next_slot, slot + 1)
+            else:
+                # Pobranie klatki ekranu bezpośrednio do bufora w formacie BGR
+                self.backend.grab(buffer)
+                self.stats["captured"] += 1
+                self.stats["grab_ms_total"] += (self.clock.now() - grab_start) * 1000
+
+                if slot < next_slot:
+                    self.stats["dropped"] += 1
+                    self.encoder.release_buffer(buffer_slot)
+                else:
+                    if slot > next_slot and has_frame:
+                        self.stats["late"] += 1
+                        self.stats["duplicated"] += slot - next_slot
+
+                    # W trybie segmentowym klatka trafia do pliku swojego segmentu
+                    self._rotate_until(slot)
+                    if self.change_detector is None or self.change_detector.changed(buffer):
+                        # Zapis klatki do pliku wideo
+                        self.encoder.submit(buffer_slot, slot)
+                        self.index.write(slot, grab_start)
+                        self.stats["written"] += 1
+                        has_frame = True
+                    else:
+                        # Ekran bez zmian - termin zajmuje poprzednia klatka, nic nie jest kodowane
+                        self.stats["unchanged"] += 1
+                        self.encoder.release_buffer(buffer_slot)
+                    next_slot = slot + 1
+
+            # Oczekiwanie na termin kolejnej klatki
+            delay = start + next_slot * frame_interval - self.clock.now()
+            if delay > 0:
+                time.sleep(delay)
+
+        # Ostatnia klatka trwa do chwili zatrzymania nagrania
+        buffer = None  # widok pamięci współdzielonej musi zniknąć przed jej zwolnieniem
+        end_slot = max(math.floor((self.clock.now() - start) * self.fps), next_slot)
+        if has_frame:
+            self.stats["duplicated"] += end_slot - next_slot
+            self._rotate_until(end_slot, include_boundary=False)
+        self.encoder.finish(end_slot if has_frame else 0)
+        self.index.close()
 
-            # Zapis klatki do pliku wideo
-            self.captured_video.write(cvt_img)
-            cv2.waitKey(1)  # Krótka pauza dla stabilności
+        # Zasoby źródła obrazu zwalniane w wątku, który z nich korzystał
+        self.backend.close()
 
     def start_record(self):
         """Uruchom nagrywanie w osobnym wątku."""
@@ -45,11 +229,12 @@ class ScreenRecorder:
         if self.record_status:
             self.record_status = False
             self.thread.join()  # Poczekaj na zakończenie wątku
-            self.captured_video.release()  # Zakończ zapis wideo
+            self.encoder.close()  # Zakończ zapis wideo
             print("Recording stopped and file is released.")
+            print(f"Capture stats: {self.get_stats()}")
 
     def __del__(self):
         """Zwalnia zasoby podczas niszczenia obiektu."""
         if self.record_status:
             self.stop_record()
-        self.captured_video.release()
+        self.encoder.close()
@@ -1,5 +1,6 @@
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
+from threading import Event
 from tkinter import filedialog
 from tkinter import Toplevel
 
@@ -11,9 +12,17 @@ import webbrowser
 import os
 
 import app_front.class_record as rec_vid
+import app_front.capture_backends as capture_backends
 import app_front.class_audio as rec_aud
+from app_front.segments import SegmentManifest
+from app_front.session_clock import SessionClock
 from data_analyze import data_analyze
+import data_analyze.image_files_analyze as image_analyzer
 import app_backend.communication_with_www_server as com_www_server
+from app_backend.timestamp_index import video_to_audio_offset
+from app_backend.upload_engine import get_upload_engine
+from app_backend.note_catalog import NoteCatalog
+from app_backend.note_index import NoteIndex
 
 import app_front.quickstart as google_cal
 
@@ -32,23 +41,48 @@ class IoFront(ttk.Frame):
         self.recording_video = False
         self.recording_audio = False
         self.record_dir = ""
+        self.video_file_name = ""
+        self.video_stream_copy = False
+        self.muxing_done = Event()  # ustawiane po zakończeniu tworzenia combined.mp4
+        self.clock = None  # wspólny zegar nagrywania dźwięku i obrazu
+
+        # Nagrywanie segmentowe: co segment_seconds sekund zamknięty segment trafia do analizy,
+        # a po zatrzymaniu nagrania zostaje tylko ostatni segment. None - analiza całego nagrania
+        self.segment_seconds = None
+        self.segments = None
+        self.segment_futures = {}
+        self.segment_executor = ThreadPoolExecutor(max_workers=1)
 
         self.left_container = ttk.LabelFrame(self, text="Recordings")
         self.left_container.pack(padx=5, pady=10, side=LEFT, fill=Y)
 
-        self.application_name = "MSTeams"  # nazwa wybranej aplikacji do nagrania
+        self.application_name = image_analyzer.AUTO_APPLICATION  # nazwa wybranej aplikacji do nagrania
+
+        # Obszar nagrania: numer monitora (None - główny), fragment monitora (left, top, right,
+        # bottom) oraz maksymalne wymiary klatki wideo (None - bez zmniejszania)
+        self.capture_monitor = None
+        self.capture_region = None
+        self.capture_size = None
+
+        # Limit wysyłania na serwer w bajtach na sekundę (None - bez limitu), np. aby wysyłanie
+        # notatki nie zajmowało całego łącza podczas następnego spotkania
+        self.upload_bandwidth_limit = None
+        get_upload_engine().set_bandwidth_limit(self.upload_bandwidth_limit)
 
         """logowanie do google"""
         self.google_ = google_cal.Calendar()
 
-        """pobieranie danych z serwera"""
-        self.import_from_server = com_www_server.get_info_of_notes_from_server()
-        if self.import_from_server is not None:
-            self.imported_notes = self.import_from_server["notes"]
-        else:
-            self.imported_notes = []
-        # print(self.imported_notes[0]["note_id"])
+        """lista notatek z lokalnego katalogu - synchronizacja z serwerem w tle"""
+        self.catalog = NoteCatalog()
+        self.imported_notes = self.catalog.list_notes()
         self.clicked_note = ""
+        self.clicked_timestamp = None  # moment nagrania wybranego wyniku wyszukiwania
+
+        """lokalny indeks wyszukiwania - wyniki z miejscem w nagraniu bez otwierania plików notatek"""
+        self.note_index = NoteIndex()
+        self.search_hits = []
+        self.search_window = None
+        self.search_query = ""
 
         """save directory"""
         self.selected_dir_var = "../default_save_folder"
@@ -61,10 +95,13 @@ class IoFront(ttk.Frame):
 
         # dodanie listy spotkań
         self.tree = self.create_treeview()
+        self.show_notes(self.imported_notes)
+        self.sync_catalog()
 
         self.right_container = ttk.Frame(self)
 
         self.drop_menu_app()
+        self.drop_menu_monitor()
 
         # GUI setup
         self.new_record_container = ttk.LabelFrame(
@@ -86,6 +123,12 @@ class IoFront(ttk.Frame):
         self.create_search_button()
         self.search_container.pack(padx=5, pady=10)
 
+        self.upload_container = ttk.LabelFrame(self.right_container, text="Uploads")
+        self.upload_label = ttk.Label(self.upload_container, width=28, text="")
+        self.upload_label.pack(padx=5, pady=5)
+        self.upload_container.pack(padx=5, pady=10)
+        self.refresh_upload_state()
+
         self.right_container.pack(side=LEFT, padx=20, pady=10, fill=Y)
 
         self.send_failed_files()
@@ -113,31 +156,7 @@ class IoFront(ttk.Frame):
 
         tree.tag_configure("change_bg", background="#20374C")
 
-        data = self.imported_notes
-
-        tree.tag_configure("change_bg", background="#20374C")
-        index = 0
-        for i in data:
-            print(i)
-            if int(index) % 2 == 1:
-                tree.insert(
-                    "",
-                    "end",
-                    values=[i["note_id"], i["datetime"], i["title"]],
-                    tags="change_bg",
-                    iid=index,
-                )
-            else:
-                tree.insert(
-                    "",
-                    "end",
-                    values=[i["note_id"], i["datetime"], i["title"]],
-                    iid=index,
-                )
-            tree.bind("<<TreeviewSelect>>", self.tree_on_click_element)
-            # tree.bind("<Button-3>", self.identify_item)
-
-            index += 1
+        tree.bind("<<TreeviewSelect>>", self.tree_on_click_element)
 
         return tree
 
@@ -145,6 +164,7 @@ class IoFront(ttk.Frame):
         clickedItem = self.tree.focus()
         print(self.tree.item(clickedItem)["values"])
         self.clicked_note = self.tree.item(clickedItem)["values"][0]
+        self.clicked_timestamp = None
         return
 
     def create_entry(self):
@@ -161,7 +181,8 @@ class IoFront(ttk.Frame):
     def drop_menu_app(self):
         mb = ttk.Menubutton(master=self.right_container, width=16, text="Application")
         mb.pack(padx=5, pady=10)
-        options = ["MSTeams", "Zoom", "Google Meet"]
+        # Opcje na podstawie szablonów w data_analyze/templates, "Auto" wykrywa aplikację z nagrania
+        options = [image_analyzer.AUTO_APPLICATION] + image_analyzer.application_names()
         inside_menu = ttk.Menu(mb, tearoff=0)
 
         def on_click(option):
@@ -174,6 +195,27 @@ class IoFront(ttk.Frame):
             )
         mb["menu"] = inside_menu
 
+    def drop_menu_monitor(self):
+        mb = ttk.Menubutton(master=self.right_container, width=16, text="Monitor")
+        mb.pack(padx=5, pady=10)
+        try:
+            monitors = capture_backends.list_monitors()
+        except Exception as e:
+            print(f"Monitor list unavailable: {e}")
+            monitors = []
+        inside_menu = ttk.Menu(mb, tearoff=0)
+
+        def on_click(index):
+            self.capture_monitor = index
+            print(f"Monitor: {index}")
+
+        for index, (left, top, right, bottom) in enumerate(monitors):
+            inside_menu.add_radiobutton(
+                label=f"{index + 1}: {right - left}x{bottom - top}",
+                command=lambda x=index: on_click(x),
+            )
+        mb["menu"] = inside_menu
+
     def open_in_browser_button(self):
         button = ttk.Button(
             master=self.action_container, width=20, text="Open in browser"
@@ -182,7 +224,7 @@ class IoFront(ttk.Frame):
         button.bind(
             "<Button-1>",
             lambda x: webbrowser.open_new(
-                f"https://ioprojekt.atwebpages.com/{self.clicked_note}"
+                com_www_server.note_url(self.clicked_note, self.clicked_timestamp)
             ),
         )
         return button
@@ -196,69 +238,131 @@ class IoFront(ttk.Frame):
         return button
 
     def on_click_refresh(self):
-        data = com_www_server.get_info_of_notes_from_server()["notes"]
-        print(data)
-        index = 0
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        for i in data:
-            # print(i)
-            if int(index) % 2 == 1:
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=[i["note_id"], i["datetime"], i["title"]],
-                    tags="change_bg",
-                    iid=index,
-                )
+        self.show_notes(self.catalog.list_notes())
+        self.sync_catalog()
+
+    def show_notes(self, notes):
+        """Wypełnia listę notatek (identyfikator wiersza to note_id)."""
+        self.tree.delete(*self.tree.get_children())
+        for note in notes:
+            if not self.tree.exists(note["note_id"]):
+                self.tree.insert("", "end", iid=note["note_id"], values=[note["note_id"], note["datetime"], note["title"]])
+        self.stripe_tree()
+
+    def stripe_tree(self):
+        for index, iid in enumerate(self.tree.get_children()):
+            self.tree.item(iid, tags="change_bg" if index % 2 == 1 else "")
+
+    def sync_catalog(self):
+        """Synchronizuje katalog z serwerem w tle, a zmiany nanosi na listę w wątku Tk."""
+        future = self.executor.submit(self.catalog.sync_with_server)
+        future.add_done_callback(lambda f: self.master.after(0, self.apply_catalog_diff, f.result()))
+
+    def apply_catalog_diff(self, diff):
+        """Nanosi na listę tylko zmienione notatki (dodane, zmienione, usunięte)."""
+        if not diff:
+            return
+        for note_id in diff["removed"]:
+            if self.tree.exists(note_id):
+                self.tree.delete(note_id)
+        for note in diff["added"] + diff["updated"]:
+            values = [note["note_id"], note["datetime"], note["title"]]
+            if self.tree.exists(note["note_id"]):
+                self.tree.item(note["note_id"], values=values)
             else:
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=[i["note_id"], i["datetime"], i["title"]],
-                    iid=index,
-                )
-            self.tree.bind("<<TreeviewSelect>>", self.tree_on_click_element)
-            # tree.bind("<Button-3>", self.identify_item)
-
-            index += 1
-
-        return
+                self.tree.insert("", "end", iid=note["note_id"], values=values)
+        if diff["added"] or diff["updated"]:
+            # Najnowsze notatki na górze, jak w katalogu
+            order = sorted(self.tree.get_children(), key=lambda iid: str(self.tree.item(iid)["values"][1]), reverse=True)
+            for index, iid in enumerate(order):
+                self.tree.move(iid, "", index)
+        self.stripe_tree()
 
     def on_click_search(self):
         get_text = self.search_entry.get()
-        data = com_www_server.get_info_of_notes_from_server_if_note_contain_search_word(
-            get_text
-        )["notes"]
-        # print(data)
-        index = 0
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        for i in data:
-            print(i)
-            if int(index) % 2 == 1:
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=[i["note_id"], i["datetime"], i["title"]],
-                    tags="change_bg",
-                    iid=index,
-                )
-            else:
-                self.tree.insert(
-                    "",
-                    "end",
-                    values=[i["note_id"], i["datetime"], i["title"]],
-                    iid=index,
-                )
-            self.tree.bind("<<TreeviewSelect>>", self.tree_on_click_element)
-            # tree.bind("<Button-3>", self.identify_item)
+        # Najpierw lokalny indeks: trafienia z czasem, rozmówcą i fragmentem tekstu
+        try:
+            hits = self.note_index.search(get_text)
+        except Exception as e:
+            print(f"Local search failed: {e}")
+            hits = []
+        self.search_query = get_text
+        self.show_search_hits(hits)
+        self.search_window.title("Search results - searching server...")
+
+        # Zawsze pytamy też serwer (w tle) - notatki nagrane na innym komputerze są tylko tam
+        future = self.executor.submit(
+            com_www_server.get_info_of_notes_from_server_if_note_contain_search_word, get_text
+        )
+        future.add_done_callback(
+            lambda f: self.master.after(0, self.add_server_results, get_text, f.result())
+        )
 
-            index += 1
+    def show_search_hits(self, hits):
+        """Pokazuje trafienia w osobnym okienku; wybrane trafienie otwiera notatkę w tym miejscu nagrania."""
+        self.search_hits = []
+        if self.search_window is None or not self.search_window.winfo_exists():
+            self.search_window = Toplevel(self.master)
+            self.search_window.geometry("800x400")
+            columns = ["note", "time", "speaker", "text"]
+            tree = ttk.Treeview(
+                master=self.search_window,
+                bootstyle="secondary",
+                columns=columns,
+                show="headings",
+            )
+            tree.column("note", width=150)
+            tree.column("time", width=80, anchor=CENTER)
+            tree.column("speaker", width=100, anchor=CENTER)
+            tree.column("text", width=450)
+            for column in columns:
+                tree.heading(column, text=column)
+            tree.tag_configure("change_bg", background="#20374C")
+            tree.bind("<<TreeviewSelect>>", self.search_hit_on_click)
+            tree.bind("<Double-1>", lambda x: self.open_search_hit())
+            tree.pack(padx=10, pady=10, fill=BOTH, expand=True)
+            self.search_window.hits_tree = tree
+        self.search_window.title("Search results")
+        self.search_window.hits_tree.delete(*self.search_window.hits_tree.get_children())
+        for hit in hits:
+            # Tekst slajdu oznaczony jest jako OCR, tytuł i podsumowanie nie mają czasu
+            position = hit["timestamp_str"] if hit["kind"] in ("text", "ocr") else hit["kind"]
+            speaker = f"{hit['speaker']} (OCR)" if hit["kind"] == "ocr" else hit["speaker"]
+            self.insert_search_hit(hit, [hit["title"] or hit["note_id"], position, speaker, hit["snippet"]])
+        self.search_window.lift()
+
+    def insert_search_hit(self, hit, values):
+        index = len(self.search_hits)
+        self.search_hits.append(hit)
+        self.search_window.hits_tree.insert(
+            "", "end", iid=str(index), values=values, tags="change_bg" if index % 2 == 1 else ""
+        )
 
-        return
+    def add_server_results(self, query, data):
+        """Dopisuje do wyników notatki znalezione przez serwer, których nie ma wśród trafień lokalnych."""
+        if self.search_window is None or not self.search_window.winfo_exists() or query != self.search_query:
+            return  # okienko zamknięte albo wyniki starszego wyszukiwania
+        if data is None:
+            self.search_window.title("Search results - server unavailable")
+            return
+        local_notes = {hit["note_id"] for hit in self.search_hits}
+        for note in data["notes"]:
+            if f"{note['note_id']}" in local_notes:
+                continue
+            hit = {"note_id": note["note_id"], "timestamp": None, "kind": "server"}
+            self.insert_search_hit(hit, [note["title"] or note["note_id"], note["datetime"], "", "Found on server"])
+        self.search_window.title("Search results")
+
+    def search_hit_on_click(self, event):
+        selected = self.search_window.hits_tree.focus()
+        if not selected:
+            return
+        hit = self.search_hits[int(selected)]
+        self.clicked_note = hit["note_id"]
+        self.clicked_timestamp = hit["timestamp"] if hit["kind"] in ("text", "ocr") else None
+
+    def open_search_hit(self):
+        webbrowser.open_new(com_www_server.note_url(self.clicked_note, self.clicked_timestamp))
 
     def start_recording_button(self):
         button = ttk.Button(
@@ -288,15 +392,44 @@ class IoFront(ttk.Frame):
         self.executor.submit(self._combining_recordings)
 
     def _combining_recordings(self):
+        # Wideo zakodowane już w H.264 jest tylko kopiowane, pełne przekodowanie zostaje
+        # jako ścieżka zapasowa dla nagrań XVID
+        video_codec = "copy" if self.video_stream_copy else "libx264"
         try:
-            cmd = f"ffmpeg -i ../tmp/{self.record_dir}/audio_output.wav -i ../tmp/{self.record_dir}/video_output.avi -c:v libx264 -c:a aac -strict experimental ../tmp/{self.record_dir}/combined.mp4"
+            # Obraz jest przesuwany o chwilę nagrania dźwięku, w której pobrano pierwszą klatkę
+            # (indeksy czasów obu nagrań), więc w combined.mp4 obraz i dźwięk są zsynchronizowane
+            offset = video_to_audio_offset(f"../tmp/{self.record_dir}")
+            # Argumenty jako lista (bez powłoki) - ścieżki mogą zawierać spacje
+            inputs = [
+                "-i", f"../tmp/{self.record_dir}/audio_output.wav",
+                "-itsoffset", f"{offset:.3f}", "-i", self.video_file_name,
+            ]
+            if self.segments:
+                # Segmenty są łączone demultiplekserem concat, bez ponownego kodowania wideo
+                audio_list = f"../tmp/{self.record_dir}/audio_segments.txt"
+                video_list = f"../tmp/{self.record_dir}/video_segments.txt"
+                self.segments.write_concat_list("audio", audio_list)
+                self.segments.write_concat_list("video", video_list)
+                inputs = [
+                    "-f", "concat", "-safe", "0", "-i", audio_list,
+                    "-itsoffset", f"{offset:.3f}", "-f", "concat", "-safe", "0", "-i", video_list,
+                ]
+            cmd = [
+                "ffmpeg", *inputs, "-c:v", video_codec, "-c:a", "aac", "-strict", "experimental",
+                f"../tmp/{self.record_dir}/combined.mp4",
+            ]
             with open(f"../tmp/{self.record_dir}/ffmpeg_log", "w") as log_file:
-                subprocess.call(
-                    cmd, shell=True, stdout=log_file, stderr=subprocess.STDOUT
+                return_code = subprocess.call(
+                    cmd, stdout=log_file, stderr=subprocess.STDOUT
                 )
-            print("Muxing Done")
+            if return_code == 0:
+                print("Muxing Done")
+            else:
+                print(f"Muxing Error: ffmpeg exited with code {return_code}")
         except Exception as e:
             print(f"Muxing Error {e}")
+        finally:
+            self.muxing_done.set()
 
     def new_directory(self):
         self.date_var = datetime.now()
@@ -309,6 +442,14 @@ class IoFront(ttk.Frame):
         # Ustaw flagi na True, aby rozpocząć nagrywanie
         self.recording_video = True
         self.recording_audio = True
+        self.muxing_done.clear()
+        self.clock = SessionClock()
+        self.segments = None
+        self.segment_futures = {}
+        if self.segment_seconds:
+            self.segments = SegmentManifest(
+                self.record_dir, self.segment_seconds, on_segment_ready=self.on_segment_ready
+            )
         print("Starting recordings...")
 
         # Przekaż funkcje do executor
@@ -328,7 +469,16 @@ class IoFront(ttk.Frame):
     # Twoje istniejące metody
     def start_video_recording(self):
         print("Video recording thread started")
-        self.screen_recorder = rec_vid.ScreenRecorder(self.record_dir)
+        self.screen_recorder = rec_vid.ScreenRecorder(
+            self.record_dir,
+            segments=self.segments,
+            clock=self.clock,
+            monitor=self.capture_monitor,
+            region=self.capture_region,
+            output_size=self.capture_size,
+        )
+        self.video_file_name = self.screen_recorder.file_name
+        self.video_stream_copy = self.screen_recorder.delivery_codec
         print("Initializing screen recorder...")
         self.screen_recorder.start_record()
         print("Video recording started")
@@ -343,7 +493,7 @@ class IoFront(ttk.Frame):
     def start_audio_recording(self):
         print("Audio recording thread started")
         self.audio_recorder = rec_aud.AudioRecorder(
-            f"../tmp/{self.record_dir}/audio_output.wav"
+            f"../tmp/{self.record_dir}/audio_output.wav", segments=self.segments, clock=self.clock
         )  # Utwórz obiekt nagrywania audio
         self.audio_recorder.start_recording()  # Rozpocznij nagrywanie
         print("Audio recording started")
@@ -352,19 +502,33 @@ class IoFront(ttk.Frame):
         if hasattr(self, "audio_recorder"):
             print("Stopping audio recording...")
             audio_filename = self.audio_recorder.stop_recording()
+            analysis_audio_filename = self.audio_recorder.analysis_filename
             print("Audio recording stopped")
 
             # video_filename = f"../tmp/{self.record_dir}/video_output.avi"  # Zakładając, że to nazwa pliku wideo
             self.open_input_name_dir_window()
             self.executor.submit(
-                self.start_data_analization, audio_filename
+                self.start_data_analization, audio_filename, analysis_audio_filename
             )
 
-    def start_data_analization(self, audio_filename):
+    def on_segment_ready(self, segment):
+        """Zamknięty segment nagrania (audio i wideo) trafia do analizy w trakcie spotkania."""
+        print(f"Segment {segment['index']} ready")
+        self.segment_futures[segment["index"]] = self.segment_executor.submit(
+            data_analyze.analyze_segment, segment, self.application_name
+        )
+
+    def start_data_analization(self, audio_filename, analysis_audio_filename=None):
+        # Analiza czyta combined.mp4, więc czeka na zakończenie łączenia nagrań
+        self.muxing_done.wait()
+        if self.segments:
+            self.finish_segments_analization()
+            return
         try:
             data_analyze.main(
                 temp_dir_name=self.record_dir,
                 filename_audio=audio_filename,
+                filename_audio_analysis=analysis_audio_filename,
                 filename_video=f"../tmp/{self.record_dir}/combined.mp4",
                 application_name=self.application_name,
                 user_dir=self.selected_dir_var,
@@ -377,8 +541,49 @@ class IoFront(ttk.Frame):
         except Exception as e:
             print(f"Error in data_analyze: {e}")
 
+    def finish_segments_analization(self):
+        """Czeka na analizę segmentów (po zatrzymaniu zostaje tylko ostatni) i zapisuje notatkę."""
+        try:
+            for segment in self.segments.get_segments():
+                # Segment bez kompletu plików (np. błąd jednego z nagrań) jest analizowany teraz
+                if segment["index"] not in self.segment_futures:
+                    self.segment_futures[segment["index"]] = self.segment_executor.submit(
+                        data_analyze.analyze_segment, segment, self.application_name
+                    )
+            results = [future.result() for future in self.segment_futures.values()]
+            data_analyze.main_segments(
+                segment_results=results,
+                temp_dir_name=self.record_dir,
+                filename_video=f"../tmp/{self.record_dir}/combined.mp4",
+                user_dir=self.selected_dir_var,
+                title=self.file_name,
+                datetime=self.date_var,
+            )
+            self.master.after(0, lambda: print("Transcription finished"))
+        except Exception as e:
+            print(f"Error in data_analyze: {e}")
+
     def send_failed_files(self):
-        retry_logic.send_failed_files()
+        """Ponawia wysyłanie nieudanych plików w tle, aby nie blokować wątku Tk (przy starcie i odświeżeniu)."""
+        self.executor.submit(retry_logic.send_failed_files)
+
+    def refresh_upload_state(self):
+        """Co sekundę pokazuje stan kolejki wysyłania (wysyłane pliki i postęp)."""
+        files = get_upload_engine().get_queue_state()
+        if files:
+            uploading = [f for f in files if f["state"] == "uploading"]
+            sent = sum(f["bytes_sent"] for f in files)
+            total = sum(f["total_bytes"] for f in files)
+            lines = [f"{len(uploading)} uploading, {len(files) - len(uploading)} queued"]
+            lines += [
+                f"{os.path.basename(f['file_path'])[:20]} {100 * f['bytes_sent'] // max(f['total_bytes'], 1)}%"
+                for f in uploading
+            ]
+            lines.append(f"{sent / 2 ** 20:.1f} / {total / 2 ** 20:.1f} MB")
+            self.upload_label.configure(text="\n".join(lines))
+        else:
+            self.upload_label.configure(text="No uploads")
+        self.master.after(1000, self.refresh_upload_state)
 
     def open_directory_picker(self):
         """Funkcja otwierająca okienko do wyboru katalogu."""
@@ -428,6 +633,8 @@ class IoFront(ttk.Frame):
         print("Shutting down executor...")
         self.stop_video_recording()
         self.stop_audio_recording()
+        self.muxing_done.set()  # odblokowuje analizę czekającą na łączenie nagrań
+        self.segment_executor.shutdown(wait=False, cancel_futures=True)
         self.executor.shutdown(wait=False)  # Czeka na zakończenie wszystkich zadań
         print("Executor shut down. Closing application.")
         self.master.destroy()  # Zamyka główne okno aplikacji
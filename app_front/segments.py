@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+
+
+class SegmentManifest:
+    """
+    Spis segmentów nagrania zapisywany w pliku `../tmp/<directory>/segments.json`.
+
+    Nagrywanie dźwięku i obrazu jest dzielone na segmenty o długości `segment_seconds` sekund.
+    Segment numer n zaczyna się dokładnie w chwili n * segment_seconds od początku nagrania, więc
+    znaczniki czasu z analizy segmentu wystarczy przesunąć o jego początek. Rejestratory zgłaszają
+    zamknięte pliki metodą `add_file`, a gdy segment ma już wszystkie pliki (`kinds`), wywoływane
+    jest `on_segment_ready(segment)` - segment można analizować w trakcie trwania spotkania.
+    """
+
+    def __init__(self, directory, segment_seconds, kinds=("audio", "video"), on_segment_ready=None):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.kinds = tuple(kinds)
+        self.on_segment_ready = on_segment_ready
+        self.path = f"../tmp/{directory}/segments.json"
+        self.segments = {}
+        self.ready = set()
+        self.lock = threading.Lock()
+
+    def file_stem(self, name, index):
+        """Ścieżka pliku segmentu bez rozszerzenia, np. ../tmp/<dir>/audio_output_003."""
+        return f"../tmp/{self.directory}/{name}_{index:03d}"
+
+    def segment_start(self, index):
+        return index * self.segment_seconds
+
+    def add_file(self, kind, index, **files):
+        """
+        Zapisuje zamknięty plik segmentu.
+
+        Args:
+            kind (str): Rodzaj pliku ("audio" lub "video").
+            index (int): Numer segmentu.
+            **files: Ścieżki plików i dodatkowe informacje (np. audio=..., duration=...).
+        """
+        with self.lock:
+            segment = self.segments.setdefault(
+                index, {"index": index, "start": self.segment_start(index)}
+            )
+            segment.update(files)
+            segment.setdefault("kinds", [])
+            if kind not in segment["kinds"]:
+                segment["kinds"].append(kind)
+            self._write()
+
+            is_ready = index not in self.ready and all(k in segment["kinds"] for k in self.kinds)
+            if is_ready:
+                self.ready.add(index)
+                segment = dict(segment)
+
+        if is_ready and self.on_segment_ready is not None:
+            self.on_segment_ready(segment)
+
+    def get_segments(self):
+        """Zwraca kopie opisów segmentów w kolejności nagrania."""
+        with self.lock:
+            return [dict(self.segments[i]) for i in sorted(self.segments)]
+
+    def is_ready(self, index):
+        with self.lock:
+            return index in self.ready
+
+    def _write(self):
+        # Zapis do pliku tymczasowego i podmiana, aby plik nigdy nie był częściowo zapisany
+        manifest = {
+            "segment_seconds": self.segment_seconds,
+            "segments": [self.segments[i] for i in sorted(self.segments)],
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(manifest, file, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def write_concat_list(self, key, list_path):
+        """
+        Tworzy listę plików `key` wszystkich segmentów dla demultipleksera concat ffmpeg.
+
+        Returns:
+            int: Liczba plików na liście.
+        """
+        files = [s[key] for s in self.get_segments() if s.get(key)]
+        with open(list_path, "w", encoding="utf-8") as file:
+            for name in files:
+                # W cudzysłowie ' zapisuje się jako '\'' (zamknięcie, znak ucieczki, otwarcie)
+                path = os.path.abspath(name).replace("'", "'\\''")
+                file.write(f"file '{path}'\n")
+        return len(files)
@@ -0,0 +1,57 @@
+import time
+
+from app_backend.timestamp_index import INDEX_HEADER, INDEX_MAGIC, INDEX_RECORD, INDEX_VERSION
+
+# Co ile sekund zapisane rekordy indeksu trafiają do pliku - analiza segmentów czyta indeks
+# w trakcie nagrywania (app_backend.timestamp_index.read_timestamp_index)
+INDEX_FLUSH_INTERVAL = 1.0
+
+
+class SessionClock:
+    """
+    Wspólny zegar monotoniczny sesji nagrania.
+
+    Oba rejestratory (dźwięk i obraz) odczytują czas z tego samego zegara, więc ich znaczniki
+    czasu można porównywać bez dekodowania plików.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+
+    def now(self):
+        """Sekundy od początku sesji."""
+        return time.perf_counter() - self.origin
+
+
+class TimestampIndexWriter:
+    """
+    Zapisuje na bieżąco zwarty indeks czasów (16 bajtów nagłówka + 12 bajtów na rekord).
+
+    Dla dźwięku rekord to (numer pierwszej próbki bloku, czas sesji jej nagrania), dla obrazu
+    (numer klatki - pts, czas sesji pobrania klatki). `rate` to częstotliwość próbkowania lub
+    liczba klatek na sekundę.
+
+    Rekordy są zapisywane do pliku co najmniej raz na `INDEX_FLUSH_INTERVAL` sekund oraz przy
+    `flush()` (zmiana segmentu), aby indeks czytany w trakcie nagrania nie kończył się przed
+    końcem analizowanego segmentu.
+    """
+
+    def __init__(self, filename, kind, rate):
+        self.filename = filename
+        self.file = open(filename, "wb")
+        self.file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, kind, float(rate)))
+        self.flush()
+
+    def write(self, position, session_time):
+        self.file.write(INDEX_RECORD.pack(position, session_time))
+        if time.monotonic() - self.flushed_at >= INDEX_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self.file.closed:
+            self.file.flush()
+        self.flushed_at = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
@@ -0,0 +1,421 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from fractions import Fraction
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+# Kolejność prób koderów w procesie kodującym; H.264 pozwala na samo kopiowanie strumienia przy łączeniu
+ENCODER_CODECS = ("libx264", "h264", "mpeg4")
+DELIVERY_CODECS = ("libx264", "h264")
+
+# Katalog główny projektu - proces kodujący jest uruchamiany jako `python -m app_front.video_encoder`
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class OpenCVVideoEncoder:
+    """
+    Koder wideo działający w wątku nagrywania (cv2.VideoWriter), używany gdy proces kodujący
+    nie może zostać uruchomiony.
+
+    Plik ma stałą liczbę klatek na sekundę, więc przerwy w numeracji klatek (pts) są wypełniane
+    powtórzeniem poprzedniej klatki.
+
+    `on_file_closed(file_name)` jest wywoływane po zamknięciu każdego pliku (`rotate`, `close`).
+    """
+
+    def __init__(self, file_stem, width, height, fps, fast_finalize=True, on_file_closed=None):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.on_file_closed = on_file_closed
+        self._open(file_stem, fast_finalize)
+
+        # Dwa bufory używane na zmianę: poprzednia klatka musi przetrwać do ewentualnego powtórzenia
+        self.buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(2)]
+        self.last_slot = None
+        self.last_pts = -1
+        self.stats = {"frames_written": 0}
+
+    def _open(self, file_stem, fast_finalize):
+        # W trybie fast_finalize wideo jest od razu kodowane do H.264 w MP4, więc po zatrzymaniu
+        # nagrania wystarczy skopiować strumień. Jeśli OpenCV nie ma kodera H.264, zapisujemy
+        # XVID w AVI i wideo jest przekodowywane przy łączeniu z dźwiękiem.
+        size = (self.width, self.height)
+        self.delivery_codec = False
+        if fast_finalize:
+            self.file_name = f"{file_stem}.mp4"
+            self.captured_video = cv2.VideoWriter(
+                self.file_name, cv2.VideoWriter_fourcc(*"avc1"), self.fps, size
+            )
+            self.delivery_codec = self.captured_video.isOpened()
+
+        if not self.delivery_codec:
+            self.file_name = f"{file_stem}.avi"
+            self.captured_video = cv2.VideoWriter(
+                self.file_name, cv2.VideoWriter_fourcc(*"XVID"), self.fps, size
+            )
+
+    def acquire_buffer(self):
+        # Zawsze bufor inny niż ten z ostatnio zapisaną klatką
+        slot = 0 if self.last_slot is None else 1 - self.last_slot
+        return slot, self.buffers[slot]
+
+    def release_buffer(self, slot):
+        pass
+
+    def _write_until(self, pts):
+        # Poprzednia klatka trwa do klatki o numerze pts
+        if self.last_slot is not None:
+            for _ in range(pts - self.last_pts - 1):
+                self.captured_video.write(self.buffers[self.last_slot])
+                self.stats["frames_written"] += 1
+
+    def submit(self, slot, pts):
+        self._write_until(pts)
+        self.captured_video.write(self.buffers[slot])
+        self.stats["frames_written"] += 1
+        self.last_slot = slot
+        self.last_pts = pts
+
+    def rotate(self, file_stem, start_pts):
+        """
+        Kończy bieżący plik na klatce `start_pts` i zaczyna nowy plik `file_stem`.
+
+        Poprzednia klatka jest pierwszą klatką nowego pliku, dopóki nie pojawi się kolejna.
+        """
+        self._write_until(start_pts)
+        self._release()
+        self._open(file_stem, self.delivery_codec)
+        if self.last_slot is not None:
+            self.last_pts = start_pts - 1
+
+    def finish(self, end_pts):
+        """Kończy plik tak, aby trwał `end_pts` klatek."""
+        self._write_until(end_pts)
+        self.last_slot = None
+
+    def _release(self):
+        if self.captured_video is not None:
+            self.captured_video.release()
+            self.captured_video = None
+            if self.on_file_closed is not None:
+                self.on_file_closed(self.file_name)
+
+    def close(self):
+        self._release()
+
+    def get_stats(self):
+        return dict(self.stats)
+
+
+class ProcessVideoEncoder:
+    """
+    Koder wideo w osobnym procesie, zasilany przez ograniczony bufor pierścieniowy klatek.
+
+    Klatki są pobierane bezpośrednio do slotów w pamięci współdzielonej, a do procesu kodującego
+    trafia tylko numer slotu i numer klatki (pts). Proces kodujący (PyAV) zwalnia slot zaraz po
+    skopiowaniu klatki, więc kodowanie nie zajmuje czasu wątku nagrywania.
+
+    Polityka przy pełnym buforze (`policy`):
+        - "block": wątek nagrywania czeka na wolny slot (czas oczekiwania jest liczony),
+        - "drop": klatka jest pomijana, a poprzednia klatka trwa dłużej.
+
+    `on_file_closed(file_name)` jest wywoływane (w wątku odbierającym komunikaty) po zamknięciu
+    każdego pliku przez proces kodujący.
+    """
+
+    def __init__(
+        self, file_name, width, height, fps, slots=8, policy="block", on_file_closed=None
+    ):
+        self.file_name = os.path.abspath(file_name)
+        self.on_file_closed = on_file_closed
+        self.slots = slots
+        self.policy = policy
+        frame_bytes = width * height * 3
+
+        self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        self.buffers = [
+            np.ndarray(
+                (height, width, 3), dtype=np.uint8, buffer=self.shm.buf, offset=i * frame_bytes
+            )
+            for i in range(slots)
+        ]
+        self.free_slots = queue.Queue()
+        for i in range(slots):
+            self.free_slots.put(i)
+
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "app_front.video_encoder",
+                self.shm.name,
+                str(width),
+                str(height),
+                str(fps),
+                self.file_name,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=PROJECT_DIR,
+            text=True,
+            bufsize=1,
+        )
+
+        # Pierwsza linia procesu kodującego: "R <koder>" albo koniec strumienia przy błędzie
+        ready = self.process.stdout.readline().split()
+        if len(ready) != 2 or ready[0] != "R":
+            self.process.wait()
+            self._release_shared_memory()
+            raise RuntimeError(f"Encoder process failed to start (code {self.process.returncode})")
+        self.codec = ready[1]
+        self.delivery_codec = self.codec in DELIVERY_CODECS
+
+        self.stats = {
+            "frames_submitted": 0,
+            "frames_dropped": 0,  # klatki pominięte przy pełnym buforze (policy="drop")
+            "blocked_ms": 0.0,  # czas oczekiwania na wolny slot (policy="block")
+            "max_queue_depth": 0,
+            "queue_depth_total": 0,
+        }
+        self.finished = False
+        self.reader = threading.Thread(target=self._read_events, daemon=True)
+        self.reader.start()
+
+    def _read_events(self):
+        """
+        Odbiera komunikaty procesu kodującego ("D <slot>" - slot wolny, "C <plik>" - plik zamknięty).
+        """
+        for line in self.process.stdout:
+            event = line.split(maxsplit=1)
+            if not event:
+                continue
+            if event[0] == "D":
+                self.free_slots.put(int(event[1]))
+            elif event[0] == "C" and self.on_file_closed is not None:
+                self.on_file_closed(event[1].strip())
+
+    def acquire_buffer(self):
+        """Zwraca (slot, bufor) do zapisu klatki albo (None, None), gdy klatka ma zostać pominięta."""
+        try:
+            slot = self.free_slots.get_nowait()
+        except queue.Empty:
+            if self.policy == "drop":
+                self.stats["frames_dropped"] += 1
+                return None, None
+            wait_start = time.perf_counter()
+            while True:
+                try:
+                    slot = self.free_slots.get(timeout=0.5)
+                    break
+                except queue.Empty:
+                    if self.process.poll() is not None:  # proces kodujący zakończył się błędem
+                        self.stats["frames_dropped"] += 1
+                        return None, None
+            self.stats["blocked_ms"] += (time.perf_counter() - wait_start) * 1000
+        return slot, self.buffers[slot]
+
+    def release_buffer(self, slot):
+        """Zwraca niewykorzystany slot do puli."""
+        self.free_slots.put(slot)
+
+    def _send(self, line):
+        self.process.stdin.write(line + "\n")
+        self.process.stdin.flush()
+
+    def submit(self, slot, pts):
+        """Przekazuje klatkę ze slotu do zakodowania jako klatkę numer `pts`."""
+        try:
+            self._send(f"F {slot} {pts}")
+        except OSError as e:
+            print(f"Encoder process error: {e}")
+            self.stats["frames_dropped"] += 1
+            self.release_buffer(slot)
+            return
+        depth = self.slots - self.free_slots.qsize()
+        self.stats["frames_submitted"] += 1
+        self.stats["queue_depth_total"] += depth
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], depth)
+
+    def rotate(self, file_stem, start_pts):
+        """
+        Kończy bieżący plik na klatce `start_pts` i zaczyna nowy plik `<file_stem>.mp4`.
+
+        Numeracja klatek nowego pliku zaczyna się od `start_pts`, a poprzednia klatka jest jego
+        pierwszą klatką, dopóki nie pojawi się kolejna.
+        """
+        self.file_name = os.path.abspath(f"{file_stem}.mp4")
+        try:
+            self._send(f"S {start_pts} {self.file_name}")
+        except OSError as e:
+            print(f"Encoder process error: {e}")
+
+    def finish(self, end_pts):
+        """Kończy plik tak, aby trwał `end_pts` klatek, i czeka na zamknięcie procesu kodującego."""
+        if self.finished:
+            return
+        self.finished = True
+        try:
+            self._send(f"E {end_pts}")
+            self.process.stdin.close()
+        except OSError as e:
+            print(f"Encoder process error: {e}")
+        self.process.wait()
+        self.reader.join()
+        self._release_shared_memory()
+
+    def close(self):
+        if not self.finished:
+            self.finish(0)
+
+    def _release_shared_memory(self):
+        self.buffers = []
+        self.shm.close()
+        self.shm.unlink()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["avg_queue_depth"] = (
+            stats["queue_depth_total"] / stats["frames_submitted"]
+            if stats["frames_submitted"]
+            else 0.0
+        )
+        stats["codec"] = self.codec
+        return stats
+
+
+def create_encoder(
+    file_stem,
+    width,
+    height,
+    fps,
+    fast_finalize=True,
+    out_of_process=True,
+    slots=8,
+    policy="block",
+    on_file_closed=None,
+):
+    """
+    Tworzy koder wideo dla ScreenRecorder.
+
+    Domyślnie jest to koder w osobnym procesie zapisujący `<file_stem>.mp4`. Gdy nie można go
+    uruchomić (np. brak PyAV), używany jest cv2.VideoWriter w wątku nagrywania.
+    """
+    if out_of_process and fast_finalize:
+        try:
+            return ProcessVideoEncoder(
+                f"{file_stem}.mp4", width, height, fps, slots, policy, on_file_closed
+            )
+        except Exception as e:
+            print(f"Out-of-process encoder unavailable, using OpenCV: {e}")
+    return OpenCVVideoEncoder(file_stem, width, height, fps, fast_finalize, on_file_closed)
+
+
+def _run_encoder_process(shm_name, width, height, fps, file_name):
+    """Pętla procesu kodującego: czyta polecenia z stdin, klatki z pamięci współdzielonej."""
+    import av
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if os.name == "posix":
+        # Pamięć należy do procesu nagrywającego, ten proces nie może jej usuwać przy wyjściu
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+
+    frame_bytes = width * height * 3
+    rate = Fraction(fps).limit_denominator(1000)
+
+    def open_file(path):
+        container = av.open(path, "w")
+        for codec in ENCODER_CODECS:
+            try:
+                stream = container.add_stream(codec, rate=rate)
+                break
+            except Exception:
+                continue
+        else:
+            container.close()
+            return None, None, None
+
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        stream.codec_context.time_base = 1 / rate
+        if codec == "libx264":
+            stream.options = {"preset": "veryfast"}
+        return container, stream, codec
+
+    container, stream, codec = open_file(file_name)
+    if container is None:
+        shm.close()
+        sys.exit(1)
+    print(f"R {codec}", flush=True)
+
+    def encode(frame):
+        for packet in stream.encode(frame):
+            container.mux(packet)
+
+    def close_file(end_pts):
+        # Ostatnia klatka trwa do końca pliku
+        if last_frame is not None and end_pts - 1 > last_frame.pts:
+            last_frame.pts = end_pts - 1
+            encode(last_frame)
+        encode(None)
+        container.close()
+        print(f"C {file_name}", flush=True)
+
+    last_frame = None
+    held_frame = None  # klatka z poprzedniego pliku, pierwsza klatka nowego pliku
+    pts_offset = 0  # numer klatki, od której zaczyna się bieżący plik
+    for line in sys.stdin:
+        command = line.split(maxsplit=2)
+        if not command:
+            continue
+        if command[0] == "F":
+            slot, pts = int(command[1]), int(command[2]) - pts_offset
+            image = np.ndarray(
+                (height, width, 3), dtype=np.uint8, buffer=shm.buf, offset=slot * frame_bytes
+            )
+            frame = av.VideoFrame.from_ndarray(image, format="bgr24")
+            del image
+            print(f"D {slot}", flush=True)  # klatka skopiowana, slot może być użyty ponownie
+            if held_frame is not None and pts > 0:
+                held_frame.pts = 0
+                encode(held_frame)
+            held_frame = None
+            frame.pts = pts
+            frame.time_base = 1 / rate
+            encode(frame)
+            last_frame = frame
+        elif command[0] in ("S", "E"):
+            if held_frame is not None:
+                held_frame.pts = 0
+                encode(held_frame)
+                last_frame, held_frame = held_frame, None
+            close_file(int(command[1]) - pts_offset)
+            if command[0] == "E":
+                break
+            # Nowy plik segmentu: numeracja klatek od początku pliku
+            pts_offset = int(command[1])
+            file_name = command[2].strip()
+            container, stream, codec = open_file(file_name)
+            if container is None:
+                break
+            held_frame, last_frame = last_frame, None
+    else:
+        if container is not None:
+            close_file(0)
+
+    shm.close()
+
+
+if __name__ == "__main__":
+    _run_encoder_process(
+        sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4]), sys.argv[5]
+    )
@@ -0,0 +1,87 @@
+import struct
+
+# Rozmiar nagłówka: RIFF(12) + JUNK/ds64(8 + 28) + fmt(8 + 16) + data(8)
+JUNK_SIZE = 28
+HEADER_SIZE = 12 + 8 + JUNK_SIZE + 8 + 16 + 8
+MAX_RIFF_SIZE = 0xFFFFFFFF
+
+
+class StreamingWavWriter:
+    """
+    Zapisuje dźwięk PCM do pliku WAV na bieżąco, bez trzymania nagrania w pamięci.
+
+    Rozmiary w nagłówku są aktualizowane co `header_update_seconds` sekund nagrania, więc po
+    awarii programu plik nadal da się odtworzyć (bez ostatnich sekund). Nagłówek zawiera
+    zarezerwowany chunk JUNK, który przy zamknięciu pliku większego niż 4 GB jest zamieniany
+    na chunk ds64 formatu RF64.
+    """
+
+    def __init__(self, filename, channels, sample_width, rate, header_update_seconds=1.0):
+        self.filename = filename
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.block_align = channels * sample_width
+        self.header_update_bytes = int(header_update_seconds * rate) * self.block_align
+        self.data_size = 0
+        self.patched_size = 0
+        self.file = open(filename, "wb")
+        self._write_header()
+
+    def _write_header(self):
+        header = b"RIFF" + struct.pack("<I", 0) + b"WAVE"
+        header += b"JUNK" + struct.pack("<I", JUNK_SIZE) + bytes(JUNK_SIZE)
+        header += b"fmt " + struct.pack(
+            "<IHHIIHH",
+            16,
+            1,  # PCM
+            self.channels,
+            self.rate,
+            self.rate * self.block_align,
+            self.block_align,
+            self.sample_width * 8,
+        )
+        header += b"data" + struct.pack("<I", 0)
+        self.file.write(header)
+
+    def write(self, data):
+        """Dopisuje próbki na koniec pliku."""
+        self.file.write(data)
+        self.data_size += len(data)
+        if self.data_size - self.patched_size >= self.header_update_bytes:
+            self._patch_header()
+
+    def _patch_header(self):
+        position = self.file.tell()
+        riff_size = HEADER_SIZE - 8 + self.data_size
+        self.file.seek(4)
+        self.file.write(struct.pack("<I", min(riff_size, MAX_RIFF_SIZE)))
+        self.file.seek(HEADER_SIZE - 4)
+        self.file.write(struct.pack("<I", min(self.data_size, MAX_RIFF_SIZE)))
+        self.file.seek(position)
+        self.file.flush()
+        self.patched_size = self.data_size
+
+    def _write_rf64_header(self):
+        riff_size = HEADER_SIZE - 8 + self.data_size
+        self.file.seek(0)
+        self.file.write(b"RF64" + struct.pack("<I", MAX_RIFF_SIZE))
+        self.file.seek(12)
+        self.file.write(
+            b"ds64"
+            + struct.pack(
+                "<IQQQI", JUNK_SIZE, riff_size, self.data_size, self.data_size // self.block_align, 0
+            )
+        )
+        self.file.seek(HEADER_SIZE - 4)
+        self.file.write(struct.pack("<I", MAX_RIFF_SIZE))
+
+    def close(self):
+        """Uzupełnia nagłówek i zamyka plik."""
+        if self.file.closed:
+            return
+        if HEADER_SIZE - 8 + self.data_size > MAX_RIFF_SIZE:
+            self._write_rf64_header()
+        else:
+            self._patch_header()
+        self.file.close()
@@ -2,8 +2,8 @@ import functools
 import logging
 import math
 import subprocess
-import re
 import os
+import shutil
 import cv2
 import time
 from pyannote.audio import Pipeline
@@ -13,9 +13,12 @@ from concurrent.futures import ThreadPoolExecutor
 from app_backend.logging_f import log_data_analyze
 import app_backend.save_files as sf
 import data_analyze.image_files_analyze as image_analyzer
+from data_analyze.segment_results import stitch_segment_results
+from app_backend.timestamp_index import AUDIO_INDEX_NAME, VIDEO_INDEX_NAME, read_timestamp_index
 from datetime import datetime
 
 model_size = "small"
+hf_token = "..."
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 
@@ -178,7 +181,9 @@ def notes_summary(tekst: str) -> str:
 
 
 # 5. Wydobywanie ramek z wideo do dalszej analizy
-def get_video_frames(file_path: str, file_name: str, file_extension: str) -> int:
+def get_video_frames(
+    file_path: str, file_name: str, file_extension: str, output_dir: str = None
+) -> int:
     """
     Wydobywanie ramek z pliku wideo do dalszej analizy.
 
@@ -186,6 +191,7 @@ def get_video_frames(file_path: str, file_name: str, file_extension: str) -> int
         file_path (str): Ścieżka do folderu, w którym znajduje się plik wideo.
         file_name (str): Nazwa pliku wideo.
         file_extension (str): Rozszerzenie pliku wideo.
+        output_dir (str): Folder na ramki. Domyślnie folder pliku wideo.
 
     Returns:
         int: Liczba plików zawierających ramki.
@@ -194,7 +200,7 @@ def get_video_frames(file_path: str, file_name: str, file_extension: str) -> int
         - Funkcja wykorzystuje FFmpeg do ekstrakcji ramek z wideo.
         - Informacje o sukcesie lub błędach są logowane za pomocą `log_data_analyze`.
     """
-    output_dir = f"{file_path}/"
+    output_dir = f"{output_dir or file_path}/"
     try:
         os.makedirs(output_dir, exist_ok=True)
         log_data_analyze(f"Directory {output_dir} is ready.")
@@ -226,9 +232,34 @@ def get_video_frames(file_path: str, file_name: str, file_extension: str) -> int
     except Exception as e:
         log_data_analyze(f"Error generating video frames: {e}")
 
-    return (
-        len(os.listdir(f"{output_dir}")) - 4
-    )  # odjęcie 4 plików, które zawsze znajdują się w folderze
+    # Ramki są nazywane numerami sekund, w folderze mogą być też inne pliki nagrania
+    return len([f for f in os.listdir(output_dir) if f.endswith(".png")])
+
+
+def video_time_aligner(record_dir: str, video_muxed: bool = True):
+    """
+    Przeliczanie czasu pliku wideo na czas nagrania dźwięku (oś czasu notatki).
+
+    Korzysta z indeksów czasów zapisanych podczas nagrywania (audio_output.tsi, video_output.tsi),
+    więc nie wymaga dekodowania plików. Uwzględnia różnicę chwil rozpoczęcia obu nagrań oraz
+    rozjeżdżanie się zegara karty dźwiękowej i pominięte klatki obrazu.
+
+    Args:
+        record_dir (str): Folder nagrania z indeksami czasów.
+        video_muxed (bool): Czy wideo pochodzi z combined.mp4, w którym obraz jest już przesunięty
+            o chwilę pobrania pierwszej klatki (`-itsoffset`).
+
+    Returns:
+        Callable[[float], float] | None: Funkcja czas wideo -> czas dźwięku albo None, gdy brakuje indeksów.
+    """
+    audio_index = read_timestamp_index(os.path.join(record_dir, AUDIO_INDEX_NAME))
+    video_index = read_timestamp_index(os.path.join(record_dir, VIDEO_INDEX_NAME))
+    if audio_index is None or video_index is None:
+        log_data_analyze("Timestamp indexes not found, using video file timestamps.")
+        return None
+
+    shift = audio_index.to_media(video_index.to_session(0.0)) if video_muxed else 0.0
+    return lambda seconds: audio_index.to_media(video_index.to_session(seconds - shift))
 
 
 """
@@ -263,7 +294,231 @@ def teams_screen_analyze(img_nr_1: int = None, img_nr_2: int = None):
 """
 
 
-# 6. Główna funkcja
+# 6. Analiza nagrania lub jego segmentu
+def analyze_recording(
+    filename_audio: str,
+    filename_video: str,
+    application_name: str,
+    n_frame: int = 5,
+    filename_audio_analysis: str = None,
+    time_offset: int = 0,
+    frames_dir: str = None,
+    images_dir: str = None,
+    video_muxed: bool = True,
+) -> dict:
+    """
+    Transkrypcja, diarizacja i analiza ramek jednego nagrania (całego spotkania lub segmentu).
+
+    Args:
+        filename_audio (str): Ścieżka do pliku audio.
+        filename_video (str): Ścieżka do pliku wideo.
+        application_name (str): Nazwa aplikacji źródłowej (np. "MSTeams", "Zoom" lub "Auto").
+        n_frame (int): Określa co która ramka ( z pliku wideo ) ma pozostać w folderze.
+        filename_audio_analysis (str): Ścieżka do pliku audio 16 kHz mono nagranego do analizy.
+            Transkrypcja i diarizacja używają go zamiast `filename_audio`, jeśli istnieje.
+        time_offset (int): Przesunięcie w sekundach dodawane do znaczników czasu (początek segmentu).
+        frames_dir (str): Folder na ramki wideo. Domyślnie folder pliku wideo.
+        images_dir (str): Folder, do którego trafiają zachowane ramki nazwane czasem od początku
+            spotkania. Domyślnie ramki zostają w `frames_dir`.
+        video_muxed (bool): Czy `filename_video` to combined.mp4 (obraz przesunięty na oś czasu
+            dźwięku), a nie plik samego obrazu.
+
+    Returns:
+        dict: Słownik z listami elementów notatki ("text", "speaker", "img"), tekstem rozpoznanym
+        na ramkach do wyszukiwania ("ocr") oraz tekstem transkrypcji do podsumowania ("transcript").
+    """
+    tekst = ""  # Wykorzystywany podczas generowania podsumowań
+    note_content_text = []
+    note_content_speaker = []
+    note_content_img = []
+    note_content_ocr = []
+
+    # Plik 16 kHz mono nie wymaga ponownego próbkowania przez Whisper i pyannote
+    analysis_audio = filename_audio
+    if filename_audio_analysis and os.path.exists(filename_audio_analysis):
+        analysis_audio = filename_audio_analysis
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        log_data_analyze("Submitting transcription and diarization tasks.")
+        future_transcription_segments = executor.submit(
+            transcribe_audio, analysis_audio
+        )
+        future_diarization_result = executor.submit(
+            diarize_audio, analysis_audio, hf_token
+        )
+
+        # Pobranie wyników zadań równoległych
+        transcription_segments = future_transcription_segments.result()
+        diarization_result = future_diarization_result.result()
+        log_data_analyze("Transcription and diarization completed.")
+
+    # Połączenie wyników
+    combined = combine_transcription_and_diarization(
+        transcription_segments, diarization_result
+    )
+    log_data_analyze("Transcription and diarization successfully combined.")
+
+    try:
+        # Parsowanie informacji o plikach wideo (ścieżki segmentów są bezwzględne, w Windows z "\\")
+        filepath, basename = os.path.split(filename_video)
+        filepath = filepath or "."
+        filename, fileextension = os.path.splitext(basename)
+        frames_dir = frames_dir or filepath
+        log_data_analyze(f"Video file parsed: {filename_video}.")
+
+        for entry in combined:
+            if (
+                len(note_content_text) == 0
+                or note_content_speaker[-1]["name"] != entry["speaker"]
+            ):
+                speaker = {
+                    "type": "speaker",
+                    "timestamp": time_offset + math.floor(float(entry["start"])),
+                    "name": f"{entry['speaker']}",
+                }
+                note_content_speaker.append(speaker)
+
+            text = {
+                "type": "text",
+                "timestamp": time_offset + math.floor(float(entry["start"])),
+                "value": f"{entry['text']}",
+            }
+            note_content_text.append(text)
+
+            tekst += (
+                f"[{time_offset + entry['start']:.2f}s - {time_offset + entry['end']:.2f}s] "
+                f"{entry['speaker']}: {entry['text']}\n"
+            )
+
+        log_data_analyze("Notes content successfully created.")
+
+        # Analiza ramek wideo
+        number_of_screens = get_video_frames(filepath, filename, fileextension, frames_dir)
+        screen_data = image_analyzer.main(
+            number_of_screens, frames_dir + "/", application_name, n_frame
+        )
+        log_data_analyze(f"Extracted {number_of_screens} screens for analysis.")
+
+        # Czas ramki w pliku wideo jest przeliczany na czas nagrania dźwięku, tak jak tekst
+        align = video_time_aligner(os.path.dirname(filename_audio), video_muxed)
+        for entry in screen_data:
+            timestamp = time_offset + int(entry.split(".")[0])
+            if align is not None:
+                timestamp = max(math.floor(align(timestamp)), 0)
+            file_path = frames_dir + "/" + entry
+            if images_dir:
+                # Nazwa ramki to czas od początku całego spotkania
+                os.replace(file_path, f"{images_dir}/{timestamp}.png")
+                file_path = f"{images_dir}/{timestamp}.png"
+            img_info = {
+                "type": "img",
+                "timestamp": timestamp,
+                "file_path": file_path,
+            }
+            note_content_img.append(img_info)
+
+        log_data_analyze("Screen data processed successfully.")
+
+        # Tekst slajdów trafia tylko do indeksu wyszukiwania, nie do plików notatki
+        note_content_ocr = image_analyzer.keyframes_text(note_content_img)
+        log_data_analyze(f"Text recognized on {len(note_content_ocr)} of {len(note_content_img)} screens.")
+
+    except Exception as e:
+        log_data_analyze(f"Error processing video and generating notes: {e}")
+
+    return {
+        "text": note_content_text,
+        "speaker": note_content_speaker,
+        "img": note_content_img,
+        "ocr": note_content_ocr,
+        "transcript": tekst,
+    }
+
+
+# 7. Analiza segmentu nagrania w trybie nagrywania segmentowego
+def analyze_segment(segment: dict, application_name: str, n_frame: int = 5) -> dict:
+    """
+    Analizuje zakończony segment nagrania, gdy spotkanie jeszcze trwa.
+
+    Args:
+        segment (dict): Opis segmentu z pliku segments.json (klucze: "index", "start", "audio",
+            "video" oraz opcjonalnie "audio_analysis").
+        application_name (str): Nazwa aplikacji źródłowej (np. "MSTeams", "Zoom" lub "Auto").
+        n_frame (int): Określa co która ramka ( z pliku wideo ) ma pozostać w folderze.
+
+    Returns:
+        dict: Wynik `analyze_recording` ze znacznikami czasu liczonymi od początku spotkania
+        oraz numerem segmentu ("index").
+
+    Notes:
+        - Ramki segmentu są wyodrębniane do osobnego folderu, a zachowane ramki trafiają do
+          folderu nagrania, tak jak przy analizie całego spotkania.
+        - Etykiety rozmówców pochodzą z diarizacji segmentu i są nadawane niezależnie w każdym segmencie.
+    """
+    try:
+        record_dir = os.path.dirname(segment["video"])
+        frames_dir = f"{record_dir}/segment_{segment['index']:03d}"
+        result = analyze_recording(
+            segment["audio"],
+            segment["video"],
+            application_name,
+            n_frame,
+            filename_audio_analysis=segment.get("audio_analysis"),
+            time_offset=math.floor(segment["start"]),
+            frames_dir=frames_dir,
+            images_dir=record_dir,
+            video_muxed=False,
+        )
+        shutil.rmtree(frames_dir, ignore_errors=True)
+        log_data_analyze(f"Segment {segment['index']} analyzed.")
+    except Exception as e:
+        log_data_analyze(f"Error analyzing segment {segment.get('index')}: {e}")
+        result = {"text": [], "speaker": [], "img": [], "ocr": [], "transcript": ""}
+
+    result["index"] = segment.get("index", 0)
+    return result
+
+
+def save_note(
+    result: dict,
+    temp_dir_name: str,
+    filename_video: str,
+    user_dir: str,
+    title: str,
+    datetime: datetime,
+) -> None:
+    """
+    Generuje podsumowanie i zapisuje notatkę na podstawie wyniku analizy.
+
+    Args:
+        result (dict): Wynik `analyze_recording` lub `stitch_segment_results`.
+        temp_dir_name (str): Nazwa katalogu tymczasowego na wyniki przetwarzania.
+        filename_video (str): Ścieżka do pliku wideo spotkania.
+        user_dir (str): Katalog użytkownika do zapisania wyników.
+        title (str): Tytuł notatki.
+        datetime (datetime): Data i czas generacji notatki.
+    """
+    # Generowanie podsumowania notatek
+    summary = notes_summary(result["transcript"])
+    log_data_analyze("Summary generated.")
+
+    # Zapis wyników
+    sf.save_files(
+        title,
+        note_summary=summary,
+        note_datetime=datetime,
+        note_content_img=result["img"],
+        note_content_text=result["text"],
+        note_content_speaker=result["speaker"],
+        note_content_ocr=result["ocr"],
+        video_file_name=os.path.basename(filename_video),
+        tmp_dir_name=temp_dir_name,
+        directory_path=user_dir,
+    )
+    log_data_analyze("Files saved successfully. \n")
+
+
+# 8. Główna funkcja
 def main(
     temp_dir_name: str = "testowe_pliki",
     filename_audio: str = "../tmp/testowe_pliki/test_wyklad.wav",
@@ -273,6 +528,7 @@ def main(
     title: str = "test_main_data_analyze",
     datetime: datetime = datetime(2025, 1, 11, 18, 50, 49, 859943),
     n_frame: int = 5,
+    filename_audio_analysis: str = None,
 ):
     """
     Główna funkcja odpowiedzialna za przetwarzanie danych multimedialnych: audio, wideo oraz generowanie podsumowań.
@@ -281,122 +537,64 @@ def main(
         temp_dir_name (str): Nazwa katalogu tymczasowego na wyniki przetwarzania.
         filename_audio (str): Ścieżka do pliku audio.
         filename_video (str): Ścieżka do pliku wideo.
-        application_name (str): Nazwa aplikacji źródłowej (np. "MSTeams", "Zoom").
+        application_name (str): Nazwa aplikacji źródłowej (np. "MSTeams", "Zoom" lub "Auto" - wykrycie z nagrania).
         user_dir (str): Katalog użytkownika do zapisania wyników. Domyślnie None.
         title (str): Tytuł notatki. Domyślnie None.
         datetime (datetime): Data i czas generacji notatki. Domyślnie None.
         n_frame (int): Określa co która ramka ( z pliku wideo ) ma pozostać w folderze
+        filename_audio_analysis (str): Ścieżka do pliku audio 16 kHz mono nagranego do analizy.
+            Transkrypcja i diarizacja używają go zamiast `filename_audio`, jeśli istnieje.
 
     Returns:
         None: Wyniki są zapisywane w wyznaczonym katalogu.
     """
     try:
         log_data_analyze("Starting main function.")
-
-        hf_token = "..."
-        tekst = ""  # Wykorzystywany podczas generowania podsumowań
-        filepath = ""
-        number_of_screens = 0
-
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            log_data_analyze("Submitting transcription and diarization tasks.")
-            future_transcription_segments = executor.submit(
-                transcribe_audio, filename_audio
-            )
-            future_diarization_result = executor.submit(
-                diarize_audio, filename_audio, hf_token
-            )
-
-            # Pobranie wyników zadań równoległych
-            transcription_segments = future_transcription_segments.result()
-            diarization_result = future_diarization_result.result()
-            log_data_analyze("Transcription and diarization completed.")
-
-        # Połączenie wyników
-        combined = combine_transcription_and_diarization(
-            transcription_segments, diarization_result
+        result = analyze_recording(
+            filename_audio,
+            filename_video,
+            application_name,
+            n_frame,
+            filename_audio_analysis=filename_audio_analysis,
         )
-        log_data_analyze("Transcription and diarization successfully combined.")
-
-        try:
-            # Parsowanie informacji o plikach wideo
-            file_name_match = re.search(r"(.+)/([\w]+)(\.[a-zA-Z0-9]+)", filename_video)
-            filepath = file_name_match.group(1)
-            filename = file_name_match.group(2)
-            fileextension = file_name_match.group(3)
-            log_data_analyze(f"Video file parsed: {filename_video}.")
-
-            note_content_text = []
-            note_content_speaker = []
-            note_content_img = []
-            summary = ""
-
-            for entry in combined:
-                if (
-                    len(note_content_text) == 0
-                    or note_content_speaker[-1]["name"] != entry["speaker"]
-                ):
-                    speaker = {
-                        "type": "speaker",
-                        "timestamp": math.floor(float(entry["start"])),
-                        "name": f"{entry['speaker']}",
-                    }
-                    note_content_speaker.append(speaker)
-
-                text = {
-                    "type": "text",
-                    "timestamp": math.floor(float(entry["start"])),
-                    "value": f"{entry['text']}",
-                }
-                note_content_text.append(text)
+        save_note(result, temp_dir_name, filename_video, user_dir, title, datetime)
 
-                tekst += (
-                    f"[{entry['start']:.2f}s - {entry['end']:.2f}s] "
-                    f"{entry['speaker']}: {entry['text']}\n"
-                )
+    except Exception as e:
+        log_data_analyze(f"An error occurred in the main function: {e} \n")
 
-            log_data_analyze("Notes content successfully created.")
 
-            # Generowanie podsumowania notatek
-            summary = notes_summary(tekst)
-            log_data_analyze("Summary generated.")
+def main_segments(
+    segment_results: list[dict],
+    temp_dir_name: str,
+    filename_video: str,
+    user_dir: str,
+    title: str,
+    datetime: datetime,
+):
+    """
+    Zapisuje notatkę spotkania nagranego w trybie segmentowym.
 
-            # Analiza ramek wideo
-            number_of_screens = get_video_frames(filepath, filename, fileextension)
-            screen_data = image_analyzer.main(
-                number_of_screens, filepath + "/", application_name, n_frame
-            )
-            log_data_analyze(f"Extracted {number_of_screens} screens for analysis.")
+    Segmenty są analizowane w trakcie spotkania (`analyze_segment`), więc po jego zakończeniu
+    pozostaje tylko połączenie wyników, podsumowanie i zapis plików.
 
-            for entry in screen_data:
-                img_info = {
-                    "type": "img",
-                    "timestamp": int(entry.split(".")[0]),
-                    "file_path": filepath + "/" + entry,
-                }
-                note_content_img.append(img_info)
-
-            log_data_analyze("Screen data processed successfully.")
-
-        except Exception as e:
-            log_data_analyze(f"Error processing video and generating notes: {e}")
-
-        # Zapis wyników
-        sf.save_files(
-            title,
-            note_summary=summary,
-            note_datetime=datetime,
-            note_content_img=note_content_img,
-            note_content_text=note_content_text,
-            note_content_speaker=note_content_speaker,
-            video_file_name=os.path.basename(filename_video),
-            tmp_dir_name=temp_dir_name,
-            directory_path=user_dir,
-        )
-        log_data_analyze("Files saved successfully. \n")
+    Args:
+        segment_results (list[dict]): Wyniki `analyze_segment` dla wszystkich segmentów.
+        temp_dir_name (str): Nazwa katalogu tymczasowego na wyniki przetwarzania.
+        filename_video (str): Ścieżka do połączonego pliku wideo spotkania.
+        user_dir (str): Katalog użytkownika do zapisania wyników.
+        title (str): Tytuł notatki.
+        datetime (datetime): Data i czas generacji notatki.
+
+    Returns:
+        None: Wyniki są zapisywane w wyznaczonym katalogu.
+    """
+    try:
+        log_data_analyze(f"Stitching {len(segment_results)} segments.")
+        result = stitch_segment_results(segment_results)
+        save_note(result, temp_dir_name, filename_video, user_dir, title, datetime)
 
     except Exception as e:
-        log_data_analyze(f"An error occurred in the main function: {e} \n")
+        log_data_analyze(f"An error occurred in the main_segments function: {e} \n")
 
 
 if __name__ == "__main__":
@@ -1,41 +1,306 @@
+import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from app_backend.logging_f import log_data_analyze
 
+# Katalog z szablonami ekranu aplikacji bez udostępnionego ekranu.
+# Nowy szablon wystarczy zapisać jako "<NazwaAplikacji>_no_screen_template.png".
+TEMPLATES_DIR = "../data_analyze/templates"
+TEMPLATE_SUFFIX = "_no_screen_template.png"
+AUTO_APPLICATION = "Auto"
+NO_SCREEN_SIMILARITY = 0.51
 
-def template_analyze(template: str, img2_path: str, i: int) -> bool:
+# Parametry wykrywania obszaru udostępnionego ekranu
+LAYOUT_GRID_SIZE = (32, 18)  # rozdzielczość szybkiego porównania układu okna
+LAYOUT_DIFF_THRESHOLD = 40  # różnica jasności względem szablonu oznaczająca treść
+LAYOUT_MIN_AREA = 0.1  # minimalny udział obszaru treści w całej klatce
+LAYOUT_STABLE_IOU = 0.8  # minimalne pokrycie maski, przy którym układ uznaje się za niezmieniony
+
+# Rozpoznawanie tekstu na zachowanych ramkach (Tesseract przez pytesseract)
+OCR_LANGUAGES = "pol+eng"
+OCR_WORKERS = 4  # Tesseract działa w osobnym procesie, więc ramki można rozpoznawać równolegle
+
+# Wczytane szablony według katalogu (tylko niepuste wyniki, patrz load_templates)
+_templates_cache = {}
+# Przeskalowane szablony (tylko udane odczyty, patrz template_image)
+_template_images_cache = {}
+TEMPLATE_IMAGES_CACHE_SIZE = 16
+
+
+def gray_histogram(image: np.ndarray) -> np.ndarray:
     """
-    Analizuje podobieństwo histogramów dwóch obrazów w odcieniach szarości, aby sprawdzić,
-    czy dany obraz zawiera określony slajd lub inne informacje.
+    Liczy histogram obrazu w odcieniach szarości i przygotowuje go do porównań korelacyjnych.
 
     Args:
-        template (str): Ścieżka do obrazu szablonu (template), z którym porównywane są inne obrazy.
-        img2_path (str): Ścieżka do drugiego obrazu, który ma być porównany z szablonem.
-        i (int): Numer obrazu, używany do debugowania lub dalszej analizy.
+        image (np.ndarray): Obraz w odcieniach szarości.
 
     Returns:
-        bool: True, jeśli obrazy są różne (tj. obraz zawiera slajd lub informacje), False w przeciwnym razie.
+        np.ndarray: Wektor 256 wartości o średniej 0 i normie 1. Iloczyn skalarny dwóch takich
+        wektorów jest równy wynikowi `cv2.compareHist(..., cv2.HISTCMP_CORREL)`.
     """
-    try:
-        img1 = cv2.imread(template, cv2.IMREAD_GRAYSCALE)
-        img2 = cv2.imread(img2_path, cv2.IMREAD_GRAYSCALE)
+    hist = cv2.calcHist([image], [0], None, [256], [0, 256]).flatten()
+    hist -= hist.mean()
+    norm = np.linalg.norm(hist)
+    return hist / norm if norm > 0 else hist
 
-        # Oblicz histogramy
-        hist1 = cv2.calcHist([img1], [0], None, [256], [0, 256])
-        hist2 = cv2.calcHist([img2], [0], None, [256], [0, 256])
 
-        # Normalizacja histogramów
-        hist1 = cv2.normalize(hist1, hist1).flatten()
-        hist2 = cv2.normalize(hist2, hist2).flatten()
+def load_templates(templates_dir: str = TEMPLATES_DIR) -> tuple[tuple[str, ...], np.ndarray]:
+    """
+    Wczytuje wszystkie szablony aplikacji z katalogu `templates_dir` jeden raz.
 
-        # Porównaj histogramy za pomocą współczynnika korelacji
-        similarity = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
+    Args:
+        templates_dir (str): Katalog z plikami `<NazwaAplikacji>_no_screen_template.png`.
+
+    Returns:
+        tuple[tuple[str, ...], np.ndarray]: Nazwy aplikacji oraz macierz histogramów (N x 256).
+
+    Notes:
+        - Dodanie nowej aplikacji nie wymaga zmian w kodzie, wystarczy nowy plik szablonu.
+        - Wynik jest zapamiętywany, więc kolejne analizy nie czytają szablonów z dysku.
+        - Pusty wynik (zła ścieżka, brak szablonów) nie jest zapamiętywany - błąd trafia do logu
+          przy każdym wywołaniu, a szablony dodane później zostaną wczytane.
+    """
+    if templates_dir in _templates_cache:
+        return _templates_cache[templates_dir]
+
+    names = []
+    histograms = []
+    for path in sorted(glob.glob(os.path.join(templates_dir, f"*{TEMPLATE_SUFFIX}"))):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            log_data_analyze(f"[ERROR] load_templates cannot read {path}")
+            continue
+        names.append(os.path.basename(path)[: -len(TEMPLATE_SUFFIX)])
+        histograms.append(gray_histogram(image))
+
+    if not histograms:
+        log_data_analyze(
+            f"[ERROR] load_templates found no *{TEMPLATE_SUFFIX} in {os.path.abspath(templates_dir)}"
+        )
+        return tuple(), np.empty((0, 256), dtype=np.float32)
+    _templates_cache[templates_dir] = (tuple(names), np.stack(histograms))
+    return _templates_cache[templates_dir]
+
+
+def application_names(templates_dir: str = TEMPLATES_DIR) -> list[str]:
+    """Zwraca nazwy aplikacji, dla których istnieje szablon."""
+    return list(load_templates(templates_dir)[0])
 
-        return similarity < 0.51
-    except Exception as e:
-        log_data_analyze(f"[ERROR] template_analyze failed for image {i}: {e}")
-        return False
+
+def frames_histograms(
+    folder_path: str, frame_numbers: list[int]
+) -> tuple[list[int], np.ndarray]:
+    """
+    Liczy histogramy wskazanych klatek, pomijając klatki, których nie da się odczytać.
+
+    Args:
+        folder_path (str): Ścieżka do folderu z klatkami (`<numer>.png`).
+        frame_numbers (list[int]): Numery klatek do wczytania.
+
+    Returns:
+        tuple[list[int], np.ndarray]: Numery poprawnie wczytanych klatek oraz macierz histogramów (M x 256).
+    """
+    numbers = []
+    histograms = []
+    for i in frame_numbers:
+        image = cv2.imread(f"{folder_path}/{i}.png", cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            log_data_analyze(f"[ERROR] frames_histograms cannot read frame {i}")
+            continue
+        numbers.append(i)
+        histograms.append(gray_histogram(image))
+
+    if not histograms:
+        return numbers, np.empty((0, 256), dtype=np.float32)
+    return numbers, np.stack(histograms)
+
+
+def detect_application(
+    similarity: np.ndarray, names: tuple[str, ...], default: str | None
+) -> str | None:
+    """
+    Wybiera aplikację na podstawie podobieństwa klatek do wszystkich szablonów naraz.
+
+    Args:
+        similarity (np.ndarray): Macierz korelacji histogramów (klatki x szablony).
+        names (tuple[str, ...]): Nazwy aplikacji odpowiadające kolumnom macierzy.
+        default (str | None): Wartość zwracana, gdy wykrycie jest niepewne.
+
+    Returns:
+        str | None: Nazwa wykrytej aplikacji lub `default`.
+
+    Notes:
+        - Szablony przedstawiają ekran bez prezentacji, więc aplikacja jest wykrywana po klatce,
+          która najlepiej pasuje do któregoś z szablonów.
+        - Jeśli żadna klatka nie przypomina żadnego szablonu, zwracany jest `default`.
+    """
+    if similarity.size == 0:
+        return default
+
+    best_scores = similarity.max(axis=0)
+    best = int(np.argmax(best_scores))
+    if best_scores[best] < NO_SCREEN_SIMILARITY:
+        log_data_analyze(
+            f"[INFO] Application not detected (best score {best_scores[best]:.2f}), using {default}"
+        )
+        return default
+
+    log_data_analyze(
+        f"[INFO] Detected application {names[best]} (score {best_scores[best]:.2f})"
+    )
+    return names[best]
+
+
+def template_image(
+    application_name: str, width: int, height: int, templates_dir: str = TEMPLATES_DIR
+) -> np.ndarray | None:
+    """
+    Zwraca szablon aplikacji w odcieniach szarości przeskalowany do podanego rozmiaru.
+
+    Args:
+        application_name (str): Nazwa aplikacji (część nazwy pliku szablonu).
+        width (int): Docelowa szerokość.
+        height (int): Docelowa wysokość.
+        templates_dir (str): Katalog z szablonami.
+
+    Returns:
+        np.ndarray | None: Przeskalowany szablon lub None, jeśli nie można go odczytać.
+
+    Notes:
+        - Zapamiętywane są tylko udane odczyty, więc brakujący szablon dodany później zostanie użyty.
+    """
+    key = (application_name, width, height, templates_dir)
+    if key in _template_images_cache:
+        return _template_images_cache[key]
+
+    image = cv2.imread(
+        os.path.join(templates_dir, f"{application_name}{TEMPLATE_SUFFIX}"),
+        cv2.IMREAD_GRAYSCALE,
+    )
+    if image is None:
+        log_data_analyze(f"[ERROR] template_image cannot read template of {application_name}")
+        return None
+    if len(_template_images_cache) >= TEMPLATE_IMAGES_CACHE_SIZE:
+        # Usuwany jest najstarszy wpis (słownik zachowuje kolejność dodania)
+        del _template_images_cache[next(iter(_template_images_cache))]
+    _template_images_cache[key] = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return _template_images_cache[key]
+
+
+def layout_mask(image: np.ndarray, application_name: str) -> np.ndarray | None:
+    """
+    Tworzy zgrubną maskę obszarów klatki, które różnią się od szablonu aplikacji.
+
+    Args:
+        image (np.ndarray): Klatka w odcieniach szarości.
+        application_name (str): Nazwa aplikacji.
+
+    Returns:
+        np.ndarray | None: Maska logiczna o rozmiarze `LAYOUT_GRID_SIZE` lub None bez szablonu.
+
+    Notes:
+        - Porównanie odbywa się na miniaturach, więc jest tanie i może być liczone dla każdej klatki.
+    """
+    template = template_image(application_name, *LAYOUT_GRID_SIZE)
+    if template is None:
+        return None
+    small = cv2.resize(image, LAYOUT_GRID_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.absdiff(small, template) > LAYOUT_DIFF_THRESHOLD
+
+
+def detect_content_region(
+    image: np.ndarray, application_name: str
+) -> tuple[int, int, int, int] | None:
+    """
+    Wyszukuje prostokąt z udostępnionym ekranem w klatce nagrania.
+
+    Obszar treści to największy spójny fragment klatki, który różni się od szablonu aplikacji
+    (kafelki uczestników, paski narzędzi i czat wyglądają podobnie jak w szablonie).
+
+    Args:
+        image (np.ndarray): Klatka w odcieniach szarości.
+        application_name (str): Nazwa aplikacji, której szablon jest używany.
+
+    Returns:
+        tuple[int, int, int, int] | None: Prostokąt (x, y, szerokość, wysokość) lub None,
+        jeśli nie udało się go wyznaczyć.
+    """
+    height, width = image.shape[:2]
+    template = template_image(application_name, width, height)
+    if template is None:
+        return None
+
+    mask = (cv2.absdiff(image, template) > LAYOUT_DIFF_THRESHOLD).astype(np.uint8)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count < 2:
+        return None
+
+    # Etykieta 0 to tło, wybierany jest największy pozostały fragment
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    x, y, w, h = stats[largest, :4]
+    if w * h < LAYOUT_MIN_AREA * width * height:
+        return None
+    return int(x), int(y), int(w), int(h)
+
+
+def content_regions(
+    frame_names: list[str], folder_path: str, application_name: str | None
+) -> dict[str, tuple[int, int, int, int] | None]:
+    """
+    Wyznacza obszar udostępnionego ekranu dla każdej klatki, wykrywając go ponownie
+    tylko wtedy, gdy zmieni się układ okna aplikacji.
+
+    Args:
+        frame_names (list[str]): Nazwy plików klatek w kolejności nagrania.
+        folder_path (str): Ścieżka do folderu z klatkami.
+        application_name (str | None): Nazwa aplikacji lub None, gdy nie jest znana.
+
+    Returns:
+        dict[str, tuple[int, int, int, int] | None]: Prostokąt treści dla każdej klatki
+        (None oznacza brak przycinania).
+    """
+    if application_name is None:
+        return {name: None for name in frame_names}
+
+    regions = {}
+    region = None
+    region_mask = None
+    for name in frame_names:
+        image = cv2.imread(f"{folder_path}/{name}", cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            regions[name] = None
+            continue
+
+        mask = layout_mask(image, application_name)
+        stable = False
+        if mask is not None and region_mask is not None:
+            union = np.logical_or(mask, region_mask).sum()
+            overlap = np.logical_and(mask, region_mask).sum()
+            stable = union == 0 or overlap / union >= LAYOUT_STABLE_IOU
+
+        if not stable:
+            region = detect_content_region(image, application_name)
+            region_mask = mask
+            log_data_analyze(f"[INFO] Layout changed at {name}, content region {region}")
+
+        regions[name] = region
+    return regions
+
+
+def crop_to_region(
+    image: np.ndarray, region: tuple[int, int, int, int] | None
+) -> np.ndarray:
+    """Przycina obraz do prostokąta (x, y, szerokość, wysokość), None oznacza cały obraz."""
+    if region is None:
+        return image
+    x, y, w, h = region
+    return image[y : y + h, x : x + w]
 
 
 def preprocess_image(image):
@@ -62,8 +327,63 @@ def preprocess_image(image):
         return None
 
 
+def ocr_image(file_path: str, languages: str = OCR_LANGUAGES) -> str:
+    """
+    Rozpoznaje tekst na ramce (np. slajdzie) po przetworzeniu jej przez `preprocess_image`.
+
+    Args:
+        file_path (str): Ścieżka do obrazu.
+        languages (str): Języki Tesseracta, np. "pol+eng".
+
+    Returns:
+        str: Rozpoznany tekst ze scalonymi białymi znakami lub pusty napis, jeśli OCR się nie powiódł.
+    """
+    import pytesseract
+
+    try:
+        image = cv2.imread(file_path)
+        binary = preprocess_image(image)
+        text = pytesseract.image_to_string(binary if binary is not None else image, lang=languages)
+        return " ".join(text.split())
+    except Exception as e:
+        log_data_analyze(f"[ERROR] ocr_image failed for {file_path}: {e}")
+        return ""
+
+
+def keyframes_text(img_entries: list, languages: str = OCR_LANGUAGES, max_workers: int = OCR_WORKERS) -> list:
+    """
+    Rozpoznaje tekst na zachowanych ramkach notatki, aby wyszukiwarka notatek obejmowała też treść slajdów.
+
+    Args:
+        img_entries (list): Elementy "img" notatki (słowniki z "timestamp" i "file_path").
+        languages (str): Języki Tesseracta.
+        max_workers (int): Liczba ramek rozpoznawanych jednocześnie.
+
+    Returns:
+        list: Słowniki {"type": "ocr", "timestamp": ..., "value": tekst} dla ramek, na których rozpoznano tekst.
+        Pusta lista, jeśli pytesseract nie jest zainstalowany.
+    """
+    try:
+        import pytesseract  # opcjonalna zależność - sprawdzana przed uruchomieniem wątków
+    except ImportError:
+        log_data_analyze("pytesseract is not installed - keyframes are not indexed.")
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        texts = list(executor.map(lambda entry: ocr_image(entry["file_path"], languages), img_entries))
+    return [
+        {"type": "ocr", "timestamp": entry["timestamp"], "value": text}
+        for entry, text in zip(img_entries, texts)
+        if text
+    ]
+
+
 def screen_change_analyze(
-    img_nr_1: int, img_nr_2: int, folder_path: str, threshold: float = 0.70
+    img_nr_1: int,
+    img_nr_2: int,
+    folder_path: str,
+    threshold: float = 0.70,
+    regions: tuple = (None, None),
 ) -> bool:
     """
     Analizuje zmiany pomiędzy dwoma obrazami poprzez porównanie ich tekstu i wyglądu.
@@ -74,13 +394,16 @@ def screen_change_analyze(
         img_nr_2 (int): Numer drugiego obrazu do analizy.
         folder_path (str): Ścieżka do folderu, w którym znajdują się obrazy.
         threshold (float): Minimalna wartość podobieństwa, aby uznać obrazy za podobne (domyślnie 0.70).
+        regions (tuple): Obszary udostępnionego ekranu obu obrazów (None - cały obraz).
 
     Returns:
         bool: True, jeśli obrazy są różne, False w przeciwnym razie.
     """
     try:
-        image1 = cv2.imread(f"{folder_path}/{img_nr_1}.png")
-        image2 = cv2.imread(f"{folder_path}/{img_nr_2}.png")
+        image1 = crop_to_region(cv2.imread(f"{folder_path}/{img_nr_1}.png"), regions[0])
+        image2 = crop_to_region(cv2.imread(f"{folder_path}/{img_nr_2}.png"), regions[1])
+        if image1.shape != image2.shape:
+            image2 = cv2.resize(image2, (image1.shape[1], image1.shape[0]))
 
         img1_processed = preprocess_image(image1)
         img2_processed = preprocess_image(image2)
@@ -107,12 +430,14 @@ def main(
 ) -> list[str]:
     """
     Główna funkcja analizująca zmiany w obrazach wyodrębnionych z wideo.
-    Usuwa obrazy, które nie zawierają istotnych danych lub są zduplikowane.
+    Usuwa obrazy, które nie zawierają istotnych danych lub są zduplikowane,
+    a pozostawione obrazy przycina do obszaru udostępnionego ekranu.
 
     Args:
         video_length (int): Liczba klatek (obrazów) do analizy.
         folder_path (str): Ścieżka do folderu z klatkami wideo (obrazy w formacie PNG).
-        application_name (str): Nazwa aplikacji, używana do odczytu szablonu.
+        application_name (str): Nazwa aplikacji, używana do odczytu szablonu. Wartość "Auto"
+            (lub nazwa bez szablonu) oznacza automatyczne wykrycie aplikacji na podstawie klatek.
         n_frame (int): Określa co która ramka (z pliku wideo) ma pozostać w folderze.
 
     Returns:
@@ -122,16 +447,36 @@ def main(
     screen_with_data = []
 
     try:
-        # Analiza obecności danych na obrazach za pomocą szablonu
-        for i in range(video_length):
-            log_data_analyze(f"[INFO] Processing frame {i}")
-            if i % n_frame == 0 or i == video_length - 1:
-                if template_analyze(
-                    f"../data_analyze/templates/{application_name}_no_screen_template.png",
-                    f"{folder_path}/{i}.png",
-                    i,
-                ):
-                    screen_with_data.append(f"{i}.png")
+        # Histogramy analizowanych klatek liczone raz i porównywane ze wszystkimi szablonami naraz
+        frame_numbers = [
+            i for i in range(video_length) if i % n_frame == 0 or i == video_length - 1
+        ]
+        log_data_analyze(f"[INFO] Processing {len(frame_numbers)} frames")
+        frame_numbers, histograms = frames_histograms(folder_path, frame_numbers)
+        names, templates = load_templates()
+        similarity = histograms @ templates.T
+
+        # Nazwy z menu mogą zawierać spacje ("Google Meet"), a pliki szablonów ich nie mają
+        names_without_spaces = [name.replace(" ", "") for name in names]
+        requested = application_name.replace(" ", "")
+        if application_name == AUTO_APPLICATION or requested not in names_without_spaces:
+            application_name = detect_application(similarity, names, None)
+        else:
+            application_name = names[names_without_spaces.index(requested)]
+
+        if application_name is not None:
+            column = similarity[:, names.index(application_name)]
+            screen_with_data = [
+                f"{i}.png"
+                for i, score in zip(frame_numbers, column)
+                if score < NO_SCREEN_SIMILARITY
+            ]
+        else:
+            # Bez szablonu każda klatka jest traktowana jako zawierająca dane
+            screen_with_data = [f"{i}.png" for i in frame_numbers]
+
+        # Obszar udostępnionego ekranu wyznaczany raz dla każdego stabilnego układu okna
+        regions = content_regions(screen_with_data, folder_path, application_name)
 
         # Zawsze dodaj pierwszą klatkę, jeśli zawiera dane
         if "0.png" in screen_with_data:
@@ -143,9 +488,18 @@ def main(
                 int(screen_with_data[i - 1].split(".")[0]),
                 int(screen_with_data[i].split(".")[0]),
                 folder_path,
+                regions=(regions[screen_with_data[i - 1]], regions[screen_with_data[i]]),
             ):
                 final_data.append(f"{int(screen_with_data[i].split(".")[0])}.png")
 
+        # Zapisane klatki zawierają tylko udostępniony ekran
+        for filename in final_data:
+            if regions.get(filename) is not None:
+                file_path = os.path.join(folder_path, filename)
+                image = cv2.imread(file_path)
+                if image is not None:
+                    cv2.imwrite(file_path, crop_to_region(image, regions[filename]))
+
         # Usuwanie niepotrzebnych obrazów z folderu
         for filename in os.listdir(folder_path):
             if filename.endswith(".png") and filename not in final_data:
@@ -0,0 +1,24 @@
+def stitch_segment_results(results: list[dict]) -> dict:
+    """
+    Łączy wyniki analizy segmentów w jeden wynik w kolejności segmentów.
+
+    Args:
+        results (list[dict]): Wyniki `analyze_segment` (w dowolnej kolejności) ze znacznikami czasu
+            liczonymi już od początku spotkania.
+
+    Returns:
+        dict: Wynik w formacie `analyze_recording` dla całego spotkania.
+
+    Notes:
+        - Etykiety rozmówców są nadawane niezależnie w każdym segmencie, więc ta sama etykieta
+          w dwóch segmentach nie musi oznaczać tej samej osoby. Wpis rozmówcy na początku segmentu
+          jest zawsze zachowywany, również gdy etykieta jest taka sama jak na końcu poprzedniego.
+    """
+    stitched = {"text": [], "speaker": [], "img": [], "ocr": [], "transcript": ""}
+    for result in sorted(results, key=lambda r: r["index"]):
+        stitched["speaker"].extend(result["speaker"])
+        stitched["text"].extend(result["text"])
+        stitched["img"].extend(result["img"])
+        stitched["ocr"].extend(result["ocr"])
+        stitched["transcript"] += result["transcript"]
+    return stitched
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from app_backend import artifact_manifest
+from app_backend.artifact_manifest import files_to_upload
+from app_backend.chunked_upload import create_reference_server
+from app_backend.communication_with_www_server import upload_file_on_server
+
+
+class FilesToUploadTest(unittest.TestCase):
+    """Only new or changed artifacts are uploaded again; unchanged files are not read again."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        server = create_reference_server(os.path.join(self.tmp_dir.name, 'server'))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}"
+        self.note_dir = os.path.join(self.tmp_dir.name, 'rec')
+        os.mkdir(self.note_dir)
+
+    def write(self, name, data):
+        file_path = os.path.join(self.note_dir, name)
+        with open(file_path, 'wb') as file:
+            file.write(data)
+        return file_path
+
+    def upload(self, note_id, paths):
+        missing = files_to_upload(note_id, paths, f"{self.url}/api/manifest")
+        for file_path in missing:
+            self.assertTrue(upload_file_on_server(note_id, file_path, f"{self.url}/api/upload_file"))
+        return missing
+
+    def test_reupload_sends_only_changed_files(self):
+        paths = [self.write('combined.mp4', os.urandom(256 * 1024)), self.write('n.json', b'{"title": "A"}'),
+                 self.write('0.png', os.urandom(4096))]
+
+        self.assertEqual(self.upload('n', paths), paths)
+
+        self.write('n.json', b'{"title": "Spotkanie"}')
+        with mock.patch.object(artifact_manifest, 'hash_file', wraps=artifact_manifest.hash_file) as hash_file:
+            self.assertEqual(self.upload('n', paths), [paths[1]])
+        # Digests of the unchanged files come from the cache
+        self.assertEqual([call.args[0] for call in hash_file.call_args_list], [paths[1]])
+
+        with open(os.path.join(self.tmp_dir.name, 'server', 'n', 'n.json'), 'rb') as file:
+            self.assertEqual(file.read(), b'{"title": "Spotkanie"}')
+        # The same content in another note is attached by the server without uploading it
+        self.assertEqual(files_to_upload('m', paths, f"{self.url}/api/manifest"), [])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, 'server', 'm', 'combined.mp4')))
+
+    def test_hard_link_reuses_the_digest(self):
+        file_path = self.write('combined.mp4', os.urandom(64 * 1024))
+        link_path = os.path.join(self.tmp_dir.name, 'combined.mp4')
+        os.link(file_path, link_path)
+        digest = artifact_manifest.file_digest(file_path)
+
+        with mock.patch.object(artifact_manifest, 'hash_file') as hash_file:
+            self.assertEqual(artifact_manifest.file_digest(link_path), digest)
+        hash_file.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
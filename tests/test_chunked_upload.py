@@ -0,0 +1,102 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from app_backend import chunked_upload
+from app_backend.chunked_upload import create_reference_server, upload_file_in_chunks
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ChunkedUploadTest(unittest.TestCase):
+    """Uploads against `create_reference_server` with requests dropped before and after chunks are stored."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        # No back-off between attempts
+        patcher = mock.patch.object(chunked_upload, 'RETRY_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_server(self, **kwargs):
+        server = create_reference_server(os.path.join(self.tmp_dir.name, 'server'), **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    def create_file(self, size):
+        file_path = os.path.join(self.tmp_dir.name, 'combined.mp4')
+        with open(file_path, 'wb') as file:
+            file.write(os.urandom(size))
+        return file_path
+
+    def stored_file(self, note_id):
+        file_path = os.path.join(self.tmp_dir.name, 'server', note_id, 'combined.mp4')
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as file:
+            return file.read()
+
+    def read(self, file_path):
+        with open(file_path, 'rb') as file:
+            return file.read()
+
+    def test_upload_without_drops(self):
+        server, url = self.start_server()
+        file_path = self.create_file(4 * CHUNK_SIZE + 1000)
+
+        self.assertTrue(upload_file_in_chunks('n', file_path, url, chunk_size=CHUNK_SIZE))
+        self.assertEqual(self.stored_file('n'), self.read(file_path))
+        self.assertEqual(server.stats['chunk_requests'], 5)
+
+    def test_first_chunk_never_stored_is_not_reported_as_uploaded(self):
+        # Every chunk request is cut off before storing - the server never receives the file
+        server, url = self.start_server(drop_every=1, drop_mode='before_store')
+        file_path = self.create_file(CHUNK_SIZE)
+
+        self.assertFalse(upload_file_in_chunks('n', file_path, url, chunk_size=CHUNK_SIZE, max_attempts=3))
+        self.assertIsNone(self.stored_file('n'))
+
+    def test_first_chunk_lost_then_resumed(self):
+        # The first request loses the chunk, the retry stores it but loses the acknowledgement
+        server, url = self.start_server(drop_every=1, drop_mode='alternate')
+        file_path = self.create_file(CHUNK_SIZE)
+
+        self.assertTrue(upload_file_in_chunks('n', file_path, url, chunk_size=CHUNK_SIZE))
+        self.assertEqual(self.stored_file('n'), self.read(file_path))
+        self.assertEqual(server.stats['dropped'], 2)
+
+    def test_drops_before_store_resend_the_lost_chunks(self):
+        server, url = self.start_server(drop_every=2, drop_mode='before_store')
+        file_path = self.create_file(4 * CHUNK_SIZE + 1000)
+
+        self.assertTrue(upload_file_in_chunks('n', file_path, url, chunk_size=CHUNK_SIZE))
+        self.assertEqual(self.stored_file('n'), self.read(file_path))
+        self.assertGreater(server.stats['dropped'], 0)
+        self.assertGreater(server.stats['bytes_received'], os.path.getsize(file_path))
+
+    def test_drops_after_store_resume_without_resending(self):
+        server, url = self.start_server(drop_every=2, drop_mode='after_store')
+        file_path = self.create_file(4 * CHUNK_SIZE + 1000)
+
+        self.assertTrue(upload_file_in_chunks('n', file_path, url, chunk_size=CHUNK_SIZE))
+        self.assertEqual(self.stored_file('n'), self.read(file_path))
+        self.assertGreater(server.stats['dropped'], 0)
+        # The resume query returns the stored offset, so no byte is sent twice
+        self.assertEqual(server.stats['bytes_received'], os.path.getsize(file_path))
+
+    def test_lost_acknowledgement_of_last_chunk(self):
+        server, url = self.start_server(drop_every=2, drop_mode='after_store')
+        file_path = self.create_file(2 * CHUNK_SIZE)
+
+        self.assertTrue(upload_file_in_chunks('n', file_path, url, chunk_size=CHUNK_SIZE))
+        self.assertEqual(self.stored_file('n'), self.read(file_path))
+        self.assertEqual(server.stats['dropped'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
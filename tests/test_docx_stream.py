@@ -0,0 +1,98 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from importlib.util import find_spec
+
+from app_backend.note_model import build_note
+
+
+def write_png(path: str, width: int, height: int) -> None:
+    """Writes a grayscale PNG gradient without Pillow."""
+    raw = b''.join(b'\x00' + bytes([(x + y) % 256 for x in range(width)]) for y in range(height))
+    with open(path, 'wb') as image_file:
+        image_file.write(b'\x89PNG\r\n\x1a\n')
+        for chunk_type, data in (
+            (b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)),
+            (b'IDAT', zlib.compress(raw)),
+            (b'IEND', b''),
+        ):
+            image_file.write(struct.pack('>I', len(data)) + chunk_type + data)
+            image_file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+
+def document_outline(docx_file_path: str) -> list:
+    """
+    Reads a .docx file with python-docx and returns its paragraphs as `(style, text, pictures)`, where `pictures`
+    are `(width, height, image bytes)` of the inline pictures of the paragraph. Line breaks read back as "\\n".
+    """
+    from docx import Document
+    from docx.oxml.ns import qn
+
+    document = Document(docx_file_path)
+    outline = []
+    for paragraph in document.paragraphs:
+        pictures = []
+        for inline in paragraph._p.iter(qn('wp:inline')):
+            extent = inline.find(qn('wp:extent'))
+            blip = next(inline.iter(qn('a:blip')))
+            image_part = document.part.related_parts[blip.get(qn('r:embed'))]
+            pictures.append((int(extent.get('cx')), int(extent.get('cy')), image_part.blob))
+        outline.append((paragraph.style.name, paragraph.text, pictures))
+    return outline
+
+
+@unittest.skipUnless(find_spec('docx'), "python-docx is not installed")
+class StreamedDocxEquivalenceTest(unittest.TestCase):
+    """`render_streamed_docx_file` must produce the same document as the python-docx `render_docx_file`."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.wide_image = os.path.join(self.tmp_dir.name, '5.png')
+        self.tall_image = os.path.join(self.tmp_dir.name, '65.png')
+        write_png(self.wide_image, 640, 360)
+        write_png(self.tall_image, 300, 500)
+
+    def render_both(self, note) -> tuple:
+        from app_backend.create_files import render_docx_file, render_streamed_docx_file
+
+        outlines = []
+        for name, renderer in (('python-docx', render_docx_file), ('streaming', render_streamed_docx_file)):
+            docx_file_path = os.path.join(self.tmp_dir.name, f'{name}.docx')
+            self.assertTrue(renderer(note, docx_file_path), name)
+            outlines.append(document_outline(docx_file_path))
+        return tuple(outlines)
+
+    def test_same_headings_paragraphs_breaks_and_pictures(self):
+        note = build_note(
+            "Spotkanie <zespołu> & plan",
+            "Pierwsza linia podsumowania\nDruga linia",
+            [
+                {'type': 'speaker', 'timestamp': 0, 'name': 'SPEAKER_00'},
+                {'type': 'img', 'timestamp': 5, 'file_path': self.wide_image},
+                {'type': 'text', 'timestamp': 7, 'value': 'Tekst z "cudzysłowem", znakami <>&\nw dwóch liniach'},
+                {'type': 'speaker', 'timestamp': 60, 'name': 'SPEAKER_01'},
+                {'type': 'img', 'timestamp': 65, 'file_path': self.tall_image},
+                {'type': 'img', 'timestamp': 70, 'file_path': self.wide_image},
+                {'type': 'text', 'timestamp': 3725, 'value': '  spacje na brzegach  '},
+            ],
+            language='pl'
+        )
+        expected, streamed = self.render_both(note)
+
+        self.assertEqual(streamed, expected)
+        self.assertEqual(expected[0][:2], ('Heading 1', 'Tytuł: Spotkanie <zespołu> & plan'))
+        self.assertEqual(expected[2][1], 'Pierwsza linia podsumowania\nDruga linia')
+        self.assertEqual(sum(len(pictures) for _, _, pictures in streamed), 3)
+
+    def test_same_empty_note_in_english(self):
+        expected, streamed = self.render_both(build_note("Meeting", "", [], language='en'))
+
+        self.assertEqual(streamed, expected)
+        self.assertEqual([text for _, text, _ in streamed], ['Title: Meeting', 'Summary:', '', ''])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+
+from app_backend.note_json import read_note, write_compact_note
+from app_backend.note_model import build_note
+
+DOC_PATH = os.path.join(os.path.dirname(__file__), '..', 'docs', 'json_file_doc.json')
+
+
+def sample_note():
+    return build_note(
+        "Spotkanie zespołu",
+        "Podsumowanie \"ważne\"",
+        [
+            {'type': 'img', 'timestamp': 0, 'file_path': '../tmp/rec/0.png'},
+            {'type': 'speaker', 'timestamp': 0, 'name': 'SPEAKER_00'},
+            {'type': 'text', 'timestamp': 3, 'value': 'Dzień dobry'},
+            {'type': 'speaker', 'timestamp': 61, 'name': 'SPEAKER_01'},
+            {'type': 'text', 'timestamp': 61, 'value': 'Zaczynamy\nod budżetu'},
+            {'type': 'speaker', 'timestamp': 3725, 'name': 'SPEAKER_00'},
+            {'type': 'img', 'timestamp': 3725, 'file_path': '../tmp/rec/3725.png'},
+        ],
+        note_datetime="2025-01-11 18:50:49",
+        note_id="5f4d2b",
+        video_file_name="combined.mp4",
+        docx_file_name="Spotkanie.docx",
+        txt_file_name="Spotkanie.txt",
+    )
+
+
+class NoteJsonTest(unittest.TestCase):
+    """Version 1 and version 2 (plain and compressed) files read back to the same version 1 document."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.note = sample_note()
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir.name, name)
+
+    def expected_v1(self):
+        types = {'img': 'img', 'speaker': 'speaker', 'text': 'txt'}
+        return {
+            "note_id": "5f4d2b", "title": "Spotkanie zespołu", "datetime": "2025-01-11 18:50:49",
+            "summary": "Podsumowanie \"ważne\"", "language": "pl", "video": "combined.mp4",
+            "docx": "Spotkanie.docx", "txt": "Spotkanie.txt",
+            "content": [
+                {"type": types[entry.type], "val": entry.file_name if entry.type == 'img' else entry.value,
+                 "timestamp_str": entry.timestamp_str}
+                for entry in self.note.entries
+            ],
+        }
+
+    def test_v2_round_trip(self):
+        self.assertTrue(write_compact_note(self.note, self.path('5f4d2b.json')))
+        reader = read_note(self.path('5f4d2b.json'))
+
+        self.assertEqual(reader.version, 2)
+        self.assertEqual(len(reader), len(self.note.entries))
+        self.assertEqual(reader.speakers, ['SPEAKER_00', 'SPEAKER_01'])
+        self.assertEqual(reader.to_v1(), self.expected_v1())
+        self.assertEqual([c["timestamp"] for c in reader.iter_content()], [e.timestamp for e in self.note.entries])
+
+    def test_gzip_round_trip(self):
+        self.assertTrue(write_compact_note(self.note, self.path('5f4d2b.json.gz')))
+        with open(self.path('5f4d2b.json.gz'), 'rb') as file:
+            self.assertEqual(file.read(2), b'\x1f\x8b')
+
+        self.assertEqual(read_note(self.path('5f4d2b.json.gz')).to_v1(), self.expected_v1())
+
+    @unittest.skipUnless(find_spec('zstandard'), "zstandard is not installed")
+    def test_zstd_round_trip(self):
+        self.assertTrue(write_compact_note(self.note, self.path('5f4d2b.json.zst')))
+
+        self.assertEqual(read_note(self.path('5f4d2b.json.zst')).to_v1(), self.expected_v1())
+
+    @unittest.skipUnless(find_spec('docx'), "python-docx is not installed (imported by create_files)")
+    def test_v1_file_reads_back_unchanged(self):
+        from app_backend.create_files import render_json_file
+
+        self.assertTrue(render_json_file(self.note, self.path('5f4d2b.json')))
+        with open(self.path('5f4d2b.json'), encoding='utf-8') as file:
+            written = json.load(file)
+        reader = read_note(self.path('5f4d2b.json'))
+
+        self.assertEqual(reader.version, 1)
+        self.assertEqual(reader.to_v1(), written)
+        self.assertEqual(reader.to_v1(), self.expected_v1())
+        self.assertEqual(reader.speakers, ['SPEAKER_00', 'SPEAKER_01'])
+
+    def test_to_v1_follows_the_documented_schema(self):
+        with open(DOC_PATH, encoding='utf-8') as file:
+            documented = json.load(file)
+        write_compact_note(self.note, self.path('5f4d2b.json'))
+        data = read_note(self.path('5f4d2b.json')).to_v1()
+
+        self.assertEqual(list(data), list(documented))
+        element_keys = {tuple(element) for element in documented["content"]}
+        self.assertEqual({tuple(element) for element in data["content"]}, element_keys)
+        self.assertLessEqual({element["type"] for element in data["content"]},
+                             {element["type"] for element in documented["content"]})
+        for element in data["content"]:
+            self.assertRegex(element["timestamp_str"], r'^\[\d{2,}:\d{2}:\d{2}\]$')
+
+
+if __name__ == '__main__':
+    unittest.main()
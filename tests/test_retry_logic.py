@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from app_backend import retry_logic
+
+
+class SendFailedFilesTest(unittest.TestCase):
+    """Failures recorded by upload workers while the retry is sending files are kept."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        # Paths of the retry queue are relative to app_front (../unsuccessful_uploads)
+        app_dir = os.path.join(self.tmp_dir.name, 'app_front')
+        os.mkdir(app_dir)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(app_dir)
+        self.queue_dir = os.path.join(self.tmp_dir.name, 'unsuccessful_uploads')
+
+    def make_file(self, name):
+        file_path = os.path.join(self.tmp_dir.name, name)
+        with open(file_path, 'wb') as file:
+            file.write(os.urandom(1024))
+        return file_path
+
+    def queued(self):
+        with open(os.path.join(self.queue_dir, 'failed_files.json'), encoding='utf-8') as file:
+            elements = json.load(file)["elements"]
+        return {element["dir_name"]: [c["file_name"] for c in element["dir_content"]] for element in elements}
+
+    def test_failures_saved_during_retry_are_kept(self):
+        retry_logic.save_unsuccessful_upload('a', self.make_file('combined.mp4'))
+        retry_logic.save_unsuccessful_upload('a', self.make_file('note.docx'))
+        late_files = [('a', self.make_file('note.txt')), ('b', self.make_file('slides.png'))]
+        uploaded = []
+
+        def upload(note_id, file_path):
+            if not uploaded:
+                # An upload worker records failures while the retry is still sending
+                worker = threading.Thread(
+                    target=lambda: [retry_logic.save_unsuccessful_upload(*late) for late in late_files])
+                worker.start()
+                worker.join(5)
+                self.assertFalse(worker.is_alive(), "failed_files_lock is held during the upload")
+            uploaded.append(os.path.basename(file_path))
+            return os.path.basename(file_path) != 'note.docx'
+
+        with mock.patch.object(retry_logic, 'files_to_upload', lambda note_id, paths: paths), \
+                mock.patch.object(retry_logic, 'upload_file_on_server', upload):
+            retry_logic.send_failed_files()
+
+        self.assertEqual(uploaded, ['combined.mp4', 'note.docx'])
+        self.assertEqual(self.queued(), {'a': ['note.docx', 'note.txt'], 'b': ['slides.png']})
+        self.assertEqual(sorted(os.listdir(os.path.join(self.queue_dir, 'a'))), ['note.docx', 'note.txt'])
+        self.assertEqual(os.listdir(os.path.join(self.queue_dir, 'b')), ['slides.png'])
+
+    def test_directory_of_sent_note_is_removed(self):
+        retry_logic.save_unsuccessful_upload('a', self.make_file('combined.mp4'))
+        retry_logic.save_unsuccessful_upload('a', self.make_file('note.docx'))
+
+        with mock.patch.object(retry_logic, 'files_to_upload', lambda note_id, paths: paths[:1]), \
+                mock.patch.object(retry_logic, 'upload_file_on_server', return_value=True) as upload:
+            retry_logic.send_failed_files()
+
+        # note.docx is already stored on the server (manifest) - it is not sent again
+        upload.assert_called_once_with('a', '../unsuccessful_uploads/a/combined.mp4')
+        self.assertEqual(self.queued(), {})
+        self.assertFalse(os.path.exists(os.path.join(self.queue_dir, 'a')))
+
+
+if __name__ == '__main__':
+    unittest.main()
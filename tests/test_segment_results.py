@@ -0,0 +1,68 @@
+import unittest
+
+from data_analyze.segment_results import stitch_segment_results
+
+
+def segment_result(index, start, speakers, texts):
+    """A result of `analyze_segment` for a segment starting `start` seconds into the meeting."""
+    return {
+        "index": index,
+        "speaker": [{"type": "speaker", "timestamp": start + t, "name": name} for t, name in speakers],
+        "text": [{"type": "text", "timestamp": start + t, "value": value} for t, value in texts],
+        "img": [{"type": "img", "timestamp": start + 1, "file_path": f"{start + 1}.png"}],
+        "ocr": [{"type": "ocr", "timestamp": start + 1, "value": f"slide {index}"}],
+        "transcript": f"segment {index}. ",
+    }
+
+
+class StitchSegmentResultsTest(unittest.TestCase):
+
+    def test_segments_are_stitched_in_order(self):
+        results = [
+            segment_result(2, 600, [(0, "SPEAKER_00")], [(2, "c")]),
+            segment_result(0, 0, [(0, "SPEAKER_00")], [(2, "a")]),
+            segment_result(1, 300, [(0, "SPEAKER_01")], [(2, "b")]),
+        ]
+
+        stitched = stitch_segment_results(results)
+
+        self.assertEqual([entry["value"] for entry in stitched["text"]], ["a", "b", "c"])
+        self.assertEqual([entry["value"] for entry in stitched["ocr"]], ["slide 0", "slide 1", "slide 2"])
+        self.assertEqual(stitched["transcript"], "segment 0. segment 1. segment 2. ")
+
+    def test_timestamps_keep_segment_offsets(self):
+        results = [
+            segment_result(0, 0, [(0, "SPEAKER_00")], [(2, "a"), (250, "b")]),
+            segment_result(1, 300, [(5, "SPEAKER_00")], [(7, "c")]),
+        ]
+
+        stitched = stitch_segment_results(results)
+
+        for key in ("speaker", "text", "img", "ocr"):
+            timestamps = [entry["timestamp"] for entry in stitched[key]]
+            self.assertEqual(timestamps, sorted(timestamps), key)
+        self.assertEqual([entry["timestamp"] for entry in stitched["text"]], [2, 250, 307])
+        self.assertEqual([entry["timestamp"] for entry in stitched["img"]], [1, 301])
+
+    def test_boundary_speaker_with_the_same_label_is_kept(self):
+        # Labels are assigned per segment - SPEAKER_00 of segment 1 may be a different person
+        results = [
+            segment_result(0, 0, [(0, "SPEAKER_00"), (100, "SPEAKER_01"), (200, "SPEAKER_00")], [(2, "a")]),
+            segment_result(1, 300, [(0, "SPEAKER_00"), (50, "SPEAKER_01")], [(2, "b")]),
+        ]
+
+        stitched = stitch_segment_results(results)
+
+        self.assertEqual(
+            [(entry["timestamp"], entry["name"]) for entry in stitched["speaker"]],
+            [(0, "SPEAKER_00"), (100, "SPEAKER_01"), (200, "SPEAKER_00"), (300, "SPEAKER_00"), (350, "SPEAKER_01")],
+        )
+
+    def test_no_segments(self):
+        self.assertEqual(
+            stitch_segment_results([]), {"text": [], "speaker": [], "img": [], "ocr": [], "transcript": ""}
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
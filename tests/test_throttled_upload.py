@@ -0,0 +1,50 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from app_backend.chunked_upload import create_reference_server
+from app_backend.communication_with_www_server import upload_file_on_server
+from app_backend.http_client import THROTTLE_BLOCK_SIZE, get_bandwidth_limiter, set_bandwidth_limit
+
+LIMIT = 1024 * 1024
+
+
+class ThrottledSingleRequestUploadTest(unittest.TestCase):
+    """A single-request upload is streamed at the bandwidth limit instead of reserving the file up front."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        server = create_reference_server(os.path.join(self.tmp_dir.name, 'server'))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f"http://127.0.0.1:{server.server_address[1]}/api/upload_file"
+        set_bandwidth_limit(LIMIT)
+        self.addCleanup(set_bandwidth_limit, None)
+
+    def test_file_is_sent_at_the_limit(self):
+        file_path = os.path.join(self.tmp_dir.name, 'slides.png')
+        data = os.urandom(2 * LIMIT)
+        with open(file_path, 'wb') as file:
+            file.write(data)
+        progress = []
+
+        start = time.perf_counter()
+        is_uploaded = upload_file_on_server('n', file_path, self.url, on_progress=lambda sent, total: progress.append(sent))
+        seconds = time.perf_counter() - start
+
+        self.assertTrue(is_uploaded)
+        with open(os.path.join(self.tmp_dir.name, 'server', 'n', 'slides.png'), 'rb') as file:
+            self.assertEqual(file.read(), data)
+        # The request itself lasts as long as the limit allows, and leaves no debt for the next upload
+        self.assertGreater(seconds, 1.5)
+        self.assertGreater(get_bandwidth_limiter().tokens, -THROTTLE_BLOCK_SIZE)
+        self.assertEqual(progress[-1], len(data))
+        self.assertGreater(len(progress), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()